@@ -6,125 +6,545 @@ AI 處理鏈
 2. 科技導讀人 (Tech Narrator) - OpenAI
 3. 總編輯 (Editor-in-Chief) - OpenAI
 4. HTML 生成器 (HTML Generator) - DeepSeek
+
+以上為各階段的主要模型；主要模型失敗、輸出無效或斷路時，依 STAGE_ROUTES 改用備援模型。
 """
 
 import os
 import json
 import time
-from typing import List, Dict, Callable, Any
-from functools import wraps
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Callable, Any, Optional
 from openai import OpenAI
 
 from log_config import get_logger
+from prompt_packer import pack_news_items, estimate_tokens
+from llm_cache import LLMCache, cache_key
+from stream_json import IncrementalJSONParser
+from llm_pool import LLMPool
+from retry_policy import RetryPolicy, ConfigError, is_programming_error
+from model_router import ModelRouter, Route, parse_routes
+from usage_ledger import call_cost
+from output_schemas import (
+    ALCHEMIST_SCHEMA,
+    NARRATOR_SCHEMA,
+    NARRATOR_SECTION_SCHEMA,
+    NARRATOR_CLOSING_SCHEMA,
+    EDITOR_SCHEMA,
+    response_format_for,
+)
 from prompts import (
     DATA_ALCHEMIST_SYSTEM_PROMPT,
     TECH_NARRATOR_SYSTEM_PROMPT,
+    TECH_NARRATOR_SECTION_SYSTEM_PROMPT,
+    TECH_NARRATOR_CLOSING_SYSTEM_PROMPT,
     EDITOR_IN_CHIEF_SYSTEM_PROMPT,
     HTML_GENERATOR_SYSTEM_PROMPT,
+    HTML_GENERATOR_TEMPLATE_PROMPT,
 )
+from utils import validate_json_output, is_valid_json_output
 
 logger = get_logger(__name__)
 
+# 數據煉金術師的新聞部分 token 預算（DeepSeek 上下文 64K，需預留系統提示詞與 8K 輸出）
+ALCHEMIST_PROMPT_TOKEN_BUDGET = int(os.getenv('ALCHEMIST_PROMPT_TOKEN_BUDGET', '24000'))
+ALCHEMIST_MAX_TOKENS = 8192
+
+# 串流模式（LLM_STREAM=0 關閉，改回等待完整回應）
+LLM_STREAM_ENABLED = os.getenv('LLM_STREAM', '1') != '0'
+
+# 科技導讀人分類平行模式
+NARRATOR_FANOUT_WORKERS = int(os.getenv('NARRATOR_FANOUT_WORKERS', '4'))  # 同時進行的章節數
+NARRATOR_TOP_PICKS = 3          # 今日必讀則數
+NARRATOR_MAX_ITEMS = 10         # 日報總則數（與單次模式的 8-10 則一致）
+
+# 分類 → 日報章節標題（順序即日報章節順序，與 TECH_NARRATOR_SYSTEM_PROMPT 一致）
+NARRATOR_SECTIONS = {
+    'ai_applications_and_tools': '### 🛠 AI工具與應用焦點',
+    'industry_trends_and_news': '### 📊 產業趨勢與新聞',
+    'security_alerts': '### 🔐 資安趨勢快訊',
+    'other': '### 🌍 產業動態與AI職涯',
+    'perspectives_and_analysis': '### 💡 深度觀點與建議',
+}
+NARRATOR_TOP_HEADING = '### ✨ 今日必讀 TOP 3'
+
 # ============================================
-# 重試裝飾器
+# 重試策略（每個階段由 main 以此策略執行，API client 本身不重試）
 # ============================================
 
-def retry_on_failure(max_retries: int = 2, delay: int = 3):
-    """
-    重試裝飾器
+LLM_REQUEST_TIMEOUT_SECS = float(os.getenv('LLM_REQUEST_TIMEOUT_SECS', '180'))   # 單次請求 timeout
+LLM_STAGE_DEADLINE_SECS = float(os.getenv('LLM_STAGE_DEADLINE_SECS', '420'))     # 單一階段總期限
 
-    Args:
-        max_retries: 最大重試次數
-        delay: 重試延遲（秒）
-    """
-    def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs) -> Any:
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt < max_retries:
-                        logger.warning(f"⚠️  {func.__name__} 第 {attempt + 1} 次嘗試失敗: {str(e)}")
-                        logger.info(f"🔄 等待 {delay} 秒後重試...")
-                        time.sleep(delay)
-                    else:
-                        logger.error(f"❌ {func.__name__} 在 {max_retries + 1} 次嘗試後仍然失敗")
-                        raise
-            return None
-        return wrapper
-    return decorator
+STAGE_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=30.0,
+                                 deadline_secs=LLM_STAGE_DEADLINE_SECS)
+
+# ============================================
+# API 配置（LLMPool 統一管理 client、限流與併發）
+# ============================================
+
+# 各供應商限流：每分鐘請求數 / 每分鐘 token 數 / 同時請求數
+LLM_PROVIDER_LIMITS = {
+    'openai': {'rpm': 500, 'tpm': 800_000, 'max_concurrency': 8},
+    'deepseek': {'rpm': 120, 'tpm': 1_000_000, 'max_concurrency': 8},
+}
 
 # ============================================
-# API 配置（單例模式，避免每次呼叫重建 client）
+# 模型路由（主要模型 + 依序的備援模型；LLM_ROUTE_<STAGE>=provider:model,... 可覆寫）
 # ============================================
 
-_openai_client = None
-_deepseek_client = None
+STAGE_ROUTES = {
+    'alchemist': [Route('deepseek', 'deepseek-chat'), Route('openai', 'gpt-4.1-mini')],
+    'narrator': [Route('openai', 'gpt-4.1'), Route('deepseek', 'deepseek-chat')],
+    'editor': [Route('openai', 'gpt-4.1'), Route('deepseek', 'deepseek-chat')],
+    'html': [Route('deepseek', 'deepseek-chat'), Route('openai', 'gpt-4.1-mini')],
+}
+
+# 備援開關（LLM_FALLBACK=0 只用主要模型，行為同舊版）
+LLM_FALLBACK_ENABLED = os.getenv('LLM_FALLBACK', '1') != '0'
+
+# 路由階段 → 階段名稱（與 main 的 step_name / 重試紀錄一致，用量紀錄依此歸類）
+STAGE_LABELS = {
+    'alchemist': '數據煉金術師',
+    'narrator': '科技導讀人',
+    'editor': '總編輯',
+    'html': 'HTML 生成器',
+}
+
+_llm_pool = None
+_llm_cache = None
+_model_router = None
+_usage_sink: Optional[Callable[[Dict[str, Any]], None]] = None
+_thread_metrics = threading.local()   # 同一 thread 最近一次呼叫的指標（平行章節不互相覆蓋）
+
+
+def _make_openai_client() -> OpenAI:
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ConfigError("❌ OPENAI_API_KEY 環境變數未設置")
+    return OpenAI(api_key=api_key, max_retries=0, timeout=LLM_REQUEST_TIMEOUT_SECS)
+
+
+def _make_deepseek_client() -> OpenAI:
+    api_key = os.getenv('DEEPSEEK_API_KEY')
+    if not api_key:
+        raise ConfigError("❌ DEEPSEEK_API_KEY 環境變數未設置")
+    return OpenAI(api_key=api_key, base_url="https://api.deepseek.com",
+                  max_retries=0, timeout=LLM_REQUEST_TIMEOUT_SECS)
+
+
+def get_llm_pool() -> LLMPool:
+    """取得共用的 LLMPool（單例；LLM_FAKE=1 時所有供應商改用 FakeProvider）"""
+    global _llm_pool
+    if _llm_pool is None:
+        pool = LLMPool()
+        pool.register('openai', _make_openai_client, **LLM_PROVIDER_LIMITS['openai'])
+        pool.register('deepseek', _make_deepseek_client, **LLM_PROVIDER_LIMITS['deepseek'])
+        if os.getenv('LLM_FAKE', '0') != '0':
+            logger.info("🧪 LLM_FAKE 已啟用，所有 LLM 呼叫改用 FakeProvider")
+            pool.use_fake()
+        _llm_pool = pool
+    return _llm_pool
 
 
 def get_openai_client() -> OpenAI:
-    """取得 OpenAI client（單例）"""
-    global _openai_client
-    if _openai_client is None:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("❌ OPENAI_API_KEY 環境變數未設置")
-        _openai_client = OpenAI(api_key=api_key)
-    return _openai_client
+    """取得 OpenAI client（由 LLMPool 持有，重用連線）"""
+    return get_llm_pool().client('openai')
 
 
 def get_deepseek_client() -> OpenAI:
-    """取得 DeepSeek client（單例）"""
-    global _deepseek_client
-    if _deepseek_client is None:
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        if not api_key:
-            raise ValueError("❌ DEEPSEEK_API_KEY 環境變數未設置")
-        _deepseek_client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    return _deepseek_client
+    """取得 DeepSeek client（由 LLMPool 持有，重用連線）"""
+    return get_llm_pool().client('deepseek')
+
+
+def _cached_prompt_tokens(usage) -> Optional[int]:
+    """
+    prompt 中命中供應商前綴快取的 token 數
 
+    OpenAI: usage.prompt_tokens_details.cached_tokens
+    DeepSeek: usage.prompt_cache_hit_tokens
+    """
+    if usage is None:
+        return None
+    hit = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if hit is not None:
+        return hit
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return getattr(details, 'cached_tokens', None) if details is not None else None
+
+
+def _log_usage(usage, provider: str):
+    """記錄 API token 使用量（含前綴快取命中數）"""
+    if not usage:
+        return
+    cached = _cached_prompt_tokens(usage)
+    cached_note = f", cached={cached}" if cached is not None else ""
+    logger.info(f"📊 {provider} Token: prompt={usage.prompt_tokens}{cached_note}, "
+                f"output={usage.completion_tokens}, total={usage.total_tokens}")
+
+
+def _usage_metrics(usage) -> Dict[str, Any]:
+    if not usage:
+        return {}
+    return {'prompt_tokens': usage.prompt_tokens, 'cached_prompt_tokens': _cached_prompt_tokens(usage)}
+
+
+def get_llm_cache() -> LLMCache:
+    """取得 LLM 回應快取（單例）"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
+def get_last_call_metrics() -> Dict[str, Any]:
+    """本 thread 最近一次 LLM 呼叫的串流指標（ttft_secs / tokens_per_sec / truncated 等）"""
+    return dict(getattr(_thread_metrics, 'value', {}))
+
+
+def clear_last_call_metrics():
+    """清除本 thread 的呼叫指標（階段開始前呼叫，呼叫都在其他 thread 時才不會讀到上一階段的指標）"""
+    _thread_metrics.value = {}
+
+
+def _record_metrics(**metrics):
+    _thread_metrics.value = dict(metrics)
+
+
+def set_usage_sink(sink: Optional[Callable[[Dict[str, Any]], None]]):
+    """設定每次 LLM 呼叫用量紀錄的接收者（main 傳入 ExecutionLogger.log_llm_call）"""
+    global _usage_sink
+    _usage_sink = sink
+
+
+def _emit_usage(stage: str, route: Route, status: str, latency: float, fallback: bool,
+                metrics: Dict[str, Any], error: Optional[Exception] = None):
+    """產生一筆結構化用量紀錄（含成本）並送給 _usage_sink"""
+    if _usage_sink is None:
+        return
+    cached = metrics.get('cached', False)
+    prompt_tokens = None if cached else metrics.get('prompt_tokens')
+    cached_prompt_tokens = None if cached else metrics.get('cached_prompt_tokens')
+    completion_tokens = None if cached else metrics.get('completion_tokens')
+    record = {
+        'timestamp': datetime.now().isoformat(),
+        'step': STAGE_LABELS.get(stage, stage),
+        'stage': stage,
+        'provider': route.provider,
+        'model': route.model,
+        'status': status,
+        'fallback': fallback,
+        'response_cached': cached,
+        'prompt_tokens': prompt_tokens,
+        'cached_prompt_tokens': cached_prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'ttft_secs': metrics.get('ttft_secs'),
+        'latency_secs': round(latency, 3),
+        'cost_usd': call_cost(route.model, prompt_tokens, cached_prompt_tokens, completion_tokens),
+        'error': f"{type(error).__name__}: {str(error)[:200]}" if error else None,
+    }
+    try:
+        _usage_sink(record)
+    except Exception as e:
+        logger.warning(f"⚠️ 用量紀錄寫入失敗: {e}")
+
+
+def _cached_call(provider: str, model: str, system_instruction: str, user_prompt: str,
+                 temperature: float, max_tokens, call: Callable[[], str],
+                 on_member: Optional[Callable[[str, Any], None]] = None, expect_json: bool = False,
+                 response_format: Optional[Dict] = None,
+                 is_valid: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    先查 LLM 快取，未命中才呼叫 API 並寫回快取（命中時也會重播 on_member 回呼）
 
-def _log_usage(response, provider: str):
-    """記錄 API token 使用量"""
-    if hasattr(response, 'usage') and response.usage:
-        u = response.usage
-        logger.info(f"📊 {provider} Token: prompt={u.prompt_tokens}, output={u.completion_tokens}, total={u.total_tokens}")
+    只有通過有效性檢查的輸出才寫入快取（is_valid，未提供且 expect_json 時為可解析的 JSON），
+    重試才會重新生成而不是重播壞掉的回應；舊版寫入的無效紀錄命中時同樣略過。
+    """
+    check = is_valid or (is_valid_json_output if expect_json else None)
+    cache = get_llm_cache()
+    key = cache_key(provider, model, system_instruction, user_prompt, temperature, max_tokens, response_format)
+    cached = cache.get(key)
+    if cached is not None and (check is None or check(cached)):
+        logger.info(f"♻️  {provider} 快取命中 ({key[:12]})，略過 API 呼叫")
+        _record_metrics(provider=provider, model=model, cached=True)
+        if on_member:
+            IncrementalJSONParser(on_member).feed(cached)
+        return cached
+
+    output = call()
+    if check is not None and not check(output):
+        logger.warning(f"⚠️  {provider} 輸出未通過有效性檢查，不寫入快取")
+        return output
+    cache.put(key, provider, model, output)
+    return output
 
 
-def call_deepseek(system_instruction: str, user_prompt: str, temperature: float = 0.7, max_tokens: int = 8192) -> str:
-    """呼叫 DeepSeek API"""
+def _chat_completion(pool_key: str, provider: str, model: str, system_instruction: str, user_prompt: str,
+                     on_member: Optional[Callable[[str, Any], None]] = None, **params) -> str:
+    """
+    經 LLMPool 限流後呼叫 chat completion；串流模式下邊收邊解析 JSON 並記錄 TTFT / tokens/sec
+
+    Args:
+        pool_key: LLMPool 的供應商 key（'openai' / 'deepseek'）
+        provider: 供應商名稱（用於日誌）
+        model: 模型名稱
+        system_instruction: 系統提示詞
+        user_prompt: 使用者提示詞
+        on_member: 頂層 JSON 成員完成時的回呼（僅串流模式）
+        **params: temperature / max_tokens 等參數
+
+    Returns:
+        完整回應文字
+    """
+    pool = get_llm_pool()
+    client = pool.client(pool_key)
+    estimated = (estimate_tokens(system_instruction) + estimate_tokens(user_prompt)
+                 + params.get('max_tokens', 1024))
+    with pool.limit(pool_key, estimated) as lease:
+        output, total_tokens = _completion(client, provider, model, system_instruction, user_prompt,
+                                           on_member, **params)
+        lease.settle(total_tokens)
+    return output
+
+
+def _completion(client: OpenAI, provider: str, model: str, system_instruction: str, user_prompt: str,
+                on_member: Optional[Callable[[str, Any], None]] = None, **params):
+    """實際呼叫 API，回傳 (回應文字, 實際 token 總數或 None)"""
+    messages = [
+        {"role": "system", "content": system_instruction},
+        {"role": "user", "content": user_prompt}
+    ]
+    started = time.perf_counter()
+
+    if not LLM_STREAM_ENABLED:
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        usage = getattr(response, 'usage', None)
+        _log_usage(usage, provider)
+        _record_metrics(provider=provider, model=model, stream=False,
+                        total_secs=round(time.perf_counter() - started, 3),
+                        completion_tokens=usage.completion_tokens if usage else None,
+                        truncated=response.choices[0].finish_reason == 'length',
+                        **_usage_metrics(usage))
+        return response.choices[0].message.content, usage.total_tokens if usage else None
+
+    stream = client.chat.completions.create(
+        model=model, messages=messages, stream=True,
+        stream_options={"include_usage": True}, **params
+    )
+    parser = IncrementalJSONParser(on_member)
+    parts = []
+    first_token_at = None
+    finish_reason = None
+    usage = None
+
+    for chunk in stream:
+        if getattr(chunk, 'usage', None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        delta = choice.delta.content if choice.delta else None
+        if delta:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(delta)
+            parser.feed(delta)
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+            if finish_reason == 'length':
+                logger.warning(f"⚠️  {provider} 輸出達到 max_tokens 上限，回應已截斷")
+
+    ended = time.perf_counter()
+    output = ''.join(parts)
+    completion_tokens = usage.completion_tokens if usage else estimate_tokens(output)
+    generation_secs = ended - (first_token_at or ended)
+    ttft = (first_token_at or ended) - started
+    tokens_per_sec = completion_tokens / generation_secs if generation_secs > 0 else 0.0
+
+    _log_usage(usage, provider)
+    logger.info(f"⏱️  {provider} TTFT {ttft:.2f}s，{tokens_per_sec:.1f} tokens/s，總計 {ended - started:.2f}s")
+
+    _record_metrics(
+        provider=provider, model=model, stream=True,
+        ttft_secs=round(ttft, 3),
+        total_secs=round(ended - started, 3),
+        completion_tokens=completion_tokens,
+        tokens_per_sec=round(tokens_per_sec, 1),
+        finish_reason=finish_reason,
+        truncated=finish_reason == 'length' or (on_member is not None and parser.truncated),
+        **_usage_metrics(usage),
+    )
+    return output, usage.total_tokens if usage else None
+
+
+def call_deepseek(system_instruction: str, user_prompt: str, temperature: float = 0.7, max_tokens: int = 8192,
+                  on_member: Optional[Callable[[str, Any], None]] = None, expect_json: bool = False,
+                  model: str = "deepseek-chat", response_format: Optional[Dict] = None,
+                  is_valid: Optional[Callable[[str], bool]] = None) -> str:
+    """呼叫 DeepSeek API（相同請求會重播快取回應）"""
+    return _cached_call(
+        "DeepSeek", model, system_instruction, user_prompt, temperature, max_tokens,
+        lambda: _call_deepseek_api(system_instruction, user_prompt, temperature, max_tokens, on_member, model,
+                                   response_format),
+        on_member, expect_json, response_format, is_valid,
+    )
+
+
+def _call_deepseek_api(system_instruction: str, user_prompt: str, temperature: float, max_tokens: int,
+                       on_member: Optional[Callable[[str, Any], None]] = None, model: str = "deepseek-chat",
+                       response_format: Optional[Dict] = None) -> str:
     logger.info("🔑 呼叫 DeepSeek API...")
-    client = get_deepseek_client()
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": system_instruction},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=temperature,
-        max_tokens=max_tokens
+    extra = {'response_format': response_format} if response_format else {}
+    output = _chat_completion(
+        'deepseek', "DeepSeek", model, system_instruction, user_prompt,
+        on_member, temperature=temperature, max_tokens=max_tokens, **extra
     )
-    _log_usage(response, "DeepSeek")
     logger.info("✅ DeepSeek API 呼叫成功")
-    return response.choices[0].message.content
+    return output
 
 
-def call_openai(system_instruction: str, user_prompt: str, model: str = "gpt-4.1", temperature: float = 0.7) -> str:
-    """呼叫 OpenAI API"""
+def call_openai(system_instruction: str, user_prompt: str, model: str = "gpt-4.1", temperature: float = 0.7,
+                on_member: Optional[Callable[[str, Any], None]] = None, expect_json: bool = False,
+                response_format: Optional[Dict] = None,
+                is_valid: Optional[Callable[[str], bool]] = None) -> str:
+    """呼叫 OpenAI API（相同請求會重播快取回應）"""
+    return _cached_call(
+        "OpenAI", model, system_instruction, user_prompt, temperature, None,
+        lambda: _call_openai_api(system_instruction, user_prompt, model, temperature, on_member, response_format),
+        on_member, expect_json, response_format, is_valid,
+    )
+
+
+def _call_openai_api(system_instruction: str, user_prompt: str, model: str, temperature: float,
+                     on_member: Optional[Callable[[str, Any], None]] = None,
+                     response_format: Optional[Dict] = None) -> str:
     logger.info(f"🔑 呼叫 OpenAI API ({model})...")
-    client = get_openai_client()
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system_instruction},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=temperature
+    extra = {'response_format': response_format} if response_format else {}
+    output = _chat_completion(
+        'openai', "OpenAI", model, system_instruction, user_prompt,
+        on_member, temperature=temperature, **extra
     )
-    _log_usage(response, "OpenAI")
     logger.info("✅ OpenAI API 呼叫成功")
-    return response.choices[0].message.content
+    return output
+
+
+# ============================================
+# 模型路由呼叫
+# ============================================
+
+def get_model_router() -> ModelRouter:
+    """取得模型路由器（單例；健康狀態在整個流程中跨階段共用）"""
+    global _model_router
+    if _model_router is None:
+        routes = {}
+        for stage, default in STAGE_ROUTES.items():
+            spec = os.getenv(f'LLM_ROUTE_{stage.upper()}')
+            stage_routes = parse_routes(spec) if spec else list(default)
+            routes[stage] = stage_routes if LLM_FALLBACK_ENABLED else stage_routes[:1]
+        _model_router = ModelRouter(routes)
+    return _model_router
+
+
+def _call_route(route: Route, system_instruction: str, user_prompt: str, temperature: float,
+                max_tokens: Optional[int], on_member, expect_json: bool,
+                response_format: Optional[Dict] = None,
+                is_valid: Optional[Callable[[str], bool]] = None) -> str:
+    if route.provider == 'deepseek':
+        return call_deepseek(system_instruction, user_prompt, temperature, max_tokens or 8192,
+                             on_member, expect_json, model=route.model, response_format=response_format,
+                             is_valid=is_valid)
+    if route.provider == 'openai':
+        return call_openai(system_instruction, user_prompt, route.model, temperature, on_member, expect_json,
+                           response_format=response_format, is_valid=is_valid)
+    raise ConfigError(f"❌ 不支援的路由供應商: {route.provider}")
+
+
+def stage_config(stage: str) -> Dict[str, Any]:
+    """
+    影響某階段輸出的設定：路由（含 LLM_ROUTE_* / LLM_FALLBACK 覆寫）與 prompt 預算等參數
+
+    main 將其納入檢查點的輸入雜湊，改了模型或預算後續跑不會沿用舊輸出
+    """
+    config: Dict[str, Any] = {'routes': [str(r) for r in get_model_router().routes.get(stage, [])]}
+    if stage == 'alchemist':
+        config.update(prompt_token_budget=ALCHEMIST_PROMPT_TOKEN_BUDGET, max_tokens=ALCHEMIST_MAX_TOKENS)
+    elif stage == 'narrator':
+        config.update(top_picks=NARRATOR_TOP_PICKS, max_items=NARRATOR_MAX_ITEMS)
+    return config
+
+
+def call_routed(stage: str, system_instruction: str, user_prompt: str, temperature: float = 0.7,
+                max_tokens: Optional[int] = None, on_member: Optional[Callable[[str, Any], None]] = None,
+                expect_json: bool = False, schema: Optional[Dict] = None,
+                is_valid: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    依 STAGE_ROUTES 呼叫該階段的模型，失敗或輸出無效時改用下一個備援模型
+
+    Args:
+        stage: 路由表的階段 key（'alchemist' / 'narrator' / 'editor' / 'html'）
+        max_tokens: 輸出上限（僅 DeepSeek 路由使用，None 時用 call_deepseek 預設值）
+        expect_json: 以 is_valid_json_output 判斷輸出有效性
+        schema: 輸出結構（output_schemas）；提供時要求 API 以 JSON 模式輸出並依結構判斷有效性
+        is_valid: 自訂的輸出有效性檢查（如 HTML 是否完整）
+
+    Returns:
+        第一個有效的回應；全部路由都只產出無效輸出時回傳最後一個（交由階段驗證與重試策略處理）
+
+    Raises:
+        全部路由都拋出例外時，拋出最後一個例外
+    """
+    router = get_model_router()
+    check = is_valid or ((lambda text: is_valid_json_output(text, schema)) if expect_json else None)
+    candidates = router.candidates(stage)
+    last_error = None
+    last_output = None
+
+    attempted = 0
+    for index, route in enumerate(candidates):
+        # 最後一條且尚未嘗試任何路由時強制放行，避免整個階段無路可走
+        if not router.acquire(route, force=attempted == 0 and index == len(candidates) - 1):
+            logger.info(f"  🔌 [{stage}] {route} 斷路中（試探已由其他呼叫佔用），略過")
+            continue
+        attempted += 1
+        if index > 0:
+            logger.warning(f"  🔀 [{stage}] 改用備援模型 {route}")
+        started = time.monotonic()
+        clear_last_call_metrics()
+        try:
+            output = _call_route(route, system_instruction, user_prompt, temperature, max_tokens,
+                                 on_member, expect_json, response_format_for(route.provider, stage, schema),
+                                 is_valid=check)
+        except Exception as e:
+            if is_programming_error(e):
+                router.release(route)
+                raise
+            latency = time.monotonic() - started
+            router.record(route, ok=False, latency=latency)
+            _emit_usage(stage, route, 'error', latency, index > 0, getattr(_thread_metrics, 'value', {}), e)
+            logger.warning(f"  ⚠️ [{stage}] {route} 呼叫失敗: {e}")
+            last_error = e
+            continue
+
+        latency = time.monotonic() - started
+        metrics = getattr(_thread_metrics, 'value', {})
+        valid = check(output) if check else bool(output)
+        if metrics.get('cached', False):
+            router.release(route)
+        else:
+            router.record(route, ok=valid, latency=latency)
+        _emit_usage(stage, route, 'success' if valid else 'invalid', latency, index > 0, metrics)
+        _thread_metrics.value = {**metrics, 'route': str(route), 'fallback': index > 0}
+        if valid:
+            return output
+        logger.warning(f"  ⚠️ [{stage}] {route} 輸出無效")
+        last_output = output
+
+    if last_output is not None:
+        return last_output
+    if last_error is not None:
+        raise last_error
+    raise ConfigError(f"❌ 階段 {stage} 沒有可用的模型路由")
 
 
 # ============================================
@@ -138,34 +558,41 @@ def call_openai(system_instruction: str, user_prompt: str, model: str = "gpt-4.1
 # AI 處理函數
 # ============================================
 
-@retry_on_failure(max_retries=2, delay=5)
-def process_with_data_alchemist(filtered_news: List[Dict], today_date: str) -> str:
-    """數據煉金術師 - 使用 DeepSeek，分析原始新聞並產出結構化 JSON"""
+def process_with_data_alchemist(filtered_news: List[Dict], today_date: str,
+                                on_category: Optional[Callable[[str, Any], None]] = None) -> str:
+    """
+    數據煉金術師 - 使用 DeepSeek，分析原始新聞並產出結構化 JSON
+
+    on_category(category, items) 會在串流中每個分類完成時呼叫
+    """
     logger.info("⚗️  數據煉金術師處理中...")
 
-    news_data = [{'title': item['title'], 'link': item['link'], 'content': item['content']}
-                 for item in filtered_news]
+    packed = pack_news_items(filtered_news, ALCHEMIST_PROMPT_TOKEN_BUDGET)
+    logger.info(f"  📦 Prompt 打包: {packed.summary()}（預算 {ALCHEMIST_PROMPT_TOKEN_BUDGET}）")
+    for dropped in packed.dropped:
+        logger.info(f"    ✂️  捨棄 [{dropped['relevance_score']}分] {dropped['title'][:60]}")
+    news_data = packed.items
 
     user_prompt = f"""新聞標題
-{json.dumps([n['title'] for n in news_data], ensure_ascii=False, indent=2)}
+{json.dumps([n['title'] for n in news_data], ensure_ascii=False)}
 
 超鏈結
-{json.dumps([n['link'] for n in news_data], ensure_ascii=False, indent=2)}
+{json.dumps([n['link'] for n in news_data], ensure_ascii=False)}
 
 新聞內容
-{json.dumps([n['content'] for n in news_data], ensure_ascii=False, indent=2)}
+{json.dumps([n['content'] for n in news_data], ensure_ascii=False)}
 
 今日日期
 {today_date}"""
 
-    output = call_deepseek(DATA_ALCHEMIST_SYSTEM_PROMPT, user_prompt)
+    output = call_routed('alchemist', DATA_ALCHEMIST_SYSTEM_PROMPT, user_prompt, max_tokens=ALCHEMIST_MAX_TOKENS,
+                         on_member=on_category, expect_json=True, schema=ALCHEMIST_SCHEMA)
     logger.info("✅ 數據煉金術師處理完成")
     return output
 
 
-@retry_on_failure(max_retries=2, delay=3)
 def process_with_tech_narrator(alchemist_json: Dict, today_date: str) -> str:
-    """科技導讀人 - 使用 OpenAI，將結構化新聞轉為 Notion 日報"""
+    """科技導讀人 - 使用 OpenAI（備援 DeepSeek），將結構化新聞轉為 Notion 日報"""
     logger.info("📰 科技導讀人處理中...")
 
     user_prompt = f"""數據煉金術師 OUTPUT: {json.dumps(alchemist_json, ensure_ascii=False)}
@@ -173,14 +600,108 @@ def process_with_tech_narrator(alchemist_json: Dict, today_date: str) -> str:
 今日日期
 {today_date}"""
 
-    output = call_openai(TECH_NARRATOR_SYSTEM_PROMPT, user_prompt)
+    output = call_routed('narrator', TECH_NARRATOR_SYSTEM_PROMPT, user_prompt, expect_json=True,
+                         schema=NARRATOR_SCHEMA)
     logger.info("✅ 科技導讀人處理完成")
     return output
 
 
-@retry_on_failure(max_retries=2, delay=3)
+def _plan_narrator_sections(alchemist_json: Dict) -> List[tuple]:
+    """
+    依煉金術師的排序決定各章節的新聞
+
+    全部新聞依 (rank, 分類順序) 排序，前 NARRATOR_TOP_PICKS 則進今日必讀，
+    其餘取到總數 NARRATOR_MAX_ITEMS 為止，分回各分類章節。
+
+    Returns:
+        [(章節標題, [新聞, ...]), ...]（依日報章節順序，略過空章節）
+    """
+    categories = list(NARRATOR_SECTIONS) + [c for c in alchemist_json if c not in NARRATOR_SECTIONS]
+    ranked = []
+    for order, category in enumerate(categories):
+        items = alchemist_json.get(category)
+        if not isinstance(items, list):
+            continue
+        for position, item in enumerate(items):
+            if isinstance(item, dict):
+                rank = item.get('rank') if isinstance(item.get('rank'), int) else position + 1
+                ranked.append((rank, order, position, category, item))
+    ranked.sort(key=lambda r: r[:3])
+
+    top = [r[4] for r in ranked[:NARRATOR_TOP_PICKS]]
+    rest = ranked[NARRATOR_TOP_PICKS:NARRATOR_MAX_ITEMS]
+
+    sections = [(NARRATOR_TOP_HEADING, top)] if top else []
+    for category in categories:
+        items = [r[4] for r in sorted(rest, key=lambda r: r[2]) if r[3] == category]
+        if items:
+            heading = NARRATOR_SECTIONS.get(category, f"### {category}")
+            sections.append((heading, items))
+    return sections
+
+
+def _narrate_section(heading: str, items: List[Dict], today_date: str) -> str:
+    """撰寫單一章節，回傳 Markdown"""
+    user_prompt = f"""章節標題
+{heading}
+
+本章節新聞（依序編號 1 起）
+{json.dumps(items, ensure_ascii=False)}
+
+今日日期
+{today_date}"""
+    output = call_routed('narrator', TECH_NARRATOR_SECTION_SYSTEM_PROMPT, user_prompt, expect_json=True,
+                         schema=NARRATOR_SECTION_SCHEMA)
+    text = validate_json_output(output, f"科技導讀人 {heading}", NARRATOR_SECTION_SCHEMA)['section_text'].strip()
+    if not text.startswith(heading):
+        text = f"{heading}\n\n{text}"
+    return text
+
+
+def _narrate_closing(alchemist_json: Dict, today_date: str) -> str:
+    """撰寫日報後記（只送標題與實用要點）"""
+    digest = [
+        {'title': item.get('title', ''), 'practical_takeaways': item.get('practical_takeaways', [])}
+        for items in alchemist_json.values() if isinstance(items, list)
+        for item in items if isinstance(item, dict)
+    ]
+    user_prompt = f"""今日新聞摘要
+{json.dumps(digest, ensure_ascii=False)}
+
+今日日期
+{today_date}"""
+    output = call_routed('narrator', TECH_NARRATOR_CLOSING_SYSTEM_PROMPT, user_prompt, expect_json=True,
+                         schema=NARRATOR_CLOSING_SCHEMA)
+    return validate_json_output(output, "科技導讀人 日報後記", NARRATOR_CLOSING_SCHEMA)['closing_text'].strip()
+
+
+def process_with_tech_narrator_fanout(alchemist_json: Dict, today_date: str,
+                                      max_workers: int = NARRATOR_FANOUT_WORKERS) -> str:
+    """
+    科技導讀人（分類平行模式）- 各章節與日報後記同時撰寫後組裝
+
+    延遲約等於最長章節，而非整份日報。輸出格式與 process_with_tech_narrator 相同。
+    """
+    sections = _plan_narrator_sections(alchemist_json)
+    logger.info(f"📰 科技導讀人平行處理中（{len(sections)} 個章節 + 後記，併發 {max_workers}）...")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        section_futures = [pool.submit(_narrate_section, heading, items, today_date)
+                           for heading, items in sections]
+        closing_future = pool.submit(_narrate_closing, alchemist_json, today_date)
+        section_texts = [f.result() for f in section_futures]
+        closing_text = closing_future.result()
+
+    report = f"## 🤖 AI 科技日報精選\n**日期:** {today_date}\n\n" + "\n\n".join(section_texts)
+    if closing_text:
+        report += f"\n\n---\n\n📬 **日報後記**\n{closing_text}"
+
+    logger.info("✅ 科技導讀人處理完成")
+    return json.dumps({'notion_daily_report_text': report}, ensure_ascii=False)
+
+
 def process_with_editor_in_chief(narrator_json: Dict, today_date: str) -> str:
-    """總編輯 - 使用 OpenAI，產出 LINE 精華版"""
+    """總編輯 - 使用 OpenAI（備援 DeepSeek），產出 LINE 精華版"""
     logger.info("✍️  總編輯處理中...")
 
     notion_text = narrator_json.get('notion_daily_report_text', '')
@@ -190,284 +711,18 @@ def process_with_editor_in_chief(narrator_json: Dict, today_date: str) -> str:
 今日日期
 {today_date}"""
 
-    output = call_openai(EDITOR_IN_CHIEF_SYSTEM_PROMPT, user_prompt)
+    output = call_routed('editor', EDITOR_IN_CHIEF_SYSTEM_PROMPT, user_prompt, expect_json=True,
+                         schema=EDITOR_SCHEMA)
     logger.info("✅ 總編輯處理完成")
     return output
 
 
-@retry_on_failure(max_retries=2, delay=3)
 def process_with_html_generator(notion_content: str, line_content: str, today_date: str) -> str:
-    """HTML 生成器 - 使用 DeepSeek，將 Markdown 內容轉為完整 HTML 頁面"""
+    """HTML 生成器 - 使用 DeepSeek（備援 OpenAI），將 Markdown 內容轉為完整 HTML 頁面"""
     logger.info("🎨 HTML 生成器處理中...")
 
-    user_prompt = f"""請基於以下標準範本，將 n8n 新聞內容格式化為完全相同的格式。
-
-標準範本 HTML:
-<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>2025-09-23 AI 科技日報 | Thinker News</title>
-    <meta name="description" content="Nvidia投資OpenAI巨額資金，AI安全挑戰並存 - 今日AI科技重點新聞精選">
-    <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🤖</text></svg>">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Microsoft JhengHei', sans-serif;
-            line-height: 1.7;
-            color: #333;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }}
-
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-
-        .back-link {{
-            display: inline-block;
-            margin-bottom: 20px;
-            color: white;
-            text-decoration: none;
-            background: rgba(255, 255, 255, 0.2);
-            padding: 10px 20px;
-            border-radius: 20px;
-            transition: all 0.3s ease;
-            backdrop-filter: blur(10px);
-        }}
-
-        .back-link:hover {{
-            background: rgba(255, 255, 255, 0.3);
-            transform: translateX(-5px);
-        }}
-
-        .article-header {{
-            text-align: center;
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 40px 30px;
-            margin-bottom: 30px;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-        }}
-
-        .article-date {{
-            font-size: 1.1em;
-            color: #667eea;
-            font-weight: 600;
-            margin-bottom: 15px;
-        }}
-
-        .article-title {{
-            font-size: 2.2em;
-            font-weight: 800;
-            margin-bottom: 20px;
-            background: linear-gradient(45deg, #667eea, #764ba2);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            line-height: 1.3;
-        }}
-
-        .article-subtitle {{
-            font-size: 1.2em;
-            color: #666;
-            font-weight: 400;
-        }}
-
-        .content-section {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 40px;
-            margin-bottom: 30px;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-        }}
-
-        .content-section h2 {{
-            color: #667eea;
-            font-size: 1.6em;
-            margin-bottom: 20px;
-            border-bottom: 2px solid #667eea;
-            padding-bottom: 10px;
-            font-weight: 700;
-        }}
-
-        .content-section h3 {{
-            color: #555;
-            font-size: 1.3em;
-            margin: 25px 0 15px;
-            font-weight: 600;
-        }}
-
-        .content-section p {{
-            margin-bottom: 15px;
-            line-height: 1.7;
-            font-size: 1.05em;
-        }}
-
-        .content-section ul {{
-            margin: 15px 0;
-            padding-left: 20px;
-        }}
-
-        .content-section li {{
-            margin-bottom: 10px;
-            line-height: 1.6;
-        }}
-
-        .highlight-box {{
-            background: linear-gradient(135deg, #667eea20, #764ba220);
-            border-left: 4px solid #667eea;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 0 15px 15px 0;
-        }}
-
-        .news-link {{
-            color: #667eea;
-            text-decoration: none;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }}
-
-        .news-link:hover {{
-            color: #764ba2;
-            text-decoration: underline;
-        }}
-
-        .external-link::after {{
-            content: " 🔗";
-            font-size: 0.8em;
-        }}
-
-        .footer-nav {{
-            text-align: center;
-            padding: 30px;
-            color: white;
-        }}
-
-        .nav-button {{
-            display: inline-block;
-            background: rgba(255, 255, 255, 0.2);
-            color: white;
-            text-decoration: none;
-            padding: 12px 24px;
-            border-radius: 25px;
-            margin: 0 10px;
-            transition: all 0.3s ease;
-            backdrop-filter: blur(10px);
-        }}
-
-        .nav-button:hover {{
-            background: rgba(255, 255, 255, 0.3);
-            transform: translateY(-2px);
-        }}
-
-        @media (max-width: 600px) {{
-            .container {{
-                padding: 15px;
-            }}
-
-            .article-header {{
-                padding: 25px 20px;
-            }}
-
-            .article-title {{
-                font-size: 1.8em;
-            }}
-
-            .content-section {{
-                padding: 25px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <a href="./index.html" class="back-link">← 返回首頁</a>
-
-        <header class="article-header">
-            <div class="article-date">📅 2025年9月23日</div>
-            <h1 class="article-title">🤖 AI 科技日報精選</h1>
-            <p class="article-subtitle">Nvidia投資OpenAI巨額資金，AI安全挑戰並存</p>
-        </header>
-
-        <div class="content-section">
-            <h2>✨ 今日必讀 TOP 3</h2>
-
-            <h3>1. Nvidia投資OpenAI高達1000億美元</h3>
-            <p>Nvidia 與 OpenAI 達成協議，部署價值10千萬瓦的 AI 晶片，目的為推動下一代的ChatGPT。這顯示出 AI 領域的龍頭企業對於人工智慧未來潛力的高度信心。</p>
-            <div class="highlight-box">
-                <strong>💡 學習價值：</strong><br>
-                這筆巨額投資標誌著AI基礎設施建設進入新階段，對於想要學習AI的初學者來說，這意味著更強大的工具和更多的學習資源即將到來。
-            </div>
-            <p><a href="https://techcrunch.com/2025/09/22/nvidia-plans-to-invest-up-to-100b-in-openai/" class="news-link external-link" target="_blank">閱讀更多</a></p>
-
-            <h3>2. ShadowLeak漏洞透過OpenAI ChatGPT洩漏Gmail數據</h3>
-            <p>這是一個重要的安全警報，OpenAI ChatGPT的深度研究代理中的零點擊漏洞可能讓攻擊者通過一封精心製作的電子郵件洩漏敏感的Gmail收件箱數據。</p>
-            <div class="highlight-box">
-                <strong>💡 學習價值：</strong><br>
-                此事提醒我們，在 AI 的發展同時，我們也需要更加關注其帶來的安全問題。初學者應該學習 AI 資安的基礎知識。
-            </div>
-            <p><a href="https://thehackernews.com/2025/09/shadowleak-zero-click-flaw-leaks-gmail.html" class="news-link external-link" target="_blank">閱讀更多</a></p>
-
-            <h3>3. 基礎設施交易推動AI繁榮</h3>
-            <p>大型科技公司如 Meta、Oracle、Microsoft、Google 和 OpenAI 的大筆支出推動 AI 的興起。</p>
-            <div class="highlight-box">
-                <strong>💡 學習價值：</strong><br>
-                這不僅反映出 AI 的重要性，更顯示出了其在產業界的影響力。初學者可以從中了解 AI 產業的發展趨勢。
-            </div>
-            <p><a href="https://techcrunch.com/2025/09/22/the-billion-dollar-infrastructure-deals-powering-the-ai-boom/" class="news-link external-link" target="_blank">閱讀更多</a></p>
-        </div>
-
-        <div class="content-section" style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); color: white;">
-            <h2 style="color: white; border-bottom: 3px solid white;">📱 LINE 精華版</h2>
-            <div style="background: rgba(255,255,255,0.1); padding: 20px; border-radius: 15px; margin: 20px 0;">
-                <h3>🤖 今日AI重點 (LINE版)</h3>
-                <p><strong>💰 大新聞：</strong>Nvidia砸1000億美元投資OpenAI，推動下一代ChatGPT！</p>
-            </div>
-
-            <div style="text-align: center; margin-top: 20px;">
-                <p style="font-size: 0.9em; opacity: 0.8;">
-                    💡 此精華版專為LINE推送設計 | 完整分析請閱讀上方詳細報告
-                </p>
-            </div>
-        </div>
-
-        <div class="footer-nav">
-            <a href="./index.html" class="nav-button">🏠 返回首頁</a>
-            <a href="https://github.com/ThinkerCafe-tw/thinker-news" class="nav-button" target="_blank">⭐ GitHub</a>
-        </div>
-    </div>
-
-    <script>
-        // 頁面載入動畫
-        document.addEventListener('DOMContentLoaded', function() {{
-            const sections = document.querySelectorAll('.content-section');
-            sections.forEach((section, index) => {{
-                section.style.opacity = '0';
-                section.style.transform = 'translateY(20px)';
-                setTimeout(() => {{
-                    section.style.transition = 'all 0.6s ease';
-                    section.style.opacity = '1';
-                    section.style.transform = 'translateY(0)';
-                }}, index * 150);
-            }});
-        }});
-    </script>
-<script src="./thinker_secret_entrance.js"></script>
-</body>
-</html>
-
+    # 靜態範本在前、當日內容在後，讓供應商的 prompt 前綴快取能命中
+    user_prompt = f"""{HTML_GENERATOR_TEMPLATE_PROMPT}
 要替換的內容:
 - 日期: {today_date}
 - 新聞內容: 以下 n8n 內容
@@ -478,16 +733,10 @@ n8n 新聞內容:
 LINE消息版：
 {line_content}
 
-執行指令:
-1. 使用標準範本的完整格式
-2. 只替換日期和新聞內容
-3. 保持所有 CSS 和 JavaScript 不變
-4. 確保輸出結束於 </html>
-5. 不要添加任何說明文字
-
 請輸出完整的 HTML 代碼"""
 
-    output = call_deepseek(HTML_GENERATOR_SYSTEM_PROMPT, user_prompt, temperature=0.3)
+    output = call_routed('html', HTML_GENERATOR_SYSTEM_PROMPT, user_prompt, temperature=0.3,
+                         is_valid=lambda text: '</html>' in text)
 
     # 清理可能的 markdown 代碼塊標記
     if output.startswith('```html'):
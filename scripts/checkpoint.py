@@ -0,0 +1,121 @@
+"""
+Pipeline 階段檢查點
+每個階段的輸出連同「輸入雜湊」存在 data/<date>/<stage>.json。
+重跑時（--resume）輸入雜湊相同的階段直接載入輸出，後段失敗後的復原
+不必重新讀 RSS、也不必重打前面的 LLM 呼叫。
+
+階段順序：rss → filter → alchemist → narrator → editor → html
+--from-stage 指定的階段（含）之後一律重新執行。
+
+檔案格式：
+    {"stage": ..., "input_hash": ..., "output_hash": ..., "saved_at": ..., "output": ...}
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Optional, Union
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+CHECKPOINT_ROOT = Path("data")
+
+STAGES = ('rss', 'filter', 'alchemist', 'narrator', 'editor', 'html')
+
+
+def content_hash(*parts: Any) -> str:
+    """對任意可 JSON 序列化的內容計算穩定雜湊"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    單日的階段檢查點
+
+    Args:
+        date: YYYY-MM-DD
+        resume: 是否載入既有檢查點（否則只寫不讀）
+        from_stage: 從此階段起強制重跑（None 表示不強制）
+    """
+
+    def __init__(self, date: str, resume: bool = False, from_stage: Optional[str] = None,
+                 root: Path = CHECKPOINT_ROOT):
+        if from_stage is not None and from_stage not in STAGES:
+            raise ValueError(f"未知的階段: {from_stage}（可用: {', '.join(STAGES)}）")
+        self.dir = Path(root) / date
+        self.resume = resume or from_stage is not None
+        self.from_index = STAGES.index(from_stage) if from_stage else len(STAGES)
+        self._output_hashes = {}
+
+    def _path(self, stage: str) -> Path:
+        return self.dir / f"{stage}.json"
+
+    def output_hash(self, stage: str) -> Optional[str]:
+        """本次執行中該階段輸出的雜湊（供下游計算輸入雜湊）"""
+        return self._output_hashes.get(stage)
+
+    def load(self, stage: str, input_hash: str) -> Optional[Any]:
+        """
+        載入檢查點；未啟用 resume、階段需重跑、檔案不存在或輸入雜湊不符時回 None
+        """
+        if not self.resume or STAGES.index(stage) >= self.from_index:
+            return None
+
+        path = self._path(stage)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"  ⚠️  檢查點損毀，重新執行: {path} ({e})")
+            return None
+
+        if record.get('input_hash') != input_hash:
+            logger.info(f"  🔁 [{stage}] 輸入已變更，重新執行")
+            return None
+
+        self._output_hashes[stage] = record.get('output_hash') or content_hash(record.get('output'))
+        logger.info(f"  ⏭️  [{stage}] 輸入未變更，載入檢查點 {path}")
+        return record.get('output')
+
+    def save(self, stage: str, input_hash: str, output: Any):
+        """寫入檢查點（原子寫入）"""
+        output_hash = content_hash(output)
+        self._output_hashes[stage] = output_hash
+        record = {
+            'stage': stage,
+            'input_hash': input_hash,
+            'output_hash': output_hash,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'output': output,
+        }
+
+        path = self._path(stage)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"  ⚠️  檢查點寫入失敗: {path} ({e})")
+            tmp_path.unlink(missing_ok=True)
+
+    def run(self, stage: str, input_hash: Union[str, Callable[[], str]], fn, *args, **kwargs) -> Any:
+        """
+        有相符的檢查點就載入，否則執行 fn 並保存結果
+
+        input_hash 可為函式：載入前與 fn 執行後各算一次，以執行後的值保存。
+        用於階段本身會改變輸入狀態的情況（rss 讀取會寫入條目庫 / feed 快取）。
+        """
+        output = self.load(stage, input_hash() if callable(input_hash) else input_hash)
+        if output is not None:
+            return output
+        output = fn(*args, **kwargs)
+        self.save(stage, input_hash() if callable(input_hash) else input_hash, output)
+        return output
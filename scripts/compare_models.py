@@ -8,9 +8,12 @@ import random
 import os
 from pathlib import Path
 from datetime import datetime
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 
+from ai_processor import get_llm_pool
+from prompt_packer import estimate_tokens
+
 # ============================================
 # 模型配置
 # ============================================
@@ -50,24 +53,23 @@ JUDGE_MODELS = {
 }
 
 # ============================================
-# API 客戶端
+# API 客戶端（與主流程共用 ai_processor 的 LLMPool）
 # ============================================
 
-def get_openai_client():
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def get_deepseek_client():
-    return OpenAI(
-        api_key=os.getenv("DEEPSEEK_API_KEY"),
-        base_url="https://api.deepseek.com"
-    )
-
 def get_anthropic_client():
     from anthropic import Anthropic
     return Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
 def init_google():
     genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+def get_pool():
+    """取得共用 LLMPool，並補註冊 OpenAI 相容以外的供應商"""
+    pool = get_llm_pool()
+    pool.ensure('anthropic', get_anthropic_client, rpm=50, tpm=80_000, max_concurrency=4)
+    pool.ensure('google', init_google, rpm=60, tpm=1_000_000, max_concurrency=4)
+    return pool
 
 # ============================================
 # 模型調用
@@ -77,47 +79,33 @@ def call_model(model_config: dict, system: str, user: str) -> str:
     """統一調用不同模型"""
     provider = model_config["provider"]
     model = model_config["model"]
+    pool = get_pool()
+    estimated = estimate_tokens(system) + estimate_tokens(user) + 4096
 
     try:
         if provider == "openai":
-            client = get_openai_client()
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user}
-                ],
-                temperature=0.7
-            )
-            return resp.choices[0].message.content
+            return pool.complete("openai", model, system, user, temperature=0.7)
 
         elif provider == "deepseek":
-            client = get_deepseek_client()
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user}
-                ],
-                temperature=0.7,
-                max_tokens=4096
-            )
-            return resp.choices[0].message.content
+            return pool.complete("deepseek", model, system, user, temperature=0.7, max_tokens=4096)
 
         elif provider == "google":
-            init_google()
-            gmodel = genai.GenerativeModel(model)
-            resp = gmodel.generate_content(f"{system}\n\n{user}")
+            google = pool.client("google")
+            with pool.limit("google", estimated):
+                gmodel = google.GenerativeModel(model)
+                resp = gmodel.generate_content(f"{system}\n\n{user}")
             return resp.text
 
         elif provider == "anthropic":
-            client = get_anthropic_client()
-            resp = client.messages.create(
-                model=model,
-                max_tokens=4096,
-                system=system,
-                messages=[{"role": "user", "content": user}]
-            )
+            client = pool.client("anthropic")
+            with pool.limit("anthropic", estimated) as lease:
+                resp = client.messages.create(
+                    model=model,
+                    max_tokens=4096,
+                    system=system,
+                    messages=[{"role": "user", "content": user}]
+                )
+                lease.settle(resp.usage.input_tokens + resp.usage.output_tokens)
             return resp.content[0].text
 
     except Exception as e:
@@ -201,19 +189,21 @@ def run_experiment(date: str, sample_size: int = 3):
     for i, news in enumerate(samples, 1):
         print(f"\n--- 新聞 {i}/{len(samples)}: {news.get('title', 'N/A')[:50]}... ---\n")
 
-        # 2. 每個 CP 模型生成摘要
-        outputs = {}
-        for name, config in CP_MODELS.items():
-            print(f"  🔄 {name}...", end=" ", flush=True)
-            prompt = TASK_PROMPT.format(
-                title=news.get('title', ''),
-                source=news.get('source', ''),
-                summary=news.get('summary', ''),
-                link=news.get('link', '')
-            )
-            output = call_model(config, "你是專業的 AI 科技新聞編輯。", prompt)
-            outputs[name] = output
-            print("✅" if not output.startswith("[ERROR]") else "❌")
+        # 2. 每個 CP 模型同時生成摘要（限流由 LLMPool 控制）
+        prompt = TASK_PROMPT.format(
+            title=news.get('title', ''),
+            source=news.get('source', ''),
+            summary=news.get('summary', ''),
+            link=news.get('link', '')
+        )
+        with ThreadPoolExecutor(max_workers=len(CP_MODELS)) as executor:
+            futures = {
+                name: executor.submit(call_model, config, "你是專業的 AI 科技新聞編輯。", prompt)
+                for name, config in CP_MODELS.items()
+            }
+            outputs = {name: future.result() for name, future in futures.items()}
+        for name, output in outputs.items():
+            print(f"  🔄 {name}... {'✅' if not output.startswith('[ERROR]') else '❌'}")
 
         # 3. 頂配模型評審（用第一個可用的）
         outputs_text = "\n\n".join([
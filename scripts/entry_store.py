@@ -0,0 +1,203 @@
+"""
+增量新聞條目庫
+以 (來源, 條目 key) 記錄看過的 RSS 條目、指紋、發佈日與正規化後的內容。
+
+- 讀取 RSS 時只有新出現或內容變更（指紋不同）的條目會被正規化並寫入
+- 篩選時當日候選清單直接從「發佈日索引」取出，不必重掃整個 feed
+- 評分結果連同評分版本一起保存，篩選設定未變時不重算
+
+儲存於 SQLite（data/entry_store.sqlite3），多執行緒共用一個連線（以 lock 保護）。
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Iterable, Tuple
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+ENTRY_STORE_PATH = Path("data") / "entry_store.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    source        TEXT NOT NULL,
+    entry_key     TEXT NOT NULL,
+    fingerprint   TEXT NOT NULL,
+    pub_day       TEXT NOT NULL,
+    item          TEXT NOT NULL,
+    score         INTEGER,
+    score_version TEXT,
+    first_seen    TEXT NOT NULL,
+    PRIMARY KEY (source, entry_key)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_pub_day ON entries (pub_day);
+"""
+
+# SQLite 單一查詢參數上限保守值
+_IN_CHUNK = 500
+
+
+def entry_key(title: str, link: str) -> str:
+    """條目識別 key：優先用連結，無連結時退回標題"""
+    return link or title
+
+
+def entry_fingerprint(title: str, content: str, pub_date: str) -> str:
+    """條目內容指紋：標題、摘要、發佈時間任一改變即視為變更"""
+    raw = f"{title}\x1f{content}\x1f{pub_date}".encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+
+def item_fingerprint(item: Dict) -> str:
+    """對已正規化的新聞 dict 計算指紋（與 raw entry 計算結果一致）"""
+    return entry_fingerprint(item.get('title', ''), item.get('content', ''), item.get('pubDate', ''))
+
+
+class EntryStore:
+    """持久化的 RSS 條目庫（thread-safe）"""
+
+    def __init__(self, db_path: Path = ENTRY_STORE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def current_fingerprints(self, source: str, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        查詢指定條目目前保存的指紋
+
+        Args:
+            source: 來源名稱
+            keys: 條目 key 列表
+
+        Returns:
+            {entry_key: fingerprint}（未見過的 key 不會出現）
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[i:i + _IN_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT entry_key, fingerprint FROM entries "
+                    f"WHERE source = ? AND entry_key IN ({placeholders})",
+                    [source, *chunk],
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def filter_new(self, source: str, items: List[Dict]) -> List[Dict]:
+        """從已正規化的條目中挑出新出現或已變更者"""
+        known = self.current_fingerprints(source, (entry_key(i.get('title', ''), i.get('link', '')) for i in items))
+        return [
+            item for item in items
+            if known.get(entry_key(item.get('title', ''), item.get('link', ''))) != item_fingerprint(item)
+        ]
+
+    def add(self, source: str, items: List[Dict], undated_day: str):
+        """
+        寫入新的或已變更的條目（變更時清除舊評分）
+
+        Args:
+            source: 來源名稱
+            items: 正規化後的新聞 dict
+            undated_day: 沒有發佈時間的條目要歸入哪一天的索引
+        """
+        if not items:
+            return
+
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for item in items:
+            iso_date = item.get('isoDate') or ''
+            rows.append((
+                source,
+                entry_key(item.get('title', ''), item.get('link', '')),
+                item_fingerprint(item),
+                iso_date[:10] if iso_date else undated_day,
+                json.dumps(item, ensure_ascii=False, separators=(',', ':')),
+                now,
+            ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO entries (source, entry_key, fingerprint, pub_day, item, first_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, entry_key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    pub_day = excluded.pub_day,
+                    item = excluded.item,
+                    score = NULL,
+                    score_version = NULL
+                """,
+                rows,
+            )
+
+    def day_digest(self, day: str) -> str:
+        """某發佈日所有條目 (來源, key, 指紋) 的雜湊；有條目新增或變更時即改變"""
+        digest = hashlib.sha1()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, entry_key, fingerprint FROM entries WHERE pub_day = ? ORDER BY source, entry_key",
+                (day,),
+            ).fetchall()
+        for row in rows:
+            digest.update('\x1f'.join(row).encode('utf-8') + b'\x1e')
+        return digest.hexdigest()
+
+    def items_for_day(self, day: str, score_version: str) -> List[Dict]:
+        """
+        取出某發佈日的所有條目
+
+        Args:
+            day: YYYY-MM-DD
+            score_version: 目前的評分版本；版本相符的條目會帶上 relevance_score
+
+        Returns:
+            新聞 dict 列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item, score, score_version FROM entries WHERE pub_day = ? ORDER BY rowid",
+                (day,),
+            ).fetchall()
+
+        items = []
+        for item_json, score, version in rows:
+            item = json.loads(item_json)
+            if score is not None and version == score_version:
+                item['relevance_score'] = score
+            items.append(item)
+        return items
+
+    def save_scores(self, scored: List[Tuple[Dict, int]], score_version: str):
+        """保存評分結果：[(item, score), ...]"""
+        if not scored:
+            return
+        rows = [
+            (score, score_version, item.get('source', 'unknown'),
+             entry_key(item.get('title', ''), item.get('link', '')))
+            for item, score in scored
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE entries SET score = ?, score_version = ? WHERE source = ? AND entry_key = ?",
+                rows,
+            )
@@ -0,0 +1,222 @@
+"""
+執行事件日誌（append-only JSONL）
+ExecutionLogger 的每個節點事件發生當下即寫入一行並 flush，程序中途崩潰也保有完整的前段紀錄；
+超過 INLINE_PAYLOAD_BYTES 的內容（AI 全文輸出等）寫到以 sha256 命名的旁檔，事件中只留參照，
+記憶體用量不隨輸出大小成長。
+
+檔案配置:
+    data/runs/<execution_id>.events.jsonl
+    data/runs/blobs/<hash 前 2 碼>/<sha256>.json
+
+execution_log.json 由事件重建（build_execution_view / write_execution_view），
+崩潰後可手動重建:
+    python scripts/event_log.py data/runs/<execution_id>.events.jsonl -o execution_log.json
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+EVENT_LOG_DIR = Path('data/runs')
+INLINE_PAYLOAD_BYTES = 2048      # 超過即寫入旁檔
+BLOB_PREVIEW_CHARS = 200         # 參照中保留的前綴預覽
+KEEP_RUNS = 30                   # 保留最近幾次執行的事件檔（其餘與不再被參照的旁檔一併清除）
+
+BLOB_KEY = '$blob'
+
+
+class EventSink:
+    """
+    單次執行的事件寫入器（thread-safe）
+
+    Args:
+        execution_id: 執行 ID（事件檔名）
+        root: 事件目錄
+    """
+
+    def __init__(self, execution_id: str, root: Path = EVENT_LOG_DIR):
+        self.root = Path(root)
+        self.blob_dir = self.root / 'blobs'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / f"{execution_id}.events.jsonl"
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def emit(self, event: str, **fields):
+        """寫入一個事件並立即 flush"""
+        with self._lock:
+            self._seq += 1
+            line = json.dumps({'seq': self._seq, 'ts': datetime.now().isoformat(), 'event': event, **fields},
+                              ensure_ascii=False, default=str)
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def payload(self, data: Any) -> Any:
+        """小內容原樣回傳；大內容寫入旁檔並回傳參照 {'$blob', 'bytes', 'preview'}"""
+        if data is None:
+            return None
+        encoded = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        if len(encoded) <= INLINE_PAYLOAD_BYTES:
+            return data
+        digest = hashlib.sha256(encoded).hexdigest()
+        path = self.blob_dir / digest[:2] / f"{digest}.json"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.tmp{threading.get_ident()}')
+            tmp.write_bytes(encoded)
+            os.replace(tmp, path)
+        preview = data if isinstance(data, str) else encoded.decode('utf-8')
+        return {BLOB_KEY: f"sha256:{digest}", 'bytes': len(encoded), 'preview': preview[:BLOB_PREVIEW_CHARS]}
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_KEY in value
+
+
+def resolve_blob(ref: Dict[str, Any], root: Path = EVENT_LOG_DIR) -> Any:
+    """讀回旁檔內容；旁檔遺失時回傳參照本身"""
+    digest = ref[BLOB_KEY].split(':', 1)[1]
+    path = Path(root) / 'blobs' / digest[:2] / f"{digest}.json"
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        logger.warning(f"⚠️ 找不到事件旁檔 {digest[:12]}，保留參照")
+        return ref
+
+
+def read_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """逐行讀取事件（略過崩潰時寫到一半的最後一行）"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ 略過不完整的事件行: {line[:80]}")
+
+
+def build_execution_view(events_path: Path) -> Dict[str, Any]:
+    """
+    由事件重建 execution_log.json 的結構（大內容維持參照，不載入記憶體）
+
+    崩潰中斷的執行：status 保持 running，未結束的節點也保持 running
+    """
+    view: Dict[str, Any] = {}
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for ev in read_events(events_path):
+        kind = ev['event']
+        if kind == 'run_start':
+            view = {
+                'execution_id': ev['execution_id'], 'trace_id': ev.get('trace_id'),
+                'start_time': ev['ts'], 'end_time': None, 'status': 'running',
+                'nodes': [], 'llm_calls': [], 'usage': None,
+            }
+        elif kind == 'node_start':
+            node = {
+                'name': ev['name'], 'type': ev['type'], 'description': ev.get('description', ''),
+                'status': 'running', 'start_time': ev['ts'], 'end_time': None, 'duration': None,
+                'input': None, 'output': None, 'error': None, 'metrics': {},
+            }
+            view.setdefault('nodes', []).append(node)
+            nodes[ev['name']] = node
+        elif kind in ('node_input', 'node_success', 'node_error', 'node_attempt') and ev['name'] in nodes:
+            node = nodes[ev['name']]
+            if kind == 'node_input':
+                node['input'] = ev.get('input')
+            elif kind == 'node_attempt':
+                node.setdefault('attempts', []).append(ev['attempt'])
+            else:
+                node['status'] = 'success' if kind == 'node_success' else 'error'
+                node['end_time'] = ev['ts']
+                node['duration'] = ev.get('duration')
+                if kind == 'node_success':
+                    if ev.get('output') is not None:
+                        node['output'] = ev['output']
+                    if ev.get('metrics'):
+                        node['metrics'] = ev['metrics']
+                else:
+                    node['error'] = ev.get('error')
+        elif kind == 'llm_call':
+            view.setdefault('llm_calls', []).append(ev['record'])
+        elif kind == 'run_complete':
+            view.update(end_time=ev['ts'], status=ev['status'], duration=ev.get('duration'), usage=ev.get('usage'))
+    return view
+
+
+def _dump_indented(value: Any, depth: int) -> str:
+    """json.dumps(indent=2) 後整段縮排 depth 層（字串內的換行已跳脫，只會動到格式換行）"""
+    return json.dumps(value, ensure_ascii=False, indent=2, default=str).replace('\n', '\n' + '  ' * depth)
+
+
+def write_execution_view(events_path: Path, filepath: str = "execution_log.json", root: Path = EVENT_LOG_DIR):
+    """
+    寫出 execution_log.json（旁檔內容展開成原本的完整輸出）
+
+    頂層欄位逐一序列化，節點逐一展開、逐一寫出，同一時間只有一個大內容在記憶體中。
+    """
+    view = build_execution_view(events_path)
+    nodes = view.pop('nodes', [])
+    tmp = f"{filepath}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        for key, value in view.items():
+            f.write(f'  {json.dumps(key, ensure_ascii=False)}: {_dump_indented(value, 1)},\n')
+        f.write('  "nodes": [')
+        for i, node in enumerate(nodes):
+            for key in ('input', 'output'):
+                if is_blob_ref(node.get(key)):
+                    node[key] = resolve_blob(node[key], root)
+            f.write(('\n    ' if i == 0 else ',\n    ') + _dump_indented(node, 2))
+        f.write('\n  ]\n}\n' if nodes else ']\n}\n')
+    os.replace(tmp, filepath)
+
+
+def prune_runs(root: Path = EVENT_LOG_DIR, keep: int = KEEP_RUNS) -> int:
+    """只保留最近 keep 次執行的事件檔，並刪除不再被任何事件檔參照的旁檔；回傳刪除的檔案數"""
+    root = Path(root)
+    runs = sorted(root.glob('*.events.jsonl'))
+    removed = 0
+    for path in runs[:-keep] if keep else runs:
+        path.unlink(missing_ok=True)
+        removed += 1
+
+    referenced = set()
+    for path in root.glob('*.events.jsonl'):
+        text = path.read_text(encoding='utf-8')
+        start = 0
+        marker = f'"{BLOB_KEY}": "sha256:'
+        while (start := text.find(marker, start)) != -1:
+            start += len(marker)
+            referenced.add(text[start:start + 64])
+
+    for blob in (root / 'blobs').glob('*/*.json'):
+        if blob.stem not in referenced:
+            blob.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="由事件日誌重建 execution_log.json")
+    parser.add_argument("events", help="事件檔（data/runs/<execution_id>.events.jsonl）")
+    parser.add_argument("-o", "--output", default="execution_log.json", help="輸出路徑")
+    args = parser.parse_args()
+
+    write_execution_view(Path(args.events), args.output, Path(args.events).parent)
+    print(f"✅ 已重建 {args.output}")
@@ -3,26 +3,209 @@
 記錄 workflow 每個節點的執行狀態和結果
 """
 
+import os
 import json
+import time
+import secrets
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterator
 from pathlib import Path
 
 from log_config import get_logger
+from usage_ledger import summarize_calls
+from event_log import EVENT_LOG_DIR, EventSink, write_execution_view, prune_runs
 logger = get_logger(__name__)
 
+SERVICE_NAME = "thinker-news"
+# 單次執行最多保留的 span 數；超過後新的 span 仍可正常使用，但不再記入追蹤（避免長時間執行記憶體無上限）
+MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', '20000'))
+
+
+class Span:
+    """
+    一段計時區間（perf_counter_ns），可巢狀
+
+    由 ExecutionLogger.start_span / span / record_span 建立，本身即為 O(1) 的 handle。
+    """
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'error', 'thread_id')
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: str, start_ns: int,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.thread_id = threading.get_ident()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, status: str = "ok", error: Optional[BaseException] = None):
+        """結束計時（重複呼叫不會改變第一次的結束時間）"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        self.status = "error" if error is not None else status
+        if error is not None:
+            self.error = f"{type(error).__name__}: {str(error)[:500]}"
+
+    @property
+    def duration_secs(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e9
+
 
 class ExecutionLogger:
-    """執行日誌記錄器"""
+    """
+    執行日誌記錄器 + 輕量 tracer
+
+    節點（log_node_*）是執行的第一層 span；AI 子階段、重試、LLM 呼叫與各 RSS 來源
+    以巢狀 span 記錄。execution_data 維持原本的 execution_log.json 結構，
+    完整的 span 樹可匯出為 Chrome trace（火焰圖）或 OTLP/JSON。
+    """
+
+    def __init__(self, event_dir: Optional[Path] = EVENT_LOG_DIR):
+        """
+        Args:
+            event_dir: 事件日誌目錄（append-only JSONL + 大內容旁檔）；None 表示只保留在記憶體
+        """
+        self._epoch_ns = time.time_ns()
+        self._perf0_ns = time.perf_counter_ns()
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._spans_lock = threading.Lock()
+        self._nodes: Dict[str, Dict] = {}
+        self._node_spans: Dict[str, Span] = {}
+        self._main_thread = threading.get_ident()
+        self._main_stack: List[Span] = []
+        self._local = threading.local()
 
-    def __init__(self):
         self.execution_data = {
             "execution_id": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "trace_id": self.trace_id,
             "start_time": datetime.now().isoformat(),
             "end_time": None,
             "status": "running",
-            "nodes": []
+            "nodes": [],
+            "llm_calls": [],
+            "usage": None
         }
+        self._run_span = self.start_span("daily_run", kind="run", push=True)
+
+        self.events: Optional[EventSink] = None
+        if event_dir is not None:
+            try:
+                self.events = EventSink(self.execution_data["execution_id"], Path(event_dir))
+            except OSError as e:
+                logger.warning(f"⚠️ 無法建立事件日誌，改為只保留在記憶體: {e}")
+        self._emit("run_start", execution_id=self.execution_data["execution_id"], trace_id=self.trace_id)
+
+    def _emit(self, event: str, **fields):
+        if self.events is not None:
+            try:
+                self.events.emit(event, **fields)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ 事件寫入失敗（{event}）: {e}")
+
+    def _payload(self, data: Any) -> Any:
+        """大內容寫入旁檔，記憶體與事件中只留參照"""
+        if self.events is None:
+            return data
+        try:
+            return self.events.payload(data)
+        except OSError as e:
+            logger.warning(f"⚠️ 事件旁檔寫入失敗，改為內嵌: {e}")
+            return data
+
+    # ------------------------------------------------------------------
+    # Span API
+    # ------------------------------------------------------------------
+
+    def _stack(self) -> List[Span]:
+        if threading.get_ident() == self._main_thread:
+            return self._main_stack
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_span(self) -> Optional[Span]:
+        """目前 thread 最內層的 span；工作 thread 沒有自己的 span 時沿用主 thread 的"""
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        return self._main_stack[-1] if self._main_stack else None
+
+    def start_span(self, name: str, kind: str = "internal", parent: Optional[Span] = None,
+                   push: bool = False, **attributes) -> Span:
+        """
+        開始一個 span
+
+        Args:
+            name: span 名稱
+            kind: 類型（run / 節點 type / ai_stage / llm / rss_feed ...）
+            parent: 父 span，預設為 current_span()
+            push: 是否成為目前 thread 的 current span（需以 end_span 結束）
+        """
+        parent = parent or self.current_span()
+        span = Span(name, parent.span_id if parent else None, kind, time.perf_counter_ns(), attributes)
+        with self._spans_lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+                if self.dropped_spans == 1:
+                    logger.warning(f"⚠️ span 數已達上限 {MAX_SPANS}，之後的 span 不再記入追蹤")
+        if push:
+            self._stack().append(span)
+        return span
+
+    def end_span(self, span: Span, status: str = "ok", error: Optional[BaseException] = None):
+        """結束 span，並自目前 thread 的 stack 移除"""
+        span.end(status, error)
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes) -> Iterator[Span]:
+        """with 區塊內為 current span；例外會標記為 error 後繼續拋出"""
+        span = self.start_span(name, kind, push=True, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, error=e)
+            raise
+        self.end_span(span)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int, kind: str = "internal",
+                    parent: Optional[Span] = None, status: str = "ok", **attributes) -> Span:
+        """補記一段已結束的區間（perf_counter_ns 時間），如 LLM 呼叫或單一 RSS 來源"""
+        span = self.start_span(name, kind, parent=parent, **attributes)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        span.status = status
+        return span
+
+    def _wall_ns(self, perf_ns: int) -> int:
+        return self._epoch_ns + (perf_ns - self._perf0_ns)
+
+    # ------------------------------------------------------------------
+    # 節點 API（execution_log.json）
+    # ------------------------------------------------------------------
 
     def log_node_start(self, node_name: str, node_type: str, description: str = ""):
         """記錄節點開始執行"""
@@ -40,6 +223,14 @@ class ExecutionLogger:
             "metrics": {}
         }
         self.execution_data["nodes"].append(node_data)
+        self._nodes[node_name] = node_data
+
+        previous = self._node_spans.get(node_name)
+        if previous is not None and previous.end_ns is None:
+            self.end_span(previous, status="abandoned")
+        self._node_spans[node_name] = self.start_span(node_name, node_type, parent=self._run_span,
+                                                      push=True, description=description)
+        self._emit("node_start", name=node_name, type=node_type, description=description)
         logger.info(f"🔄 [{node_name}] 開始執行...")
 
     def log_node_input(self, node_name: str, input_data: Any):
@@ -48,9 +239,10 @@ class ExecutionLogger:
         if node:
             # 限制輸入大小以避免 JSON 過大
             if isinstance(input_data, (dict, list)):
-                node["input"] = self._truncate_data(input_data, max_items=5)
+                node["input"] = self._payload(self._truncate_data(input_data, max_items=5))
             else:
                 node["input"] = str(input_data)[:500]
+            self._emit("node_input", name=node_name, input=node["input"])
 
     def log_node_success(self, node_name: str, output_data: Any = None, metrics: Dict = None):
         """記錄節點成功完成"""
@@ -58,7 +250,7 @@ class ExecutionLogger:
         if node:
             node["status"] = "success"
             node["end_time"] = datetime.now().isoformat()
-            node["duration"] = self._calculate_duration(node["start_time"], node["end_time"])
+            node["duration"] = self._end_node_span(node_name)
 
             # 記錄輸出 - 對 AI 節點保留完整文本輸出
             if output_data:
@@ -71,56 +263,221 @@ class ExecutionLogger:
                         node["output"] = str(output_data)
                     else:
                         node["output"] = str(output_data)[:500]
+                node["output"] = self._payload(node["output"])
 
             # 記錄指標
             if metrics:
                 node["metrics"] = metrics
 
+            self._emit("node_success", name=node_name, duration=node["duration"],
+                       output=node["output"], metrics=node["metrics"])
+
             logger.info(f"✅ [{node_name}] 執行成功")
 
+    def log_node_attempt(self, node_name: str, attempt: Dict):
+        """記錄節點內的一次嘗試（重試策略回報，含階段名稱、耗時、錯誤與等待秒數）"""
+        node = self._find_node(node_name)
+        if node:
+            node.setdefault("attempts", []).append(attempt)
+            self._emit("node_attempt", name=node_name, attempt=attempt)
+
+    def log_llm_call(self, record: Dict):
+        """
+        記錄一次 LLM 呼叫（ai_processor 的用量紀錄）
+
+        attempt 以該階段目前已記錄的重試策略嘗試數推得（第 1 次為 1）
+        """
+        step = record.get("step")
+        previous = sum(
+            1 for node in self.execution_data["nodes"]
+            for attempt in node.get("attempts", []) if attempt.get("step") == step
+        )
+        record = {**record, "attempt": previous + 1}
+        self.execution_data["llm_calls"].append(record)
+        self._emit("llm_call", record=record)
+
+        end_ns = time.perf_counter_ns()
+        start_ns = end_ns - int((record.get("latency_secs") or 0) * 1e9)
+        self.record_span(
+            f"llm {record.get('provider')}/{record.get('model')}", start_ns, end_ns, kind="llm",
+            status="ok" if record.get("status") == "success" else "error",
+            **{k: v for k, v in record.items()
+               if k not in ("timestamp", "latency_secs", "status") and v is not None},
+            call_status=record.get("status")
+        )
+
+    def usage_summary(self) -> Dict:
+        """依階段與整體彙總 LLM 用量（tokens / 成本 / 延遲 / 重試 / 備援）"""
+        return summarize_calls(self.execution_data["llm_calls"])
+
     def log_node_error(self, node_name: str, error: Exception):
         """記錄節點執行錯誤"""
         node = self._find_node(node_name)
         if node:
             node["status"] = "error"
             node["end_time"] = datetime.now().isoformat()
-            node["duration"] = self._calculate_duration(node["start_time"], node["end_time"])
+            node["duration"] = self._end_node_span(node_name, error)
             node["error"] = {
                 "type": type(error).__name__,
                 "message": str(error)[:500]
             }
+            self._emit("node_error", name=node_name, duration=node["duration"], error=node["error"])
             logger.error(f"❌ [{node_name}] 執行失敗: {str(error)}")
 
     def complete_execution(self, status: str = "success"):
         """完成整個執行"""
         self.execution_data["end_time"] = datetime.now().isoformat()
         self.execution_data["status"] = status
+        self.execution_data["duration"] = self._end_run_span(status)
+        self.execution_data["usage"] = self.usage_summary()
+        self._emit("run_complete", status=status, duration=self.execution_data["duration"],
+                   usage=self.execution_data["usage"])
+        totals = self.execution_data["usage"]["totals"]
+        if totals["calls"]:
+            logger.info(f"💰 LLM 用量: {totals['calls']} 次呼叫，${totals['cost_usd']:.4f}，"
+                        f"延遲合計 {totals['latency_secs']:.1f}s")
         logger.info(f"🏁 執行完成，狀態: {status}")
 
     def save_to_file(self, filepath: str = "execution_log.json"):
-        """保存執行日誌到文件"""
+        """保存執行日誌到文件（有事件日誌時由事件重建，旁檔內容展開為完整輸出）"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.execution_data, f, ensure_ascii=False, indent=2)
+            if self.events is not None:
+                write_execution_view(self.events.path, filepath, self.events.root)
+            else:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(self.execution_data, f, ensure_ascii=False, indent=2)
             logger.info(f"💾 執行日誌已保存: {filepath}")
         except Exception as e:
             logger.error(f"保存執行日誌失敗: {str(e)}")
 
-    def _find_node(self, node_name: str) -> Dict:
-        """查找節點"""
-        for node in reversed(self.execution_data["nodes"]):
-            if node["name"] == node_name:
-                return node
-        return None
+    def close(self):
+        """關閉事件日誌並清理過舊的執行紀錄"""
+        if self.events is None:
+            return
+        self.events.close()
+        try:
+            removed = prune_runs(self.events.root)
+            if removed:
+                logger.info(f"🧹 清理舊事件日誌 / 旁檔 {removed} 個")
+        except OSError as e:
+            logger.warning(f"⚠️ 清理舊事件日誌失敗: {e}")
+
+    def export_trace(self, filepath: str = "execution_trace.json"):
+        """
+        匯出 Chrome trace event 格式（Perfetto / chrome://tracing / speedscope 可直接開成火焰圖）
 
-    def _calculate_duration(self, start_time: str, end_time: str) -> float:
-        """計算執行時間（秒）"""
+        同時進行的兄弟 span（平行章節、各 RSS 來源）分到不同 lane，火焰圖才不會互相重疊。
+        """
+        lanes = self._assign_lanes()
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": SERVICE_NAME}}]
+        for span in self.spans:
+            end_ns = span.end_ns if span.end_ns is not None else time.perf_counter_ns()
+            events.append({
+                "name": span.name,
+                "cat": span.kind,
+                "ph": "X",
+                "ts": (self._wall_ns(span.start_ns)) / 1000,
+                "dur": (end_ns - span.start_ns) / 1000,
+                "pid": 1,
+                "tid": lanes[span.span_id],
+                "args": {**span.attributes, "status": span.status,
+                         **({"error": span.error} if span.error else {})},
+            })
+        self._write_json(filepath, {"traceEvents": events, "displayTimeUnit": "ms",
+                                    "otherData": {"trace_id": self.trace_id,
+                                                  "execution_id": self.execution_data["execution_id"],
+                                                  "dropped_spans": self.dropped_spans}})
+
+    def export_otlp(self, filepath: str = "execution_trace.otlp.json"):
+        """匯出 OTLP/JSON（ExportTraceServiceRequest 結構，可由 OpenTelemetry Collector 的 otlpjsonfile receiver 讀取）"""
+        otlp_spans = []
+        for span in self.spans:
+            end_ns = span.end_ns if span.end_ns is not None else time.perf_counter_ns()
+            status = {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+            otlp_spans.append({
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(self._wall_ns(span.start_ns)),
+                "endTimeUnixNano": str(self._wall_ns(end_ns)),
+                "attributes": [_otlp_attribute("span.kind_label", span.kind)]
+                              + [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+                "status": status,
+            })
+        self._write_json(filepath, {"resourceSpans": [{
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", SERVICE_NAME),
+                _otlp_attribute("execution.id", self.execution_data["execution_id"]),
+            ]},
+            "scopeSpans": [{"scope": {"name": "execution_logger"}, "spans": otlp_spans}],
+        }]})
+
+    def _assign_lanes(self) -> Dict[str, int]:
+        """
+        為每個 span 指定 lane（Chrome trace 的 tid）
+
+        依開始時間放入第一個「空閒」或「最上層仍開著的是自己祖先」的 lane，
+        同一 lane 內的 span 必為完整巢狀。
+        """
+        parents = {span.span_id: span.parent_id for span in self.spans}
+
+        def is_ancestor(candidate: str, span_id: str) -> bool:
+            current = parents.get(span_id)
+            while current is not None:
+                if current == candidate:
+                    return True
+                current = parents.get(current)
+            return False
+
+        now_ns = time.perf_counter_ns()
+        lanes: List[List[tuple]] = []       # 每個 lane 是 (end_ns, span_id) 的 stack
+        assigned: Dict[str, int] = {}
+        ordered = sorted(self.spans, key=lambda s: (s.start_ns, -((s.end_ns or now_ns) - s.start_ns)))
+        for span in ordered:
+            end_ns = span.end_ns if span.end_ns is not None else now_ns
+            for index, stack in enumerate(lanes):
+                while stack and stack[-1][0] <= span.start_ns:
+                    stack.pop()
+                if not stack or (stack[-1][0] >= end_ns and is_ancestor(stack[-1][1], span.span_id)):
+                    stack.append((end_ns, span.span_id))
+                    assigned[span.span_id] = index
+                    break
+            else:
+                lanes.append([(end_ns, span.span_id)])
+                assigned[span.span_id] = len(lanes) - 1
+        return assigned
+
+    def _write_json(self, filepath: str, data: Dict):
         try:
-            start = datetime.fromisoformat(start_time)
-            end = datetime.fromisoformat(end_time)
-            return (end - start).total_seconds()
-        except:
-            return 0
+            tmp = f"{filepath}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp, filepath)
+            logger.info(f"💾 追蹤紀錄已保存: {filepath}（{len(self.spans)} 個 span）")
+        except Exception as e:
+            logger.error(f"保存追蹤紀錄失敗: {str(e)}")
+
+    def _find_node(self, node_name: str) -> Optional[Dict]:
+        """查找節點（同名節點取最後一個）"""
+        return self._nodes.get(node_name)
+
+    def _end_node_span(self, node_name: str, error: Optional[BaseException] = None) -> Optional[float]:
+        """結束節點 span，回傳執行時間（秒）"""
+        span = self._node_spans.get(node_name)
+        if span is None:
+            return None
+        self.end_span(span, error=error)
+        return round(span.duration_secs, 3)
+
+    def _end_run_span(self, status: str) -> float:
+        for span in list(self._main_stack):
+            if span is not self._run_span:
+                self.end_span(span, status="abandoned")
+        self.end_span(self._run_span, status="ok" if status == "success" else "error")
+        self._run_span.set_attribute("status", status)
+        return round(self._run_span.duration_secs, 3)
 
     def _truncate_data(self, data: Any, max_items: int = 5) -> Any:
         """截斷數據以避免過大"""
@@ -160,3 +517,18 @@ class ExecutionLogger:
                 return data[:5] + [f"... 還有 {len(data) - 5} 項"]
             return data
         return data
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """轉成 OTLP AnyValue 屬性"""
+    if isinstance(value, bool):
+        wrapped = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    elif isinstance(value, str):
+        wrapped = {"stringValue": value}
+    else:
+        wrapped = {"stringValue": json.dumps(value, ensure_ascii=False, default=str)}
+    return {"key": key, "value": wrapped}
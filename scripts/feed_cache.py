@@ -0,0 +1,133 @@
+"""
+RSS 條件式 GET 快取
+以來源 URL 為 key，保存 ETag / Last-Modified 與上次解析出的新聞條目。
+
+下次讀取時送出 If-None-Match / If-Modified-Since，伺服器回 304 即直接
+重用快取條目，省下下載流量與 feedparser 解析時間。
+
+儲存格式（每個 URL 一個檔案，data/feed_cache/<sha1(url)>.json.gz）：
+    {"url": ..., "format": 2, "etag": ..., "last_modified": ..., "fetched_at": ...,
+     "entries": [[title, link, summary, published, published_parsed], ...]}
+
+條目保存 feedparser 的原始欄位（未正規化），讀回後與 feedparser 條目以相同方式存取，
+由 rss_fetcher 在比對條目庫之後才正規化。
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+FEED_CACHE_DIR = Path("data") / "feed_cache"
+
+# 條目以固定欄位順序的 list 儲存（feedparser 欄位名稱）
+ENTRY_FIELDS = ('title', 'link', 'summary', 'published', 'published_parsed')
+CACHE_FORMAT = 2   # 舊格式（已正規化條目）的紀錄視為不存在，下次完整重抓
+
+
+class FeedCache:
+    """以來源 URL 為 key 的 validator + 條目快取（thread-safe）"""
+
+    def __init__(self, cache_dir: Path = FEED_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._lock = threading.Lock()
+        self._records: Dict[str, Optional[Dict]] = {}
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{digest}.json.gz"
+
+    def _load(self, url: str) -> Optional[Dict]:
+        """讀取 URL 的快取紀錄（同一 process 內只讀一次磁碟）"""
+        with self._lock:
+            if url in self._records:
+                return self._records[url]
+
+        record = None
+        path = self._path(url)
+        if path.exists():
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    record = json.load(f)
+                if record.get('url') != url or record.get('format') != CACHE_FORMAT:
+                    record = None
+            except (OSError, ValueError) as e:
+                logger.warning(f"  ⚠️  feed 快取損毀，忽略: {path.name} ({e})")
+                record = None
+
+        with self._lock:
+            self._records[url] = record
+        return record
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """產生條件式 GET 的 request headers（無快取時回空 dict）"""
+        record = self._load(url)
+        if not record:
+            return {}
+
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def get_entries(self, url: str) -> Optional[List[Dict]]:
+        """取回快取的原始條目（304 時使用），無快取回 None"""
+        record = self._load(url)
+        if not record:
+            return None
+        return [dict(zip(ENTRY_FIELDS, row)) for row in record.get('entries', [])]
+
+    def state_digest(self, urls: List[str]) -> str:
+        """各 URL 快取 validator 與讀取時間的雜湊；任一來源重新下載後即改變"""
+        state = []
+        for url in sorted(urls):
+            record = self._load(url) or {}
+            state.append([url, record.get('etag'), record.get('last_modified'), record.get('fetched_at')])
+        return hashlib.sha1(json.dumps(state).encode('utf-8')).hexdigest()
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str],
+              entries: List[Dict]):
+        """
+        寫入快取。伺服器未提供任何 validator 時不寫入（下次也無法 304）。
+
+        Args:
+            url: 來源 URL
+            etag: 回應的 ETag header
+            last_modified: 回應的 Last-Modified header
+            entries: 原始條目（鍵為 ENTRY_FIELDS）
+        """
+        if not etag and not last_modified:
+            return
+
+        record = {
+            'url': url,
+            'format': CACHE_FORMAT,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'entries': [[entry.get(field) for field in ENTRY_FIELDS] for entry in entries],
+        }
+
+        path = self._path(url)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"  ⚠️  feed 快取寫入失敗: {url} ({e})")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._records[url] = record
@@ -4,6 +4,10 @@
 讀取 latest.json，原文照發，不經 AI 加工。
 確保每次 /news 查詢拿到的內容與生成時完全一致。
 
+程序內快取：latest.json 解析一次，各格式與 /news 回覆預先算好；
+之後每次查詢只比對檔案的 (inode, mtime, size)，且同一秒內
+（LATEST_REVALIDATE_SECS）連 stat 都省略，每日推播後的查詢尖峰不必反覆讀檔解析 JSON。
+
 用法:
   # 作為模組引入
   from get_latest_news import get_latest_news
@@ -11,6 +15,7 @@
   result = get_latest_news("line")      # 僅回傳 LINE 精華文字
   result = get_latest_news("notion")    # 僅回傳 Notion 詳細文字
   result = get_latest_news("url")       # 僅回傳網頁連結
+  reply = get_news_reply()              # 預先格式化好的 /news 回覆
 
   # 作為 CLI
   python get_latest_news.py              # 輸出 LINE 精華版（預設）
@@ -22,7 +27,9 @@
 from __future__ import annotations
 
 import json
+import os
 import sys
+import time
 from pathlib import Path
 
 from log_config import get_logger
@@ -31,6 +38,62 @@ logger = get_logger(__name__)
 # latest.json 位於 repo 根目錄
 LATEST_JSON_PATH = Path(__file__).parent.parent / "latest.json"
 
+# 兩次 stat 檢查之間的最短間隔（秒）；0 表示每次查詢都檢查
+LATEST_REVALIDATE_SECS = float(os.getenv("LATEST_REVALIDATE_SECS", "1"))
+
+# (檔案 stamp, 各格式預算結果)；整個 tuple 一次替換，多執行緒讀取不需加鎖
+_cache: tuple | None = None
+_last_check = 0.0
+
+
+def _build_entry(data: dict) -> dict:
+    """預先算好每種格式的回傳值"""
+    return {
+        "all": data,
+        "line": data.get("line_content", "（LINE 內容不可用）"),
+        "notion": data.get("notion_content", "（Notion 內容不可用）"),
+        "url": data.get("website_url", "（網址不可用）"),
+        "json": json.dumps(data, ensure_ascii=False, indent=2),
+        "reply": format_news_reply(data),
+    }
+
+
+def _load_cached() -> dict | None:
+    """
+    取得目前 latest.json 的預算結果
+
+    檔案未變（inode / mtime / size 相同）時直接回傳快取；
+    變更後重新解析，解析失敗（例如寫到一半）則沿用舊快取。
+    """
+    global _cache, _last_check
+
+    now = time.monotonic()
+    if _cache is not None and now - _last_check < LATEST_REVALIDATE_SECS:
+        return _cache[1]
+    _last_check = now
+
+    try:
+        st = os.stat(LATEST_JSON_PATH)
+    except FileNotFoundError:
+        _cache = None
+        logger.warning("⚠️ latest.json 不存在，尚未生成今日日報")
+        return None
+
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _cache is not None and _cache[0] == stamp:
+        return _cache[1]
+
+    try:
+        with open(LATEST_JSON_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error(f"❌ 讀取 latest.json 失敗: {e}")
+        return _cache[1] if _cache is not None else None
+
+    _cache = (stamp, _build_entry(data))
+    logger.info(f"🔄 latest.json 已載入快取（{data.get('date', '未知日期')}）")
+    return _cache[1]
+
 
 def get_latest_news(fmt: str = "all") -> dict | str | None:
     """
@@ -43,31 +106,22 @@ def get_latest_news(fmt: str = "all") -> dict | str | None:
 
     Returns:
         依 fmt 回傳 dict / str，檔案不存在時回傳 None。
+        "all" 回傳的是快取中的同一個 dict，呼叫端請勿修改。
     """
-    if not LATEST_JSON_PATH.exists():
-        logger.warning("⚠️ latest.json 不存在，尚未生成今日日報")
+    entry = _load_cached()
+    if entry is None:
         return None
 
-    try:
-        with open(LATEST_JSON_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, OSError) as e:
-        logger.error(f"❌ 讀取 latest.json 失敗: {e}")
-        return None
+    if fmt in entry and fmt != "reply":
+        return entry[fmt]
+    logger.warning(f"⚠️ 未知格式: {fmt}，回傳完整資料")
+    return entry["all"]
 
-    if fmt == "all":
-        return data
-    elif fmt == "line":
-        return data.get("line_content", "（LINE 內容不可用）")
-    elif fmt == "notion":
-        return data.get("notion_content", "（Notion 內容不可用）")
-    elif fmt == "url":
-        return data.get("website_url", "（網址不可用）")
-    elif fmt == "json":
-        return json.dumps(data, ensure_ascii=False, indent=2)
-    else:
-        logger.warning(f"⚠️ 未知格式: {fmt}，回傳完整資料")
-        return data
+
+def get_news_reply() -> str:
+    """回傳預先格式化好的 /news 回覆（檔案不存在時為尚未生成的提示）"""
+    entry = _load_cached()
+    return entry["reply"] if entry is not None else format_news_reply(None)
 
 
 def format_news_reply(data: dict | None) -> str:
@@ -105,8 +159,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     if args.format == "reply":
-        data = get_latest_news("all")
-        print(format_news_reply(data))
+        print(get_news_reply())
     else:
         result = get_latest_news(args.format)
         if result is None:
@@ -1,7 +1,9 @@
 """
 HTML 生成模組
 使用 Jinja2 模板生成 HTML 頁面
-混合方式：固定的 <head> + AI 生成的 <body> 內容
+兩種渲染方式：
+  - llm：AI 生成完整 HTML，再注入 SEO meta 與 LINE 精華版
+  - template：以本地 Markdown 轉換 + daily_news.html 模板確定性渲染（不需第四次 LLM 呼叫）
 
 模板檔案位於 scripts/templates/：
   - daily_news.html: 日報頁面模板
@@ -14,6 +16,10 @@ from datetime import datetime, timedelta
 from jinja2 import Template
 
 from log_config import get_logger
+from markdown_render import markdown_to_html
+from reports_manifest import record_report, list_reports
+from search_index import add_report
+from static_search import build_static_search
 logger = get_logger(__name__)
 
 # 站點基本資訊
@@ -141,14 +147,47 @@ def _inject_line_section(html: str, line_content: str) -> str:
     return html
 
 
-def generate_daily_html(final_output: dict, html_full_content: str = None) -> str:
+# 日報 Markdown 開頭的標題與日期行（頁首已顯示，模板渲染時移除）
+_REPORT_TITLE_RE = re.compile(r'^\s*#{1,6}\s*🤖?\s*AI 科技日報精選\s*\n')
+_REPORT_DATE_RE = re.compile(r'^\s*\*\*日期[:：]\*\*.*\n')
+# TOP 3 第一則標題，作為頁首副標題
+_FIRST_HEADLINE_RE = re.compile(r'^\*\*1\.\s*(.+?)\*\*\s*$', re.MULTILINE)
+
+
+def render_daily_html(date: str, notion_content: str, line_content: str) -> str:
+    """
+    以模板確定性渲染日報頁面（取代 AI HTML 生成器）
+
+    Args:
+        date: 日期
+        notion_content: Notion 版日報（Markdown）
+        line_content: LINE 精華版（純文字 / Markdown）
+
+    Returns:
+        完整 HTML 文件
+    """
+    body = _REPORT_TITLE_RE.sub('', notion_content or '', count=1)
+    body = _REPORT_DATE_RE.sub('', body.lstrip('\n'), count=1)
+    headline = _FIRST_HEADLINE_RE.search(body)
+
+    template = _load_template("daily_news.html")
+    return template.render(
+        date=date,
+        subtitle=headline.group(1).strip() if headline else None,
+        notion_content=markdown_to_html(body),
+        line_content=markdown_to_html(line_content or ''),
+    )
+
+
+def generate_daily_html(final_output: dict, html_full_content: str = None, rendered_html: str = None) -> str:
     """
     生成今日新聞 HTML 頁面
     完全對齊 n8n 架構：AI 生成完整的 HTML 文檔
 
     Args:
         final_output: 組裝後的最終輸出
-        html_full_content: AI 生成的完整 HTML 文檔（可選）
+        html_full_content: AI 生成的完整 HTML 文檔（可選；未提供時以模板渲染）
+        rendered_html: 已以模板渲染好的頁面（模板模式由檢查點載入時傳入，直接寫出）
 
     Returns:
         HTML 文件路徑
@@ -163,23 +202,22 @@ def generate_daily_html(final_output: dict, html_full_content: str = None) -> st
         line_content = final_output.get('line_content', '')
         if line_content:
             html_content = _inject_line_section(html_content, line_content)
+    elif rendered_html:
+        html_content = rendered_html
     else:
-        # 降級方案：使用模板方式
-        logger.warning("⚠️  未提供 HTML body 內容，使用降級方案")
-        notion_content = final_output['notion_content']
-        line_content = final_output['line_content']
-
-        template = _load_template("daily_news.html")
-        html_content = template.render(
-            date=date,
-            notion_content=notion_content,
-            line_content=line_content
-        )
+        logger.info("🧩 未提供 AI 生成的 HTML，使用模板渲染")
+        html_content = render_daily_html(date, final_output['notion_content'], final_output['line_content'])
 
     # 寫入文件
     output_path = Path(f"{date}.html")
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
+    report = record_report(output_path, html_content)
+    try:
+        add_report(report, html_content)
+    except Exception as e:
+        # 檢索索引不影響發佈；之後可用 search_index.py --rebuild 補建
+        logger.warning(f"⚠️ 全文索引更新失敗: {e}")
 
     logger.info(f"✅ HTML 文件已生成: {output_path}")
     return str(output_path)
@@ -187,28 +225,15 @@ def generate_daily_html(final_output: dict, html_full_content: str = None) -> st
 
 def _scan_archive_reports(limit: int = 10) -> list:
     """
-    掃描 archive/ 目錄取得近期日報列表
+    由日報清單取得 archive/ 內的近期日報列表
 
     Args:
         limit: 最多返回幾筆
 
     Returns:
-        list of dict: [{'date': '2026-02-11', 'filename': '2026-02-11.html'}, ...]
+        list of dict: [{'date': '2026-02-11', 'filename': '2026-02-11.html', 'title': ...}, ...]
     """
-    import re
-    archive_dir = Path('archive')
-    if not archive_dir.exists():
-        return []
-
-    date_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})\.html$')
-    reports = []
-    for f in archive_dir.iterdir():
-        m = date_pattern.match(f.name)
-        if m:
-            reports.append({'date': m.group(1), 'filename': f.name})
-
-    # 按日期倒序排列
-    reports.sort(key=lambda r: r['date'], reverse=True)
+    reports = [{**r, 'filename': Path(r['path']).name} for r in list_reports('archive')]
     return reports[:limit], len(reports)
 
 
@@ -224,7 +249,7 @@ def update_index_html(today_date: str) -> str:
     """
     logger.info("📝 更新首頁 index.html...")
 
-    # 掃描 archive/ 取得近期日報
+    # 從日報清單取得 archive/ 近期日報
     recent_reports, total_count = _scan_archive_reports(limit=10)
     # 排除今日（今日已用亮點卡片展示）
     recent_reports = [r for r in recent_reports if r['date'] != today_date]
@@ -244,4 +269,11 @@ def update_index_html(today_date: str) -> str:
         f.write(html_content)
 
     logger.info(f"✅ index.html 已更新（列出 {len(recent_reports)} 篇近期日報，共 {total_count} 篇）")
+
+    # 首頁的站內搜尋讀取 search/ 分片；新日報寫成新分段，既有分片不改寫
+    try:
+        build_static_search()
+    except Exception as e:
+        logger.warning(f"⚠️ 靜態搜尋分片更新失敗: {e}")
+
     return str(output_path)
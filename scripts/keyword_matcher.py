@@ -0,0 +1,184 @@
+"""
+多關鍵字比對器
+把多組關鍵字編譯成單一自動機，一次掃描文字就找出所有命中（含重疊命中），
+結果等同對每個關鍵字逐一做 `in` 檢查，但成本不隨關鍵字數量線性成長。
+
+兩種後端：
+  - pyahocorasick（已安裝時使用）：C 實作的 Aho-Corasick 自動機
+  - trie 正規表示式（降級方案）：每個起點沿 trie 取最長命中，
+    再以預先計算的「前綴關鍵字」補齊同一起點的較短命中
+    （如 'chatgpt' 與 'chatgpt 開放台灣'）
+
+命中位置可區分「完全落在標題內」與「完全落在內文內」。
+
+用法:
+    matcher = KeywordMatcher({'tw': ['台灣', 'taiwan'], 'ai': ['ai', 'llm']})
+    hits = matcher.scan(f"{title} {content}", title_len=len(title))
+    hits.count('tw')                  # 全文命中（依關鍵字在清單中出現次數加權）
+    hits.keywords('ai', 'title')      # 標題命中的關鍵字
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+_END = ''  # trie 節點上標記「關鍵字在此結束」的 key
+
+
+def _build_trie(keywords: Iterable[str]) -> Dict:
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+    return trie
+
+
+def _trie_to_regex(node: Dict) -> str:
+    """將 trie 轉為正規表示式；可選的延伸採 greedy，保證每個起點取到最長關鍵字"""
+    branches = [re.escape(ch) + _trie_to_regex(child)
+                for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return ''
+
+    if len(branches) == 1 and _END not in node:
+        return branches[0]
+
+    pattern = '(?:' + '|'.join(branches) + ')'
+    if _END in node:
+        pattern += '?'
+    return pattern
+
+
+class KeywordHits:
+    """單次掃描的命中結果"""
+
+    __slots__ = ('_matcher', 'full', 'title', 'content')
+
+    def __init__(self, matcher: 'KeywordMatcher', full: Set[str], title: Set[str], content: Set[str]):
+        self._matcher = matcher
+        self.full = full        # 出現在全文任何位置
+        self.title = title      # 完全落在標題內
+        self.content = content  # 完全落在內文內
+
+    def keywords(self, cls: str, where: str = 'full') -> Set[str]:
+        """某類別在指定區域命中的關鍵字集合"""
+        weights = self._matcher.class_weights.get(cls, {})
+        return {kw for kw in getattr(self, where) if kw in weights}
+
+    def count(self, cls: str, where: str = 'full') -> int:
+        """某類別在指定區域的命中數（關鍵字在清單中重複出現時重複計算）"""
+        weights = self._matcher.class_weights.get(cls, {})
+        return sum(weights.get(kw, 0) for kw in getattr(self, where))
+
+    def any(self, cls: str, where: str = 'full') -> bool:
+        weights = self._matcher.class_weights.get(cls, {})
+        return any(kw in weights for kw in getattr(self, where))
+
+
+class KeywordMatcher:
+    """
+    以類別分組的多關鍵字比對器
+
+    Args:
+        classes: {類別名稱: 關鍵字列表}。比對區分大小寫，
+                 呼叫端需自行將關鍵字與文字轉成一致的大小寫。
+    """
+
+    def __init__(self, classes: Dict[str, List[str]]):
+        self.class_weights: Dict[str, Dict[str, int]] = {}
+        for cls, keywords in classes.items():
+            weights: Dict[str, int] = {}
+            for kw in keywords:
+                weights[kw] = weights.get(kw, 0) + 1
+            self.class_weights[cls] = weights
+
+        all_keywords = {kw for weights in self.class_weights.values() for kw in weights}
+        # 空字串永遠「出現在」任何文字中（與 `'' in text` 一致）
+        self._always = {kw for kw in all_keywords if not kw}
+        keywords = sorted(all_keywords - self._always)
+
+        self._automaton = None
+        self._regex = None
+        if keywords:
+            self._automaton = self._build_automaton(keywords)
+            if self._automaton is None:
+                self._trie = _build_trie(keywords)
+                self._prefixes = {kw: self._keyword_prefixes(kw) for kw in keywords}
+                self._regex = re.compile(_trie_to_regex(self._trie))
+
+    @staticmethod
+    def _build_automaton(keywords: List[str]):
+        """建立 Aho-Corasick 自動機；未安裝 pyahocorasick 時回 None"""
+        try:
+            import ahocorasick
+        except ImportError:
+            logger.info("ℹ️  未安裝 pyahocorasick，關鍵字比對改用 trie 正規表示式")
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for kw in keywords:
+            automaton.add_word(kw, kw)
+        automaton.make_automaton()
+        return automaton
+
+    def _keyword_prefixes(self, keyword: str) -> List[str]:
+        """keyword 本身以及所有身為其前綴的關鍵字"""
+        found = []
+        node = self._trie
+        for i, ch in enumerate(keyword):
+            node = node[ch]
+            if _END in node:
+                found.append(keyword[:i + 1])
+        return found
+
+    def _iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """逐一產生 (起點, 關鍵字)，包含所有重疊命中"""
+        if self._automaton is not None:
+            for end, kw in self._automaton.iter(text):
+                yield end - len(kw) + 1, kw
+            return
+
+        if self._regex is not None:
+            prefixes = self._prefixes
+            search = self._regex.search
+            m = search(text)
+            while m is not None:
+                start = m.start()
+                for kw in prefixes[m.group()]:
+                    yield start, kw
+                # 下一個起點從 start + 1 開始，才不會漏掉重疊的關鍵字
+                m = search(text, start + 1)
+
+    def scan(self, text: str, title_len: int = None) -> KeywordHits:
+        """
+        掃描文字一次，找出所有命中的關鍵字
+
+        Args:
+            text: 要比對的文字（通常為 f"{title} {content}"）
+            title_len: 標題長度；提供時會區分標題 / 內文命中
+                       （內文從 title_len + 1 起算，略過中間的分隔字元）
+
+        Returns:
+            KeywordHits
+        """
+        full = set(self._always)
+        title = set(self._always)
+        content = set(self._always)
+
+        if title_len is None:
+            full.update(kw for _, kw in self._iter_matches(text))
+            return KeywordHits(self, full, title, content)
+
+        content_start = title_len + 1
+        for start, kw in self._iter_matches(text):
+            full.add(kw)
+            if start + len(kw) <= title_len:
+                title.add(kw)
+            elif start >= content_start:
+                content.add(kw)
+
+        return KeywordHits(self, full, title, content)
@@ -2,7 +2,7 @@
 LINE /news 確定性處理模組
 
 接收 LINE Webhook 事件，對 /news 指令直接回傳 latest.json 內容，
-不經任何 AI 加工，確保每次回覆一致。
+不經任何 AI 加工，確保每次回覆一致；/search 以全文索引查詢過往日報。
 
 用法:
   # 作為獨立 Flask 伺服器
@@ -26,7 +26,8 @@ import sys
 from pathlib import Path
 
 from log_config import get_logger
-from get_latest_news import get_latest_news, format_news_reply
+from get_latest_news import get_news_reply
+from search_index import search
 
 logger = get_logger(__name__)
 
@@ -34,15 +35,19 @@ logger = get_logger(__name__)
 
 COMMANDS = {
     "/news": "回傳今日 AI 新聞日報",
+    "/search": "搜尋過往日報",
     "/help": "顯示可用指令",
 }
 
 HELP_TEXT = (
     "📋 可用指令：\n"
     "/news — 查看今日 AI 新聞日報\n"
+    "/search 關鍵字 — 搜尋過往日報\n"
     "/help — 顯示此說明"
 )
 
+SEARCH_RESULTS = 5  # /search 最多回傳幾篇
+
 
 # ── 核心處理 ──────────────────────────────────────────────
 
@@ -54,8 +59,10 @@ def handle_command(text: str) -> str | None:
     cmd = text.strip().lower()
 
     if cmd == "/news":
-        data = get_latest_news("all")
-        return format_news_reply(data)
+        return get_news_reply()
+
+    if cmd == "/search" or cmd.startswith("/search "):
+        return format_search_reply(text.strip()[len("/search"):].strip())
 
     if cmd == "/help":
         return HELP_TEXT
@@ -64,6 +71,26 @@ def handle_command(text: str) -> str | None:
     return None
 
 
+def format_search_reply(query: str) -> str:
+    """將 /search 的查詢結果格式化為回覆訊息"""
+    if not query:
+        return "🔎 請在指令後輸入關鍵字，例如：/search 輝達"
+
+    try:
+        results = search(query, SEARCH_RESULTS)
+    except Exception as e:
+        logger.error(f"❌ 全文檢索失敗: {e}")
+        return "⚠️ 搜尋暫時無法使用，請稍後再試。"
+
+    if not results:
+        return f"🔎 找不到與「{query}」相關的日報。"
+
+    lines = [f"🔎 「{query}」相關日報："]
+    for r in results:
+        lines.append(f"\n📅 {r['title']}\n{r['snippet']}\n🔗 {r['url']}")
+    return "\n".join(lines)
+
+
 # ── LINE Webhook 驗證 ─────────────────────────────────────
 
 def verify_signature(body: bytes, signature: str, channel_secret: str) -> bool:
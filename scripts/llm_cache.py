@@ -0,0 +1,130 @@
+"""
+LLM 回應快取
+以 (provider, model, system prompt, user prompt, temperature, max_tokens, response_format) 的雜湊為 key，
+把完整回應存在磁碟。重跑失敗的日子、重做後段階段或做渲染實驗時，
+前面已完成的階段直接重播，不再花 token。
+
+- TTL：超過 LLM_CACHE_TTL_HOURS 的紀錄視為過期
+- 容量：總大小超過 LLM_CACHE_MAX_MB 時由最舊的開始刪
+- 繞過：LLM_CACHE=0 完全關閉；LLM_CACHE=refresh 不讀快取但寫入新結果
+
+儲存格式（每個 key 一個檔案，data/llm_cache/<sha256>.json.gz）：
+    {"provider": ..., "model": ..., "created_at": <epoch>, "response": ...}
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+LLM_CACHE_DIR = Path("data") / "llm_cache"
+LLM_CACHE_MODE = os.getenv('LLM_CACHE', '1')  # '1' 啟用 / '0' 關閉 / 'refresh' 只寫不讀
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '72'))
+LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', '50'))
+
+
+def cache_key(provider: str, model: str, system_instruction: str, user_prompt: str,
+              temperature: float, max_tokens: Optional[int], response_format: Optional[Dict] = None) -> str:
+    """計算請求的內容位址 key（JSON 模式 / 結構化輸出的 response_format 不同即為不同請求）"""
+    payload = json.dumps(
+        [provider, model, system_instruction, user_prompt, temperature, max_tokens, response_format],
+        ensure_ascii=False, separators=(',', ':'), sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """磁碟上的 LLM 回應快取（thread-safe）"""
+
+    def __init__(self, cache_dir: Path = LLM_CACHE_DIR, mode: str = LLM_CACHE_MODE,
+                 ttl_hours: float = LLM_CACHE_TTL_HOURS, max_mb: float = LLM_CACHE_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.read_enabled = mode not in ('0', 'refresh')
+        self.write_enabled = mode != '0'
+        self.ttl_secs = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[str]:
+        """取回快取回應；不存在、過期或損毀時回 None"""
+        if not self.read_enabled:
+            return None
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"  ⚠️  LLM 快取損毀，忽略: {path.name} ({e})")
+            path.unlink(missing_ok=True)
+            return None
+
+        if time.time() - record.get('created_at', 0) > self.ttl_secs:
+            path.unlink(missing_ok=True)
+            return None
+        return record.get('response')
+
+    def put(self, key: str, provider: str, model: str, response: str):
+        """寫入回應並依容量上限淘汰最舊的紀錄"""
+        if not self.write_enabled or not response:
+            return
+
+        record = {
+            'provider': provider,
+            'model': model,
+            'created_at': time.time(),
+            'response': response,
+        }
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"  ⚠️  LLM 快取寫入失敗: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """刪除過期紀錄，總大小仍超過上限時由最舊的開始刪"""
+        with self._lock:
+            now = time.time()
+            files = []
+            for path in self.cache_dir.glob('*.json.gz'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl_secs:
+                    path.unlink(missing_ok=True)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            if total <= self.max_bytes:
+                return
+            files.sort()
+            removed = 0
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            logger.info(f"  🧹 LLM 快取超過 {self.max_bytes // (1024 * 1024)}MB，淘汰 {removed} 筆")
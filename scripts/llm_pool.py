@@ -0,0 +1,261 @@
+"""
+LLM 連線池
+主流程與 compare_models 共用，每個供應商：
+
+- 一個長駐 client（底層 HTTP 連線池重用，不再每次呼叫重建）
+- 每分鐘請求數 / token 數兩個 token bucket（以預約制扣額，不足時等待）
+- 同時進行的請求數上限（semaphore）
+
+同步 API 直接呼叫；asyncio API 在 thread 中執行同一份同步邏輯，
+兩者共用同一組限流狀態。
+
+離線測試：LLM_FAKE=1 或 pool.use_fake(responder) 把所有供應商換成 FakeProvider。
+
+用法:
+    pool = LLMPool()
+    pool.register('deepseek', lambda: OpenAI(...), rpm=60, tpm=500_000, max_concurrency=4)
+    text = pool.complete('deepseek', 'deepseek-chat', system, user, max_tokens=4096)
+    text = await pool.acomplete(...)
+    with pool.limit('google', estimated_tokens) as lease:   # 非 OpenAI 相容 SDK
+        ...
+        lease.settle(actual_tokens)
+"""
+
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from log_config import get_logger
+from prompt_packer import estimate_tokens
+logger = get_logger(__name__)
+
+# 取得限流額度的最長等待時間（超過即放棄，避免整個流程卡死）
+ACQUIRE_TIMEOUT_SECS = 120
+
+
+class RateLimitTimeout(RuntimeError):
+    """等待限流額度超過 ACQUIRE_TIMEOUT_SECS"""
+
+
+class TokenBucket:
+    """
+    預約制 token bucket（thread-safe）
+
+    每次 reserve 立即扣額（允許為負），回傳呼叫端需要等待的秒數；
+    之後以 settle 依實際用量補差額。
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """扣除 amount，回傳需等待的秒數（0 表示立即可用）"""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def settle(self, delta: float):
+        """補扣（delta > 0）或退還（delta < 0）額度"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class _Provider:
+    def __init__(self, name: str, factory: Callable[[], Any], rpm: float, tpm: float, max_concurrency: int):
+        self.name = name
+        self.factory = factory
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.client = None
+        self.lock = threading.Lock()
+
+
+class _Lease:
+    """一次限流額度；settle 以實際 token 用量修正預估值"""
+
+    def __init__(self, provider: _Provider, estimated_tokens: int):
+        self._provider = provider
+        self.estimated_tokens = estimated_tokens
+
+    def settle(self, actual_tokens: Optional[int]):
+        if actual_tokens is None:
+            return
+        self._provider.tokens.settle(actual_tokens - self.estimated_tokens)
+        self.estimated_tokens = actual_tokens
+
+
+class LLMPool:
+    """依供應商管理 client、限流與併發的連線池"""
+
+    def __init__(self):
+        self._providers: Dict[str, _Provider] = {}
+        self._fake_responder = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._providers
+
+    def register(self, name: str, factory: Callable[[], Any], rpm: float = 60, tpm: float = 200_000,
+                 max_concurrency: int = 4):
+        """
+        註冊供應商
+
+        Args:
+            name: 供應商 key（如 'openai'、'deepseek'）
+            factory: 建立 client 的函式（第一次使用時才呼叫）
+            rpm: 每分鐘請求數上限
+            tpm: 每分鐘 token 數上限（prompt + output）
+            max_concurrency: 同時進行的請求數上限
+        """
+        with self._lock:
+            self._providers[name] = _Provider(name, factory, rpm, tpm, max_concurrency)
+
+    def ensure(self, name: str, factory: Callable[[], Any], **limits):
+        """尚未註冊時才註冊（thread-safe，供多處共用同一個 pool 時使用）"""
+        with self._lock:
+            if name in self._providers:
+                return
+            self._providers[name] = _Provider(name, factory, **{
+                'rpm': 60, 'tpm': 200_000, 'max_concurrency': 4, **limits})
+
+    def use_fake(self, responder: Optional[Callable[..., str]] = None, latency: float = 0.0):
+        """把所有供應商換成 FakeProvider（離線測試）"""
+        self._fake_responder = (responder, latency)
+        for provider in self._providers.values():
+            with provider.lock:
+                provider.client = FakeProvider(responder, latency)
+
+    def _provider(self, name: str) -> _Provider:
+        if name not in self._providers:
+            raise KeyError(f"未註冊的 LLM 供應商: {name}")
+        return self._providers[name]
+
+    def client(self, name: str) -> Any:
+        """取得供應商的長駐 client"""
+        provider = self._provider(name)
+        with provider.lock:
+            if provider.client is None:
+                if self._fake_responder is not None:
+                    provider.client = FakeProvider(*self._fake_responder)
+                else:
+                    provider.client = provider.factory()
+            return provider.client
+
+    @staticmethod
+    def _refund(provider: _Provider, estimated_tokens: int):
+        """退還一次未送出的請求所預約的請求數與 token 額度"""
+        provider.requests.settle(-1)
+        provider.tokens.settle(-estimated_tokens)
+
+    @contextmanager
+    def limit(self, name: str, estimated_tokens: int = 0) -> Iterator[_Lease]:
+        """
+        取得一次請求的限流額度（請求數、token 數、併發數）
+
+        Raises:
+            RateLimitTimeout: 等待超過 ACQUIRE_TIMEOUT_SECS
+        """
+        provider = self._provider(name)
+        wait = max(provider.requests.reserve(1), provider.tokens.reserve(estimated_tokens))
+        if wait > ACQUIRE_TIMEOUT_SECS:
+            self._refund(provider, estimated_tokens)
+            raise RateLimitTimeout(f"{name} 限流等待 {wait:.0f}s 超過上限")
+        if wait > 0:
+            logger.info(f"  🚦 {name} 達到速率上限，等待 {wait:.1f}s")
+            time.sleep(wait)
+
+        if not provider.semaphore.acquire(timeout=ACQUIRE_TIMEOUT_SECS):
+            # 請求沒有送出，預約的額度要還回去，否則後續呼叫會為不存在的請求等待
+            self._refund(provider, estimated_tokens)
+            raise RateLimitTimeout(f"{name} 併發名額等待逾時")
+        try:
+            yield _Lease(provider, estimated_tokens)
+        finally:
+            provider.semaphore.release()
+
+    def complete(self, name: str, model: str, system_instruction: str, user_prompt: str, **params) -> str:
+        """OpenAI 相容 chat completion（同步）"""
+        estimated = estimate_tokens(system_instruction) + estimate_tokens(user_prompt) + params.get('max_tokens', 1024)
+        client = self.client(name)
+        with self.limit(name, estimated) as lease:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_instruction},
+                    {"role": "user", "content": user_prompt}
+                ],
+                **params
+            )
+            usage = getattr(response, 'usage', None)
+            lease.settle(usage.total_tokens if usage else None)
+        return response.choices[0].message.content
+
+    async def acomplete(self, name: str, model: str, system_instruction: str, user_prompt: str, **params) -> str:
+        """OpenAI 相容 chat completion（asyncio）"""
+        return await asyncio.to_thread(self.complete, name, model, system_instruction, user_prompt, **params)
+
+    async def arun(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在 thread 中執行任意同步呼叫（供自行以 limit() 包裝的呼叫使用）"""
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+# ============================================
+# 離線測試用假供應商
+# ============================================
+
+class FakeProvider:
+    """
+    模擬 OpenAI 相容 client：`client.chat.completions.create(...)`
+
+    Args:
+        responder: responder(model=..., messages=..., **params) -> 回應文字；
+                   未提供時回傳空 JSON 物件
+        latency: 每次呼叫的模擬延遲（秒）
+    """
+
+    def __init__(self, responder: Optional[Callable[..., str]] = None, latency: float = 0.0):
+        self._responder = responder or (lambda **kwargs: '{}')
+        self._latency = latency
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages, stream: bool = False, stream_options=None, **params):
+        self.calls.append({'model': model, 'messages': messages, **params})
+        if self._latency:
+            time.sleep(self._latency)
+        text = self._responder(model=model, messages=messages, **params)
+        prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in messages)
+        completion_tokens = estimate_tokens(text)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+
+        if not stream:
+            message = SimpleNamespace(content=text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason='stop')], usage=usage)
+
+        def chunks():
+            step = 16
+            for i in range(0, len(text), step):
+                delta = SimpleNamespace(content=text[i:i + step])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None),
+                                                           finish_reason='stop')], usage=None)
+            yield SimpleNamespace(choices=[], usage=usage)
+        return chunks()
@@ -8,11 +8,16 @@ Thinker News 每日新聞自動生成系統
 3. AI 處理鏈（DeepSeek → OpenAI → OpenAI → DeepSeek）
 4. HTML 頁面生成
 5. 輸出 latest.json
+
+各階段輸出存於 data/<date>/ 作為檢查點：
+    python scripts/main.py --resume                 # 跳過輸入未變更的階段
+    python scripts/main.py --from-stage narrator    # 從科技導讀人起重跑
 """
 
 import os
 import sys
 import json
+import argparse
 import time
 from datetime import datetime
 from pathlib import Path
@@ -23,50 +28,54 @@ load_dotenv()
 from log_config import get_logger
 logger = get_logger(__name__)
 
-from rss_fetcher import fetch_all_rss_feeds
-from news_filter import filter_and_score_news
+from rss_fetcher import fetch_all_rss_feeds, RSS_SOURCES, FEED_CACHE_ENABLED
+from feed_cache import FeedCache
+from entry_store import EntryStore
+from news_filter import filter_and_score_news, SCORING_VERSION
+from checkpoint import CheckpointStore, STAGES, content_hash
+from prompts import (
+    DATA_ALCHEMIST_SYSTEM_PROMPT,
+    TECH_NARRATOR_SYSTEM_PROMPT,
+    TECH_NARRATOR_SECTION_SYSTEM_PROMPT,
+    EDITOR_IN_CHIEF_SYSTEM_PROMPT,
+    HTML_GENERATOR_SYSTEM_PROMPT,
+    HTML_GENERATOR_TEMPLATE_PROMPT,
+)
 from ai_processor import (
     get_openai_client,
     get_deepseek_client,
     process_with_data_alchemist,
     process_with_tech_narrator,
+    process_with_tech_narrator_fanout,
     process_with_editor_in_chief,
-    process_with_html_generator
+    process_with_html_generator,
+    get_last_call_metrics,
+    clear_last_call_metrics,
+    stage_config,
+    set_usage_sink,
+    STAGE_RETRY_POLICY,
 )
-from html_generator import generate_daily_html, update_index_html
+from html_generator import generate_daily_html, update_index_html, render_daily_html, TEMPLATE_DIR
 from rss_feed import generate_rss_feed
 from utils import get_taiwan_date, validate_json_output
+from output_schemas import ALCHEMIST_SCHEMA, NARRATOR_SCHEMA, EDITOR_SCHEMA
 from execution_logger import ExecutionLogger
+from usage_ledger import write_daily_rollup
 from health_check import run_health_check
 from error_notifier import notify_error
 
+# 增量條目庫（RSS_ENTRY_STORE=0 關閉，改回每次全量篩選）
+ENTRY_STORE_ENABLED = os.getenv('RSS_ENTRY_STORE', '1') != '0'
+# 日報 HTML 渲染方式：'llm'（AI HTML 生成器）| 'template'（本地模板渲染，略過第四次 LLM 呼叫）
+HTML_RENDER_MODE = os.getenv('HTML_RENDER_MODE', 'llm')
+# 科技導讀人模式：'single'（整份日報一次呼叫）| 'fanout'（各分類章節平行撰寫）
+NARRATOR_MODE = os.getenv('NARRATOR_MODE', 'single')
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def retry_call(fn, args=(), kwargs=None, max_retries=2, step_name=""):
-    """對函式做 retry，每次失敗等待 5 秒再重試。
-
-    Returns:
-        fn 的回傳值
-    Raises:
-        最後一次例外（若全部失敗）
-    """
-    kwargs = kwargs or {}
-    last_error = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            return fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            logger.warning(f"⚠️ [{step_name}] 第 {attempt} 次失敗: {e}")
-            if attempt < max_retries:
-                logger.info(f"⏳ [{step_name}] {5}s 後重試...")
-                time.sleep(5)
-    raise last_error
-
-
 def log_step(exec_logger, name, node_type, description, fn, *args, **kwargs):
     """執行一個 pipeline 步驟並自動記錄 exec_logger。
 
@@ -88,18 +97,38 @@ def log_step(exec_logger, name, node_type, description, fn, *args, **kwargs):
 # Pipeline Steps
 # ---------------------------------------------------------------------------
 
-def step_fetch_rss(today_date):
-    """步驟 2: 讀取 RSS feeds"""
-    all_feeds = fetch_all_rss_feeds(today_date)
-    if not all_feeds:
+def step_fetch_rss(today_date, store=None, exec_logger=None):
+    """步驟 2: 讀取 RSS feeds（有條目庫時只回傳新增/變更的新聞；有 exec_logger 時每個來源記為一個 span）"""
+    on_feed = None
+    if exec_logger is not None:
+        parent = exec_logger.current_span()
+        on_feed = lambda name, start_ns, end_ns, count: exec_logger.record_span(
+            f"rss {name}", start_ns, end_ns, kind="rss_feed", parent=parent,
+            status="ok" if count else "error", source=name, entries=count)
+    all_feeds = fetch_all_rss_feeds(today_date, store=store, on_feed=on_feed)
+    if not all_feeds and store is None:
         raise RuntimeError("RSS 讀取結果為空，無法繼續")
-    logger.info(f"📡 讀取 {len(all_feeds)} 則新聞")
+    logger.info(f"📡 讀取 {len(all_feeds)} 則{'新' if store is not None else ''}新聞")
     return all_feeds
 
 
-def step_filter_news(all_feeds, today_date):
+def rss_input_hash(today_date, store=None):
+    """
+    rss 階段的輸入雜湊：來源設定 + 本機的 feed 狀態（條目庫今日條目、條件式 GET 快取的 validator）
+
+    讀取本身會改變這些狀態，因此由 CheckpointStore.run 在讀取後重算並保存；
+    續跑時狀態與上次讀取後相同才沿用檢查點，期間若有其他執行讀到新條目就重新讀取。
+    """
+    return content_hash(
+        today_date, RSS_SOURCES, ENTRY_STORE_ENABLED,
+        store.day_digest(today_date) if store is not None else None,
+        FeedCache().state_digest([cfg['url'] for cfg in RSS_SOURCES.values()]) if FEED_CACHE_ENABLED else None,
+    )
+
+
+def step_filter_news(all_feeds, today_date, store=None):
     """步驟 3: 篩選與評分"""
-    filtered = filter_and_score_news(all_feeds, today_date)
+    filtered = filter_and_score_news(all_feeds, today_date, store=store)
     if not filtered:
         raise RuntimeError("沒有新聞通過篩選，流程終止")
     local = sum(1 for n in filtered if n.get('is_taiwan_news', False))
@@ -116,46 +145,141 @@ def step_filter_news(all_feeds, today_date):
     return filtered
 
 
-def step_ai_chain(filtered_news, today_date):
-    """步驟 4: AI 四階段處理鏈，每階段帶 retry"""
+def _ai_stage(fn, args=(), kwargs=None, step_name="", parse_json=True, schema=None, stage_metrics=None,
+              exec_logger=None):
+    """
+    以 STAGE_RETRY_POLICY 執行一個 AI 階段（呼叫 + JSON / 結構驗證一起重試），
+    記錄該階段的串流指標，並將每次嘗試回報到 exec_logger 的「AI 處理鏈」節點
+    """
+    attempts = [0]
+
+    def run_once():
+        clear_last_call_metrics()
+        raw = fn(*args, **(kwargs or {}))
+        if stage_metrics is not None:
+            stage_metrics[step_name] = get_last_call_metrics()
+        return validate_json_output(raw, step_name, schema) if parse_json else raw
+
+    def attempt():
+        attempts[0] += 1
+        if exec_logger is None:
+            return run_once()
+        with exec_logger.span(step_name, kind="ai_stage", attempt=attempts[0]):
+            return run_once()
+
+    on_attempt = None
+    if exec_logger is not None:
+        on_attempt = lambda info: exec_logger.log_node_attempt("AI 處理鏈", info)
+    return STAGE_RETRY_POLICY.run(attempt, step_name=step_name, on_attempt=on_attempt)
+
+
+def format_stage_metrics(stage_metrics):
+    """將各階段串流指標轉為 exec_logger 的顯示字串"""
+    formatted = {}
+    for step_name, m in stage_metrics.items():
+        if m.get('cached'):
+            formatted[step_name] = "快取命中"
+        elif m.get('stream'):
+            formatted[step_name] = (f"TTFT {m['ttft_secs']}s / {m['tokens_per_sec']} tok/s"
+                                    f"{' / 截斷' if m.get('truncated') else ''}")
+        elif m:
+            formatted[step_name] = f"{m.get('total_secs')}s"
+        if m.get('cached_prompt_tokens') and step_name in formatted:
+            formatted[step_name] += f" / 前綴快取 {m['cached_prompt_tokens']}/{m['prompt_tokens']}"
+        if m.get('fallback') and step_name in formatted:
+            formatted[step_name] += f" / 備援 {m['route']}"
+    return formatted
+
+
+def _category_progress(exec_logger=None):
+    """
+    數據煉金術師的 on_category 回呼：串流中每個分類一完成就記錄，
+    有 exec_logger 時補記為目前階段底下的一個 span（區間為上一個分類完成到這個分類完成）
+    """
+    last = [time.perf_counter_ns()]
+
+    def on_category(category, items):
+        now = time.perf_counter_ns()
+        parent = exec_logger.current_span() if exec_logger is not None else None
+        started = max(last[0], parent.start_ns) if parent is not None else last[0]   # 重試時從本次嘗試起算
+        count = len(items) if isinstance(items, list) else 0
+        logger.info(f"    ⚗️  分類完成: {category}（{count} 則，{(now - started) / 1e9:.1f}s）")
+        if exec_logger is not None:
+            exec_logger.record_span(f"alchemist {category}", started, now, kind="ai_category",
+                                    parent=parent, category=category, items=count)
+        last[0] = now
+
+    return on_category
+
+
+def step_ai_chain(filtered_news, today_date, checkpoints=None, stage_metrics=None, exec_logger=None):
+    """步驟 4: AI 四階段處理鏈，每階段依重試策略執行，有檢查點時可跳過輸入未變更的階段
+
+    stage_metrics 若提供 dict，會填入各階段的 TTFT / tokens/sec 等指標；
+    exec_logger 若提供，每次嘗試都會記錄在「AI 處理鏈」節點的 attempts，
+    數據煉金術師串流中完成的每個分類也會各記為一個 span
+    """
+    checkpoints = checkpoints or CheckpointStore(today_date)
 
     # 4.1 數據煉金術師 (DeepSeek)
     logger.info("  ⚗️  數據煉金術師...")
-    raw = retry_call(
-        process_with_data_alchemist,
-        args=(filtered_news, today_date),
-        step_name="數據煉金術師"
+    alchemist_json = checkpoints.run(
+        'alchemist',
+        content_hash(checkpoints.output_hash('filter') or content_hash(filtered_news),
+                     today_date, DATA_ALCHEMIST_SYSTEM_PROMPT, ALCHEMIST_SCHEMA, stage_config('alchemist')),
+        _ai_stage, process_with_data_alchemist, (filtered_news, today_date),
+        kwargs={"on_category": _category_progress(exec_logger)},
+        step_name="數據煉金術師", schema=ALCHEMIST_SCHEMA, stage_metrics=stage_metrics, exec_logger=exec_logger
     )
-    alchemist_json = validate_json_output(raw, "數據煉金術師")
 
     # 4.2 科技導讀人 (OpenAI)
     logger.info("  📰 科技導讀人...")
-    raw = retry_call(
-        process_with_tech_narrator,
-        args=(alchemist_json, today_date),
-        step_name="科技導讀人"
+    narrator_json = checkpoints.run(
+        'narrator',
+        content_hash(checkpoints.output_hash('alchemist'), today_date, NARRATOR_MODE,
+                     TECH_NARRATOR_SECTION_SYSTEM_PROMPT if NARRATOR_MODE == 'fanout' else TECH_NARRATOR_SYSTEM_PROMPT,
+                     NARRATOR_SCHEMA, stage_config('narrator')),
+        _ai_stage,
+        process_with_tech_narrator_fanout if NARRATOR_MODE == 'fanout' else process_with_tech_narrator,
+        (alchemist_json, today_date),
+        step_name="科技導讀人", schema=NARRATOR_SCHEMA, stage_metrics=stage_metrics, exec_logger=exec_logger
     )
-    narrator_json = validate_json_output(raw, "科技導讀人")
 
     # 4.3 總編輯 (OpenAI)
     logger.info("  ✍️  總編輯...")
-    raw = retry_call(
-        process_with_editor_in_chief,
-        args=(narrator_json, today_date),
-        step_name="總編輯"
+    editor_json = checkpoints.run(
+        'editor',
+        content_hash(checkpoints.output_hash('narrator'), today_date, EDITOR_IN_CHIEF_SYSTEM_PROMPT,
+                     EDITOR_SCHEMA, stage_config('editor')),
+        _ai_stage, process_with_editor_in_chief, (narrator_json, today_date),
+        step_name="總編輯", schema=EDITOR_SCHEMA, stage_metrics=stage_metrics, exec_logger=exec_logger
     )
-    editor_json = validate_json_output(raw, "總編輯")
 
-    # 4.4 HTML 生成器 (DeepSeek)
+    # 4.4 HTML 生成器 (DeepSeek)；模板模式改以本地模板渲染，同樣寫 html 檢查點
+    if HTML_RENDER_MODE == 'template':
+        logger.info("  🧩 模板渲染模式，略過 HTML 生成器")
+        html_content = checkpoints.run(
+            'html',
+            content_hash(checkpoints.output_hash('narrator'), checkpoints.output_hash('editor'), today_date,
+                         HTML_RENDER_MODE, (TEMPLATE_DIR / "daily_news.html").read_text(encoding="utf-8")),
+            render_daily_html, today_date,
+            narrator_json.get('notion_daily_report_text', ''), editor_json.get('line_message_text', ''),
+        )
+        return narrator_json, editor_json, html_content
+
     logger.info("  🎨 HTML 生成器...")
-    html_content = retry_call(
+    html_content = checkpoints.run(
+        'html',
+        content_hash(checkpoints.output_hash('narrator'), checkpoints.output_hash('editor'),
+                     today_date, HTML_GENERATOR_SYSTEM_PROMPT, HTML_GENERATOR_TEMPLATE_PROMPT, stage_config('html')),
+        _ai_stage,
         process_with_html_generator,
         kwargs={
             "notion_content": narrator_json.get('notion_daily_report_text', ''),
             "line_content": editor_json.get('line_message_text', ''),
             "today_date": today_date,
         },
-        step_name="HTML 生成器"
+        step_name="HTML 生成器", parse_json=False, stage_metrics=stage_metrics, exec_logger=exec_logger
     )
 
     return narrator_json, editor_json, html_content
@@ -182,14 +306,18 @@ def step_generate_output(today_date, narrator_json, editor_json, html_content):
         }
     }
 
-    # 生成 HTML
-    daily_path = generate_daily_html(final_output, html_content)
+    # 生成 HTML（模板模式的 html_content 是已渲染的完整頁面）
+    if HTML_RENDER_MODE == 'template':
+        daily_path = generate_daily_html(final_output, rendered_html=html_content)
+    else:
+        daily_path = generate_daily_html(final_output, html_content)
     index_path = update_index_html(today_date)
     logger.info(f"📝 HTML: {daily_path}, {index_path}")
 
-    # 寫入 latest.json
-    with open('latest.json', 'w', encoding='utf-8') as f:
+    # 寫入 latest.json（先寫暫存檔再替換，LINE webhook 的快取不會讀到寫一半的檔案）
+    with open('latest.json.tmp', 'w', encoding='utf-8') as f:
         json.dump(final_output['news_json'], f, ensure_ascii=False, indent=2)
+    os.replace('latest.json.tmp', 'latest.json')
     logger.info("💾 latest.json 已儲存")
 
     # 生成 RSS feed
@@ -204,9 +332,36 @@ def step_generate_output(today_date, narrator_json, editor_json, html_content):
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
+def finish_execution(exec_logger, status, today_date=None):
+    """結束執行：寫 execution_log.json 與追蹤紀錄，有 LLM 呼叫時更新 data/usage/<date>.json"""
+    exec_logger.complete_execution(status)
+    exec_logger.save_to_file("execution_log.json")
+    exec_logger.export_trace("execution_trace.json")
+    exec_logger.export_otlp("execution_trace.otlp.json")
+    exec_logger.close()
+    if today_date and exec_logger.execution_data["llm_calls"]:
+        try:
+            write_daily_rollup(today_date, exec_logger.execution_data)
+        except Exception as e:
+            logger.warning(f"⚠️ 用量 rollup 寫入失敗: {e}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Thinker News 每日新聞生成")
+    parser.add_argument("--resume", action="store_true",
+                        help="載入 data/<date>/ 中輸入未變更的階段檢查點")
+    parser.add_argument("--from-stage", choices=STAGES, default=None,
+                        help="從指定階段起重新執行（之前的階段沿用檢查點，隱含 --resume）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """主執行流程"""
+    args = parse_args(argv)
     exec_logger = ExecutionLogger()
+    set_usage_sink(exec_logger.log_llm_call)
+    store = None
+    today_date = None
 
     try:
         # 步驟 0: 健檢（環境變數 + 依賴 + 模板 + 輸出目錄）
@@ -216,8 +371,7 @@ def main():
             logger.error("❌ 健檢未通過，終止執行")
             failed_checks = [c["name"] for c in hc.get("checks", []) if not c.get("ok")]
             notify_error("健康檢查", f"健檢未通過: {', '.join(failed_checks)}")
-            exec_logger.complete_execution("error")
-            exec_logger.save_to_file("execution_log.json")
+            finish_execution(exec_logger, "error")
             return 1
 
         # 初始化 API 單例
@@ -229,11 +383,19 @@ def main():
         today_date = get_taiwan_date()
         logger.info(f"📅 今日日期: {today_date}")
 
+        checkpoints = CheckpointStore(today_date, resume=args.resume, from_stage=args.from_stage)
+        if checkpoints.resume:
+            logger.info(f"⏯️  續跑模式（檢查點: {checkpoints.dir}，強制重跑: {args.from_stage or '無'}）")
+
+        if ENTRY_STORE_ENABLED:
+            store = EntryStore()
+
         # 步驟 2: RSS
         all_feeds = log_step(
             exec_logger, "RSS Feed 讀取", "rss",
             "讀取所有新聞來源的 RSS feeds",
-            step_fetch_rss, today_date
+            checkpoints.run, 'rss', lambda: rss_input_hash(today_date, store),
+            step_fetch_rss, today_date, store, exec_logger
         )
         sources = {}
         for f in all_feeds:
@@ -246,7 +408,9 @@ def main():
         filtered_news = log_step(
             exec_logger, "台灣本地化篩選", "filter",
             "篩選和排序新聞",
-            step_filter_news, all_feeds, today_date
+            checkpoints.run, 'filter',
+            content_hash(checkpoints.output_hash('rss'), today_date, SCORING_VERSION),
+            step_filter_news, all_feeds, today_date, store
         )
         local_count = sum(1 for n in filtered_news if n.get('is_taiwan_news', False))
         exec_logger.log_node_success("台灣本地化篩選", {"count": len(filtered_news)},
@@ -254,9 +418,12 @@ def main():
                                       "台灣": f"{local_count}", "國際": f"{len(filtered_news) - local_count}"})
 
         # 步驟 4: AI 處理鏈
-        exec_logger.log_node_start("AI 處理鏈", "ai", "四階段 AI 處理")
-        narrator_json, editor_json, html_content = step_ai_chain(filtered_news, today_date)
-        exec_logger.log_node_success("AI 處理鏈", None, {"階段": "4/4 完成"})
+        ai_stages = 3 if HTML_RENDER_MODE == 'template' else 4
+        exec_logger.log_node_start("AI 處理鏈", "ai", f"{'三' if ai_stages == 3 else '四'}階段 AI 處理")
+        stage_metrics = {}
+        narrator_json, editor_json, html_content = step_ai_chain(filtered_news, today_date, checkpoints, stage_metrics, exec_logger)
+        exec_logger.log_node_success("AI 處理鏈", None, {"階段": f"{ai_stages}/{ai_stages} 完成",
+                                                        **format_stage_metrics(stage_metrics)})
         logger.info("✅ AI 處理鏈完成")
 
         # 步驟 5-7: 輸出
@@ -271,8 +438,7 @@ def main():
         logger.info("🎉 新聞生成流程完成！")
         logger.info(f"📊 原始 {len(all_feeds)} → 篩選 {len(filtered_news)} → {today_date}.html")
 
-        exec_logger.complete_execution("success")
-        exec_logger.save_to_file("execution_log.json")
+        finish_execution(exec_logger, "success", today_date)
         return 0
 
     except Exception as e:
@@ -283,12 +449,15 @@ def main():
         except Exception:
             logger.warning("⚠️ 錯誤通知發送失敗")
         try:
-            exec_logger.complete_execution("error")
-            exec_logger.save_to_file("execution_log.json")
+            finish_execution(exec_logger, "error", today_date)
         except Exception:
             pass
         return 1
 
+    finally:
+        if store is not None:
+            store.close()
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+輕量 Markdown → HTML 轉換
+只支援日報實際用到的語法，不需額外依賴：
+
+- 標題：# ~ ######
+- 段落（空行分段，段內換行轉 <br>）
+- 無序 / 有序清單：- / * / 1.
+- 分隔線：--- / ***
+- 行內：**粗體**、*斜體*、`程式碼`、[文字](連結)、裸網址
+
+所有文字先做 HTML escape，只有上述語法會產生標籤。
+"""
+
+import re
+import html
+from typing import List
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_HR_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_UL_RE = re.compile(r'^\s*[-*+]\s+(.*)$')
+_OL_RE = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+
+_CODE_RE = re.compile(r'`([^`]+)`')
+_LINK_RE = re.compile(r'\[([^\]]+)\]\((https?://[^)\s]+)\)')
+_BARE_URL_RE = re.compile(r'(?<!["=>])(https?://[^\s<>"\')\]]+)')
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+_ITALIC_RE = re.compile(r'(?<![*A-Za-z0-9])\*(?!\s)(.+?)(?<!\s)\*(?![*A-Za-z0-9])')
+
+
+def _inline(text: str) -> str:
+    """轉換行內語法（輸入為未 escape 的原文）"""
+    placeholders: List[str] = []
+
+    def stash(fragment: str) -> str:
+        placeholders.append(fragment)
+        return f"\x00{len(placeholders) - 1}\x00"
+
+    text = _CODE_RE.sub(lambda m: stash(f"<code>{html.escape(m.group(1))}</code>"), text)
+    text = _LINK_RE.sub(
+        lambda m: stash(f'<a href="{html.escape(m.group(2))}" target="_blank">{_inline(m.group(1))}</a>'),
+        text,
+    )
+    text = html.escape(text, quote=False)
+    text = _BARE_URL_RE.sub(lambda m: stash(f'<a href="{m.group(1)}" target="_blank">{m.group(1)}</a>'), text)
+    text = _BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    text = _ITALIC_RE.sub(r'<em>\1</em>', text)
+    return re.sub(r'\x00(\d+)\x00', lambda m: placeholders[int(m.group(1))], text)
+
+
+def markdown_to_html(text: str) -> str:
+    """
+    將 Markdown 轉為 HTML 片段
+
+    Args:
+        text: Markdown 文字
+
+    Returns:
+        HTML 字串
+    """
+    out: List[str] = []
+    paragraph: List[str] = []
+    list_tag = None
+
+    def flush_paragraph():
+        if paragraph:
+            out.append('<p>' + '<br>\n'.join(_inline(line) for line in paragraph) + '</p>')
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f'</{list_tag}>')
+            list_tag = None
+
+    for raw_line in (text or '').replace('\r\n', '\n').split('\n'):
+        line = raw_line.rstrip()
+
+        if not line.strip():
+            flush_paragraph()
+            close_list()
+            continue
+
+        if _HR_RE.match(line):
+            flush_paragraph()
+            close_list()
+            out.append('<hr>')
+            continue
+
+        m = _HEADING_RE.match(line)
+        if m:
+            flush_paragraph()
+            close_list()
+            level = len(m.group(1))
+            out.append(f'<h{level}>{_inline(m.group(2))}</h{level}>')
+            continue
+
+        ul, ol = _UL_RE.match(line), _OL_RE.match(line)
+        if ul or ol:
+            flush_paragraph()
+            tag = 'ul' if ul else 'ol'
+            if list_tag != tag:
+                close_list()
+                out.append(f'<{tag}>')
+                list_tag = tag
+            out.append(f'<li>{_inline((ul or ol).group(1))}</li>')
+            continue
+
+        close_list()
+        paragraph.append(line.strip())
+
+    flush_paragraph()
+    close_list()
+    return '\n'.join(out)
@@ -0,0 +1,187 @@
+"""
+模型路由與斷路器
+每個階段有一張路由表（主要模型 + 依序的備援模型），依實際觀測到的
+延遲、錯誤率與輸出有效性決定本次嘗試順序：
+
+- 斷路器：同一路由連續失敗 BREAKER_FAILURE_THRESHOLD 次即「開路」，
+  BREAKER_COOLDOWN_SECS 內直接跳過；冷卻後放行一次試探（half-open），成功即恢復。
+  試探資格在實際呼叫前才由 acquire 取得，只列入候選但沒輪到的路由不會佔住試探
+- 降級：近期錯誤率（含輸出無效）或平均延遲超過門檻的路由排到健康路由之後
+- 健康狀態在同一 process 內跨階段共用（煉金術師階段發現 DeepSeek 掛了，
+  HTML 階段就不會再先等它 timeout）
+
+用法:
+    router = ModelRouter({'alchemist': [Route('deepseek', 'deepseek-chat'), Route('openai', 'gpt-4.1-mini')]})
+    for route in router.candidates('alchemist'):
+        if not router.acquire(route):
+            continue
+        ...
+        router.record(route, ok=True, latency=12.3)
+"""
+
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = 2     # 連續失敗幾次後開路
+BREAKER_COOLDOWN_SECS = 300       # 開路後多久放行試探
+HEALTH_EWMA_ALPHA = 0.3           # 延遲 / 錯誤率的指數移動平均權重
+DEGRADED_ERROR_RATE = 0.5         # 錯誤率超過即視為降級
+DEGRADED_LATENCY_SECS = 180       # 平均延遲超過即視為降級
+
+
+class Route(NamedTuple):
+    """一條路由：供應商 key + 模型名稱"""
+    provider: str
+    model: str
+
+    def __str__(self):
+        return f"{self.provider}/{self.model}"
+
+
+def parse_routes(spec: str) -> List[Route]:
+    """解析 'deepseek:deepseek-chat,openai:gpt-4.1-mini' 形式的路由設定"""
+    routes = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        provider, _, model = part.partition(':')
+        if not model:
+            raise ValueError(f"路由設定格式錯誤（應為 provider:model）: {part}")
+        routes.append(Route(provider.strip(), model.strip()))
+    return routes
+
+
+class _RouteHealth:
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.error_rate = 0.0
+        self.latency: Optional[float] = None
+        self.calls = 0
+
+
+class ModelRouter:
+    """依健康狀態排序各階段路由的路由器（thread-safe）"""
+
+    def __init__(self, routes: Dict[str, List[Route]]):
+        self.routes = routes
+        self._health: Dict[Route, _RouteHealth] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, route: Route) -> _RouteHealth:
+        if route not in self._health:
+            self._health[route] = _RouteHealth()
+        return self._health[route]
+
+    def _is_open(self, health: _RouteHealth, now: float) -> bool:
+        """開路中（冷卻未結束，或已有試探進行中）回 True"""
+        if health.opened_at is None:
+            return False
+        return now - health.opened_at < BREAKER_COOLDOWN_SECS or health.trial_in_flight
+
+    def _degraded(self, health: _RouteHealth) -> bool:
+        return health.calls > 0 and (
+            health.error_rate > DEGRADED_ERROR_RATE
+            or (health.latency is not None and health.latency > DEGRADED_LATENCY_SECS)
+        )
+
+    def candidates(self, stage: str) -> List[Route]:
+        """
+        本次嘗試的路由順序：健康路由（依設定順序）→ 降級路由；開路中的路由略過。
+        全部開路時仍回傳設定順序中的第一條，避免整個階段無路可走。
+        """
+        routes = self.routes.get(stage, [])
+        now = time.monotonic()
+        healthy, degraded = [], []
+        with self._lock:
+            for route in routes:
+                health = self._state(route)
+                if self._is_open(health, now):
+                    logger.info(f"  🔌 [{stage}] {route} 斷路中，略過")
+                    continue
+                (degraded if self._degraded(health) else healthy).append(route)
+
+        ordered = healthy + degraded
+        if not ordered and routes:
+            logger.warning(f"  ⚠️ [{stage}] 所有路由皆斷路，強制嘗試 {routes[0]}")
+            ordered = [routes[0]]
+        return ordered
+
+    def acquire(self, route: Route, force: bool = False) -> bool:
+        """
+        實際呼叫路由前取得許可；half-open 的路由在此才佔用唯一的試探名額
+
+        Args:
+            route: 要呼叫的路由
+            force: 不論斷路狀態都放行（階段內已無其他路由可試時）
+
+        Returns:
+            可以呼叫時回 True；呼叫後必須 record 或 release
+        """
+        with self._lock:
+            health = self._state(route)
+            if health.opened_at is None or force:
+                return True
+            if self._is_open(health, time.monotonic()):
+                return False
+            health.trial_in_flight = True
+            return True
+
+    def record(self, route: Route, ok: bool, latency: Optional[float] = None):
+        """
+        回報一次呼叫結果
+
+        Args:
+            route: 使用的路由
+            ok: 成功且輸出有效
+            latency: 呼叫耗時（秒）
+        """
+        with self._lock:
+            health = self._state(route)
+            health.calls += 1
+            health.trial_in_flight = False
+            health.error_rate += HEALTH_EWMA_ALPHA * ((0.0 if ok else 1.0) - health.error_rate)
+            if latency is not None:
+                health.latency = latency if health.latency is None else (
+                    health.latency + HEALTH_EWMA_ALPHA * (latency - health.latency))
+
+            if ok:
+                if health.opened_at is not None:
+                    logger.info(f"  🔌 {route} 試探成功，恢復路由")
+                health.consecutive_failures = 0
+                health.opened_at = None
+                return
+
+            health.consecutive_failures += 1
+            if health.opened_at is not None or health.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                health.opened_at = time.monotonic()
+                logger.warning(f"  🔌 {route} 連續失敗 {health.consecutive_failures} 次，斷路 {BREAKER_COOLDOWN_SECS}s")
+
+    def release(self, route: Route):
+        """
+        歸還已 acquire 但沒有可回報結果的路由（LLM 快取命中、程式錯誤中止）
+
+        不影響健康統計，只清除 half-open 試探旗標，讓下一次呼叫能再放行試探；
+        否則旗標永遠不會被清除，該路由會一直停在斷路狀態。
+        """
+        with self._lock:
+            self._state(route).trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """各路由的健康狀態（供日誌 / 執行紀錄）"""
+        with self._lock:
+            return {
+                str(route): {
+                    'calls': h.calls,
+                    'error_rate': round(h.error_rate, 3),
+                    'latency': round(h.latency, 2) if h.latency is not None else None,
+                    'open': h.opened_at is not None,
+                }
+                for route, h in self._health.items()
+            }
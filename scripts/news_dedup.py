@@ -0,0 +1,238 @@
+"""
+近似重複新聞合併
+同一則新聞常同時出現在 technews / ithome / inside 與國際來源，
+在送進 AI 處理鏈前先把近似重複的新聞分群，每群只留分數最高的一則，
+其他來源掛在 `duplicates` 欄位作為補充資訊。
+
+做法：
+1. 正規化連結（去掉 scheme、www、追蹤參數、fragment、結尾斜線），相同即同群
+2. 標題 + 內文正規化後切 shingle（英文單字 / 中文單字的相鄰二元組），
+   算 MinHash 簽章（one permutation hashing，每個 shingle 只雜湊一次）
+3. LSH 分 band 丟進 bucket，只比對同 bucket 的候選配對（近似線性時間）
+4. 估計 Jaccard 相似度超過門檻者以 union-find 合併
+"""
+
+import re
+import hashlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from typing import List, Dict, Iterable, Set, Tuple
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+# MinHash / LSH 參數：BANDS × ROWS = 簽章長度；門檻約 (1/BANDS)^(1/ROWS) ≈ 0.5
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SIMILARITY_THRESHOLD = 0.5   # 估計 Jaccard 相似度門檻
+MAX_TEXT_CHARS = 1000        # 只取標題 + 內文前段計算
+
+# 連結中要移除的追蹤參數：名稱完全相符才移除，只有 utm_ 系列以前綴比對
+# （避免誤刪 reference=、sourceid= 這類真正決定頁面內容的參數）
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid', 'ref', 'source', 'mc_cid', 'mc_eid'})
+TRACKING_PARAM_PREFIX = 'utm_'
+
+_HASH_BITS = 64
+# 空 bin 借用鄰近 bin 時加上的位移，確保不會與真實的最小值撞在一起
+_ROTATION_OFFSET = 1 << _HASH_BITS
+_EMPTY_SIGNATURE = (_ROTATION_OFFSET * (NUM_PERM + 1),) * NUM_PERM
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3400-\u9fff]')
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIX)
+
+
+def canonical_link(link: str) -> str:
+    """
+    正規化新聞連結，讓同一篇文章的不同網址形式比對得上
+
+    Examples:
+        https://www.example.com/a/?utm_source=x#top → example.com/a
+    """
+    if not link:
+        return ''
+    try:
+        parts = urlsplit(link.strip())
+    except ValueError:
+        return link.strip().lower()
+
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or ''
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not _is_tracking_param(k)]
+    canonical = f"{host}{path}"
+    if query:
+        canonical += '?' + urlencode(sorted(query))
+    return canonical
+
+
+def _shingles(text: str) -> Set[str]:
+    """正規化文字後切出 shingle：英文單字 / 中文單字的相鄰二元組"""
+    text = _HTML_TAG_RE.sub(' ', text).lower()
+    tokens = _TOKEN_RE.findall(text)
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash_signature(shingles: Iterable[str]) -> Tuple[int, ...]:
+    """
+    計算 MinHash 簽章（one permutation hashing + rotation densification）
+
+    每個 shingle 只雜湊一次，依雜湊值分到 NUM_PERM 個 bin 各取最小值；
+    空 bin 向右借用最近的非空 bin。成本為 O(shingle 數)，而非 O(shingle 數 × NUM_PERM)。
+    """
+    bins = [None] * NUM_PERM
+    for s in shingles:
+        h = int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        b = h % NUM_PERM
+        if bins[b] is None or h < bins[b]:
+            bins[b] = h
+
+    if all(v is None for v in bins):
+        return _EMPTY_SIGNATURE
+
+    signature = list(bins)
+    for i in range(NUM_PERM):
+        if bins[i] is None:
+            j, distance = i, 0
+            while bins[j] is None:
+                j = (j + 1) % NUM_PERM
+                distance += 1
+            signature[i] = bins[j] + distance * _ROTATION_OFFSET
+    return tuple(signature)
+
+
+def _similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """以簽章相同位置的比例估計 Jaccard 相似度"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # 較小 index 當根，群組順序與輸入順序一致
+            if rj < ri:
+                ri, rj = rj, ri
+            self.parent[rj] = ri
+
+
+def cluster_duplicates(items: List[Dict]) -> List[List[int]]:
+    """
+    將近似重複的新聞分群
+
+    Args:
+        items: 新聞列表（使用 title / content / link）
+
+    Returns:
+        群組列表，每群為 items 的 index 列表（依輸入順序）
+    """
+    n = len(items)
+    uf = _UnionFind(n)
+
+    # 1. 正規化連結相同者直接合併
+    by_link: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        link = canonical_link(item.get('link', ''))
+        if not link:
+            continue
+        if link in by_link:
+            uf.union(by_link[link], i)
+        else:
+            by_link[link] = i
+
+    # 2. MinHash + LSH
+    signatures = []
+    for item in items:
+        text = f"{item.get('title', '')} {item.get('content', '')}"[:MAX_TEXT_CHARS]
+        shingles = _shingles(text)
+        signatures.append(minhash_signature(shingles) if shingles else None)
+
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i, sig in enumerate(signatures):
+        if sig is None:
+            continue
+        for band in range(LSH_BANDS):
+            key = (band, sig[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            buckets.setdefault(key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked or uf.find(i) == uf.find(j):
+                    continue
+                checked.add((i, j))
+                if _similarity(signatures[i], signatures[j]) >= SIMILARITY_THRESHOLD:
+                    uf.union(i, j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(uf.find(i), []).append(i)
+    return list(groups.values())
+
+
+def dedupe_news(items: List[Dict], score_key: str = 'relevance_score') -> List[Dict]:
+    """
+    合併近似重複新聞：每群保留分數最高者，其餘掛在 duplicates 欄位
+
+    Args:
+        items: 已評分的新聞列表
+        score_key: 分數欄位名稱
+
+    Returns:
+        去重後的新聞列表（維持代表新聞的原始相對順序）；
+        有重複的代表新聞會多出：
+          - duplicates: [{'source', 'source_label', 'title', 'link'}, ...]
+          - also_reported_by: [來源名稱, ...]
+    """
+    if len(items) < 2:
+        return list(items)
+
+    groups = cluster_duplicates(items)
+
+    kept = []
+    merged = 0
+    for group in groups:
+        best = max(group, key=lambda i: (items[i].get(score_key, 0), -i))
+        if len(group) == 1:
+            kept.append((best, items[best]))
+            continue
+
+        others = [items[i] for i in group if i != best]
+        representative = {
+            **items[best],
+            'duplicates': [
+                {
+                    'source': o.get('source', ''),
+                    'source_label': o.get('source_label', ''),
+                    'title': o.get('title', ''),
+                    'link': o.get('link', ''),
+                }
+                for o in others
+            ],
+            'also_reported_by': sorted({o.get('source', '') for o in others} - {items[best].get('source', '')}),
+        }
+        kept.append((best, representative))
+        merged += len(others)
+
+    kept.sort(key=lambda pair: pair[0])
+    if merged:
+        logger.info(f"  🧬 近似重複合併: {len(items)} → {len(kept)} 則（合併 {merged} 則）")
+    return [item for _, item in kept]
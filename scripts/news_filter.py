@@ -10,10 +10,15 @@
 篩選配置見 filter_config.py
 """
 
+import json
+import hashlib
+from array import array
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Tuple, NamedTuple
 
 from log_config import get_logger
+from keyword_matcher import KeywordMatcher
+from news_dedup import dedupe_news
 from filter_config import (
     SOURCES, TAIWAN_SOURCES, INTERNATIONAL_SOURCES,
     TAIWAN_INTERESTS, GLOBAL_TAIWAN_FOCUS,
@@ -23,6 +28,52 @@ from filter_config import (
 
 logger = get_logger(__name__)
 
+# 修改 calculate_relevance 的評分邏輯時遞增，讓條目庫中的舊分數失效
+SCORING_RULES_REVISION = 1
+
+
+def _scoring_version() -> str:
+    """評分版本：評分規則修訂號 + 篩選設定內容的雜湊"""
+    config = [
+        SCORING_RULES_REVISION, SOURCES,
+        sorted(TAIWAN_SOURCES), sorted(INTERNATIONAL_SOURCES),
+        TAIWAN_INTERESTS, GLOBAL_TAIWAN_FOCUS, MUST_KEEP_PHRASES, PRACTICAL_KEYWORDS,
+    ]
+    raw = json.dumps(config, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+SCORING_VERSION = _scoring_version()
+
+
+# 來源類型加分用的標記詞
+TAIWAN_SOURCE_GLOBAL_MARKERS = ['國際', 'global']
+INTERNATIONAL_SOURCE_TAIWAN_MARKERS = ['taiwan', 'asia']
+
+
+def build_relevance_matcher() -> KeywordMatcher:
+    """
+    從 filter_config 編譯評分用的關鍵字比對器
+
+    文字會先轉小寫再比對，因此關鍵字也一律轉小寫；
+    PRACTICAL_KEYWORDS 沿用原本不轉小寫的比對方式。
+    """
+    classes = {
+        'must_keep': [p.lower() for p in MUST_KEEP_PHRASES],
+        'taiwan_interests': [k.lower() for k in TAIWAN_INTERESTS],
+        'global_taiwan_focus': [k.lower() for k in GLOBAL_TAIWAN_FOCUS],
+        'practical': list(PRACTICAL_KEYWORDS),
+        'tw_global_marker': TAIWAN_SOURCE_GLOBAL_MARKERS,
+        'intl_taiwan_marker': INTERNATIONAL_SOURCE_TAIWAN_MARKERS,
+    }
+    for source, config in SOURCES.items():
+        classes[f'exclude:{source}'] = [k.lower() for k in config.get('exclude', [])]
+        classes[f'priority:{source}'] = [k.lower() for k in config.get('priority_keywords', [])]
+    return KeywordMatcher(classes)
+
+
+RELEVANCE_MATCHER = build_relevance_matcher()
+
 
 def calculate_relevance(item: Dict) -> int:
     """
@@ -47,48 +98,42 @@ def calculate_relevance(item: Dict) -> int:
 
     score = config.get('base_score', 0)
 
+    # 單次掃描取得所有類別的命中
+    hits = RELEVANCE_MATCHER.scan(full_text, title_len=len(title))
+
     # 1. 必須保留
-    for phrase in MUST_KEEP_PHRASES:
-        if phrase.lower() in full_text:
-            return 100
+    if hits.any('must_keep'):
+        return 100
 
     # 2. 排除關鍵字
-    for keyword in config.get('exclude', []):
-        if keyword.lower() in full_text:
-            score -= 5
-
-    # 3. 來源優先關鍵字
-    for keyword in config.get('priority_keywords', []):
-        keyword_lower = keyword.lower()
-        if keyword_lower in title:
-            score += 10
-        elif keyword_lower in content:
-            score += 5
+    score -= 5 * hits.count(f'exclude:{source}')
+
+    # 3. 來源優先關鍵字（標題命中優先於內文）
+    priority = f'priority:{source}'
+    title_hits = hits.keywords(priority, 'title')
+    content_hits = hits.keywords(priority, 'content') - title_hits
+    weights = RELEVANCE_MATCHER.class_weights.get(priority, {})
+    score += 10 * sum(weights[kw] for kw in title_hits)
+    score += 5 * sum(weights[kw] for kw in content_hits)
 
     # 4. 台灣興趣關鍵字（額外加分）
-    for keyword in TAIWAN_INTERESTS:
-        if keyword.lower() in full_text:
-            score += 4
+    score += 4 * hits.count('taiwan_interests')
 
     # 5. 全球但台灣關注的主題
-    for keyword in GLOBAL_TAIWAN_FOCUS:
-        if keyword.lower() in full_text:
-            score += 6
+    score += 6 * hits.count('global_taiwan_focus')
 
     # 6. 來源類型加分
     if source in TAIWAN_SOURCES:
         score += 5
-        if '國際' in full_text or 'global' in full_text:
+        if hits.any('tw_global_marker'):
             score += 8
 
     if source in INTERNATIONAL_SOURCES:
-        if 'taiwan' in full_text or 'asia' in full_text:
+        if hits.any('intl_taiwan_marker'):
             score += 10
 
     # 7. 實用性加分
-    for keyword in PRACTICAL_KEYWORDS:
-        if keyword in title:
-            score += 7
+    score += 7 * hits.count('practical', 'title')
 
     # 8. 內容長度
     if len(content) > 300:
@@ -99,13 +144,151 @@ def calculate_relevance(item: Dict) -> int:
     return score
 
 
-def filter_and_score_news(all_news: List[Dict], target_date: str) -> List[Dict]:
+class _SourceProfile(NamedTuple):
+    """單一來源預先計算好的評分查表（score_batch 用）"""
+    base_score: int
+    source_bonus: int                # 台灣來源固定 +5
+    marker_class: str                # 來源類型標記詞類別（無則為空字串）
+    marker_bonus: int                # 命中標記詞的加分
+    full_weights: Dict[str, int]     # 全文命中的合併加減分（排除 -5、台灣興趣 +4、全球台灣 +6）
+    priority_weights: Dict[str, int] # 來源優先關鍵字出現次數（標題 +10 / 內文 +5）
+
+
+def _build_source_profile(source: str) -> _SourceProfile:
+    weights = RELEVANCE_MATCHER.class_weights
+    full_weights: Dict[str, int] = {}
+    for cls, points in ((f'exclude:{source}', -5), ('taiwan_interests', 4), ('global_taiwan_focus', 6)):
+        for kw, times in weights.get(cls, {}).items():
+            full_weights[kw] = full_weights.get(kw, 0) + points * times
+
+    marker_class, marker_bonus = '', 0
+    if source in TAIWAN_SOURCES:
+        marker_class, marker_bonus = 'tw_global_marker', 8
+    elif source in INTERNATIONAL_SOURCES:
+        marker_class, marker_bonus = 'intl_taiwan_marker', 10
+
+    return _SourceProfile(
+        base_score=SOURCES.get(source, {}).get('base_score', 0),
+        source_bonus=5 if source in TAIWAN_SOURCES else 0,
+        marker_class=marker_class,
+        marker_bonus=marker_bonus,
+        full_weights=full_weights,
+        priority_weights=weights.get(f'priority:{source}', {}),
+    )
+
+
+_SOURCE_PROFILES: Dict[str, _SourceProfile] = {}
+
+
+def _source_profile(source: str) -> _SourceProfile:
+    profile = _SOURCE_PROFILES.get(source)
+    if profile is None:
+        profile = _SOURCE_PROFILES[source] = _build_source_profile(source)
+    return profile
+
+
+def score_batch(items: List[Dict]) -> List[int]:
+    """
+    批次計算相關性分數，結果與逐一呼叫 calculate_relevance 完全相同
+
+    先逐則掃描文字，把命中結果攤平成欄位（命中加權、標題/內文命中、
+    標記詞、內文長度），再以來源查表逐欄組合出分數。
+
+    Args:
+        items: 新聞項目列表
+
+    Returns:
+        與 items 同順序的分數列表
+    """
+    n = len(items)
+    practical = RELEVANCE_MATCHER.class_weights.get('practical', {})
+    scan = RELEVANCE_MATCHER.scan
+
+    # 欄位式中間結果
+    profiles = [_source_profile(item.get('source', 'unknown')) for item in items]
+    must_keep = bytearray(n)
+    full_points = array('i', bytes(4 * n))
+    priority_title = array('i', bytes(4 * n))
+    priority_content = array('i', bytes(4 * n))
+    marker_hit = bytearray(n)
+    practical_title = array('i', bytes(4 * n))
+    content_len = array('i', bytes(4 * n))
+
+    for i, item in enumerate(items):
+        title = item.get('title', '').lower()
+        content = item.get('content', '').lower()
+        hits = scan(f"{title} {content}", title_len=len(title))
+
+        if hits.any('must_keep'):
+            must_keep[i] = 1
+            continue
+
+        profile = profiles[i]
+        full_weights = profile.full_weights
+        priority_weights = profile.priority_weights
+
+        full_points[i] = sum(full_weights.get(kw, 0) for kw in hits.full)
+        priority_title[i] = sum(priority_weights.get(kw, 0) for kw in hits.title)
+        priority_content[i] = sum(priority_weights.get(kw, 0)
+                                  for kw in hits.content if kw not in hits.title)
+        if profile.marker_class and hits.any(profile.marker_class):
+            marker_hit[i] = 1
+        practical_title[i] = sum(practical.get(kw, 0) for kw in hits.title)
+        content_len[i] = len(content)
+
+    # 逐欄組合分數
+    return [
+        100 if keep else (
+            profile.base_score + profile.source_bonus
+            + points + 10 * p_title + 5 * p_content
+            + (profile.marker_bonus if marker else 0)
+            + 7 * practical_hits
+            + (2 if length > 300 else 0) + (2 if length > 500 else 0)
+        )
+        for keep, profile, points, p_title, p_content, marker, practical_hits, length in zip(
+            must_keep, profiles, full_points, priority_title, priority_content,
+            marker_hit, practical_title, content_len,
+        )
+    ]
+
+
+def _published_on(item: Dict, day: str) -> bool:
+    """新聞是否於指定日期發佈（無發佈時間者視為符合）"""
+    pub_date = item.get('isoDate', '')
+    if not pub_date:
+        return True
+    try:
+        pub_dt = datetime.fromisoformat(pub_date.replace('Z', '+00:00'))
+    except Exception:
+        return False
+    return pub_dt.strftime('%Y-%m-%d') == day
+
+
+def _candidates_from_store(store, day: str) -> List[Tuple[Dict, int]]:
+    """從條目庫的發佈日索引取出候選新聞，只對尚未評分（或評分版本過期）者評分"""
+    candidates = store.items_for_day(day, SCORING_VERSION)
+    unscored = [item for item in candidates if 'relevance_score' not in item]
+
+    scored = list(zip(unscored, score_batch(unscored)))
+    store.save_scores(scored, SCORING_VERSION)
+    for item, score in scored:
+        item['relevance_score'] = score
+
+    logger.info(f"  📦 條目庫候選 {len(candidates)} 則（本次評分 {len(unscored)} 則）")
+    return [(item, item.pop('relevance_score')) for item in candidates]
+
+
+def filter_and_score_news(all_news: List[Dict], target_date: str, store=None,
+                          dedupe: bool = True) -> List[Dict]:
     """
     篩選和評分新聞
 
     Args:
         all_news: 所有新聞列表
         target_date: 目標日期
+        store: 增量條目庫（entry_store.EntryStore）；提供時候選新聞改由
+               條目庫的發佈日索引取得，all_news 只需是已寫入條目庫的新條目
+        dedupe: 是否合併跨來源的近似重複新聞（每群保留分數最高者）
 
     Returns:
         篩選後的新聞列表
@@ -121,28 +304,28 @@ def filter_and_score_news(all_news: List[Dict], target_date: str) -> List[Dict]:
     grouped = {source: [] for source in SOURCES}
     grouped['unknown'] = []
 
-    for item in all_news:
-        # 檢查日期
-        pub_date = item.get('isoDate', '')
-        if pub_date:
-            try:
-                pub_dt = datetime.fromisoformat(pub_date.replace('Z', '+00:00'))
-                if pub_dt.strftime('%Y-%m-%d') != yesterday_str:
-                    continue
-            except Exception:
-                continue
-
-        # 計算分數
-        score = calculate_relevance(item)
-        source = item.get('source', 'unknown')
-
-        # 添加額外資訊
-        enriched_item = {
+    if store is not None:
+        candidates = _candidates_from_store(store, yesterday_str)
+    else:
+        day_items = [item for item in all_news if _published_on(item, yesterday_str)]
+        candidates = list(zip(day_items, score_batch(day_items)))
+
+    # 添加額外資訊
+    enriched = [
+        {
             **item,
             'relevance_score': score,
-            'source_label': SOURCE_LABELS.get(source, '📰 其他')
+            'source_label': SOURCE_LABELS.get(item.get('source', 'unknown'), '📰 其他')
         }
+        for item, score in candidates
+    ]
+
+    # 跨來源近似重複合併（只處理會被保留的正分新聞）
+    if dedupe:
+        enriched = dedupe_news([item for item in enriched if item['relevance_score'] > 0])
 
+    for enriched_item in enriched:
+        source = enriched_item.get('source', 'unknown')
         if source in grouped:
             grouped[source].append(enriched_item)
         else:
@@ -0,0 +1,132 @@
+"""
+各 JSON 階段的輸出結構
+讓 API 直接產出 JSON（response_format），並在本地驗證結構，
+取代「找大括號 → 去 ``` → json_repair」的文字擷取。
+
+- OpenAI：json_schema（strict，由本檔的寬鬆結構轉成嚴格版）
+- DeepSeek：只支援 json_object，結構由本地驗證把關
+- LLM_JSON_MODE=schema（預設）/ json（一律 json_object）/ off（不帶 response_format）
+
+本地驗證只實作本專案用到的 JSON Schema 子集：type / properties / required / items。
+"""
+
+import os
+import copy
+from typing import Any, Dict, List, Optional
+
+LLM_JSON_MODE = os.getenv('LLM_JSON_MODE', 'schema')
+
+_ALCHEMIST_CATEGORIES = [
+    'ai_applications_and_tools',
+    'industry_trends_and_news',
+    'security_alerts',
+    'perspectives_and_analysis',
+    'other',
+]
+
+_ALCHEMIST_ITEM = {
+    'type': 'object',
+    'properties': {
+        'rank': {'type': 'integer'},
+        'title': {'type': 'string'},
+        'detailed_content': {'type': 'string'},
+        'practical_takeaways': {'type': 'array', 'items': {'type': 'string'}},
+        'link': {'type': 'string'},
+    },
+    'required': ['title', 'link'],
+}
+
+ALCHEMIST_SCHEMA = {
+    'type': 'object',
+    'properties': {c: {'type': 'array', 'items': _ALCHEMIST_ITEM} for c in _ALCHEMIST_CATEGORIES},
+    'required': [],
+}
+
+NARRATOR_SCHEMA = {
+    'type': 'object',
+    'properties': {'notion_daily_report_text': {'type': 'string'}},
+    'required': ['notion_daily_report_text'],
+}
+
+NARRATOR_SECTION_SCHEMA = {
+    'type': 'object',
+    'properties': {'section_text': {'type': 'string'}},
+    'required': ['section_text'],
+}
+
+NARRATOR_CLOSING_SCHEMA = {
+    'type': 'object',
+    'properties': {'closing_text': {'type': 'string'}},
+    'required': ['closing_text'],
+}
+
+EDITOR_SCHEMA = {
+    'type': 'object',
+    'properties': {'line_message_text': {'type': 'string'}},
+    'required': ['line_message_text'],
+}
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+
+
+def schema_errors(data: Any, schema: Dict, path: str = '$') -> List[str]:
+    """回傳 data 不符合 schema 之處（空 list 表示通過）"""
+    expected = schema.get('type')
+    if expected:
+        py_type = _TYPES[expected]
+        # bool 是 int 的子類別，integer / number 不接受 True / False
+        if not isinstance(data, py_type) or (expected in ('integer', 'number') and isinstance(data, bool)):
+            return [f"{path}: 應為 {expected}，實際為 {type(data).__name__}"]
+
+    errors = []
+    if isinstance(data, dict):
+        for key in schema.get('required', []):
+            if key not in data:
+                errors.append(f"{path}: 缺少欄位 {key}")
+        for key, sub in schema.get('properties', {}).items():
+            if key in data:
+                errors.extend(schema_errors(data[key], sub, f"{path}.{key}"))
+    elif isinstance(data, list) and 'items' in schema:
+        for i, item in enumerate(data):
+            errors.extend(schema_errors(item, schema['items'], f"{path}[{i}]"))
+    return errors
+
+
+def strict_schema(schema: Dict) -> Dict:
+    """轉成 OpenAI strict 模式要求的結構：所有欄位必填、不允許額外欄位"""
+    strict = copy.deepcopy(schema)
+    if strict.get('type') == 'object':
+        properties = strict.get('properties', {})
+        strict['properties'] = {k: strict_schema(v) for k, v in properties.items()}
+        strict['required'] = list(properties)
+        strict['additionalProperties'] = False
+    elif strict.get('type') == 'array' and 'items' in strict:
+        strict['items'] = strict_schema(strict['items'])
+    return strict
+
+
+def response_format_for(provider: str, name: str, schema: Optional[Dict]) -> Optional[Dict]:
+    """
+    依供應商與 LLM_JSON_MODE 產生 response_format 參數
+
+    Args:
+        provider: 路由供應商 key（'openai' / 'deepseek'）
+        name: schema 名稱（OpenAI 要求，英數與底線）
+        schema: 該階段的輸出結構；None 表示不是 JSON 階段
+
+    Returns:
+        response_format dict，或 None（不帶此參數）
+    """
+    if schema is None or LLM_JSON_MODE == 'off':
+        return None
+    if provider == 'openai' and LLM_JSON_MODE == 'schema':
+        return {'type': 'json_schema',
+                'json_schema': {'name': name, 'schema': strict_schema(schema), 'strict': True}}
+    return {'type': 'json_object'}
@@ -0,0 +1,167 @@
+"""
+Prompt 打包器
+在送進數據煉金術師前控制 prompt 大小：
+
+1. 清除 RSS 摘要中的 HTML 標籤與多餘空白
+2. 依相關性分數分配每則新聞的內文 token 額度（分數越高保留越多）
+3. 總量超過預算時，先把低分新聞的內文縮到下限，仍超過才由低分往高分整則捨棄
+4. 回報哪些新聞被截短、哪些被捨棄
+
+token 數以字元估算（中日韓文字約 1 字 1 token，其餘約 4 字元 1 token），
+偏保守，不需要各家 tokenizer。
+"""
+
+import re
+import html
+from typing import List, Dict, NamedTuple
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+# 每則新聞內文的 token 額度（依分數排名在上下限之間線性分配）
+MAX_CONTENT_TOKENS = 600
+MIN_CONTENT_TOKENS = 80
+# 每則新聞標題、連結與 JSON 標點的固定開銷估計
+PER_ITEM_OVERHEAD_TOKENS = 12
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+_CJK_RE = re.compile(r'[⺀-鿿가-힯豈-﫿＀-￯]')
+# 截斷時優先停在句尾
+_SENTENCE_END_RE = re.compile(r'[。！？!?]|\.\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估文字的 token 數（CJK 1 字 1 token，其餘 4 字元 1 token）"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def strip_html(text: str) -> str:
+    """移除 HTML 標籤、還原 entity 並壓縮空白"""
+    if not text:
+        return ''
+    text = _HTML_TAG_RE.sub(' ', text)
+    text = html.unescape(text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    將文字截到約 max_tokens，盡量停在句尾，截斷時補上「…」
+
+    Args:
+        text: 原始文字
+        max_tokens: token 上限
+
+    Returns:
+        截斷後的文字（未超過上限時原樣回傳）
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens * 4  # 以 1/4 token 為單位累計，避免浮點
+    cut = 0
+    for i, ch in enumerate(text):
+        budget -= 4 if _CJK_RE.match(ch) else 1
+        if budget < 0:
+            break
+        cut = i + 1
+
+    truncated = text[:cut]
+    # 最後 30% 內有句尾就停在句尾
+    boundary = None
+    for m in _SENTENCE_END_RE.finditer(truncated, int(cut * 0.7)):
+        boundary = m.end()
+    if boundary:
+        truncated = truncated[:boundary]
+    return truncated.rstrip() + '…'
+
+
+class PackResult(NamedTuple):
+    """打包結果"""
+    items: List[Dict]          # 保留的新聞（title / link / content），維持輸入順序
+    trimmed: List[Dict]        # 被截短者：{'title', 'from_tokens', 'to_tokens'}
+    dropped: List[Dict]        # 被捨棄者：{'title', 'link', 'relevance_score'}
+    estimated_tokens: int      # 新聞部分的估計 token 數
+
+    def summary(self) -> str:
+        return (f"保留 {len(self.items)} 則（截短 {len(self.trimmed)} 則）、"
+                f"捨棄 {len(self.dropped)} 則，估計 {self.estimated_tokens} tokens")
+
+
+def _content_allowance(rank: int, total: int) -> int:
+    """依分數排名（0 為最高）線性分配內文額度"""
+    if total <= 1:
+        return MAX_CONTENT_TOKENS
+    ratio = rank / (total - 1)
+    return int(MAX_CONTENT_TOKENS - ratio * (MAX_CONTENT_TOKENS - MIN_CONTENT_TOKENS))
+
+
+def pack_news_items(news_items: List[Dict], budget_tokens: int) -> PackResult:
+    """
+    依 token 預算打包新聞
+
+    Args:
+        news_items: 篩選後的新聞（使用 title / link / content / relevance_score）
+        budget_tokens: 新聞部分可用的 token 預算
+
+    Returns:
+        PackResult
+    """
+    entries = []
+    for index, item in enumerate(news_items):
+        title = strip_html(item.get('title', ''))
+        link = item.get('link', '')
+        content = strip_html(item.get('content', ''))
+        entries.append({
+            'index': index,
+            'score': item.get('relevance_score', 0),
+            'title': title,
+            'link': link,
+            'content': content,
+            'original_tokens': estimate_tokens(content),
+            'fixed_tokens': estimate_tokens(title) + estimate_tokens(link) + PER_ITEM_OVERHEAD_TOKENS,
+        })
+
+    # 分數高者優先（同分維持原順序）
+    ranked = sorted(entries, key=lambda e: (-e['score'], e['index']))
+    for rank, entry in enumerate(ranked):
+        entry['allowance'] = min(entry['original_tokens'], _content_allowance(rank, len(ranked)))
+
+    def total_tokens(kept):
+        return sum(e['fixed_tokens'] + e['allowance'] for e in kept)
+
+    kept = list(ranked)
+
+    # 超出預算：先由低分往高分把內文縮到下限
+    for entry in reversed(ranked):
+        excess = total_tokens(kept) - budget_tokens
+        if excess <= 0:
+            break
+        floor = min(entry['original_tokens'], MIN_CONTENT_TOKENS)
+        entry['allowance'] = max(floor, entry['allowance'] - excess)
+
+    # 仍超出：由低分往高分整則捨棄（至少保留一則）
+    dropped = []
+    while len(kept) > 1 and total_tokens(kept) > budget_tokens:
+        entry = kept.pop()
+        dropped.append({'title': entry['title'], 'link': entry['link'], 'relevance_score': entry['score']})
+
+    packed, trimmed = [], []
+    for entry in sorted(kept, key=lambda e: e['index']):
+        content = entry['content']
+        if entry['allowance'] < entry['original_tokens']:
+            content = truncate_to_tokens(content, entry['allowance'])
+            trimmed.append({
+                'title': entry['title'],
+                'from_tokens': entry['original_tokens'],
+                'to_tokens': estimate_tokens(content),
+            })
+        packed.append({'title': entry['title'], 'link': entry['link'], 'content': content})
+
+    estimated = sum(estimate_tokens(p['title']) + estimate_tokens(p['link']) + estimate_tokens(p['content'])
+                    + PER_ITEM_OVERHEAD_TOKENS for p in packed)
+    return PackResult(packed, trimmed, dropped, estimated)
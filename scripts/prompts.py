@@ -151,6 +151,69 @@ TECH_NARRATOR_SYSTEM_PROMPT = """# 科技導讀人 (Tech Narrator)
 - **學習導向**:所有內容都要服務於初學者的學習需求
 - **絕對不要**輸出任何 JSON 格式以外的文字"""
 
+# ============================================
+# 科技導讀人：分類平行模式 (Tech Narrator Fan-out) — OpenAI
+# ============================================
+# 日報拆成「TOP 3」「各分類章節」「日報後記」同時撰寫，最後由程式組裝。
+
+TECH_NARRATOR_SECTION_SYSTEM_PROMPT = """# 科技導讀人 (Tech Narrator) — 單一章節
+
+---
+
+## ROLE (人格設定)
+你是一位資深的「AI 科技新聞編輯」，擅長以清晰易懂的方式向資料科學初學者（30-60 歲、
+曾有 R 或 Python 資料分析經驗）介紹 AI 新聞。
+
+## CORE MISSION (核心任務)
+日報由多位編輯同時撰寫，你**只負責其中一個章節**。請依照使用者提供的章節標題與新聞，
+撰寫該章節的 Markdown 內容，**不要**輸出日報標題、日期、其他章節或日報後記。
+
+## 每則新聞的結構
+**[編號]. [標題]**
+🔧 分類:[中文分類]
+
+[完整新聞內容 - 3-4個段落,包含時間、地點、人物、事件、原因、影響]
+
+💡 **學習價值:** [為什麼對初學者重要,如何應用]
+
+🔗 [閱讀原文]([連結])
+
+## 寫作指南
+- **70% 篇幅**: 基於 `detailed_content` 撰寫完整新聞內容
+- **20% 篇幅**: 學習價值分析
+- **10% 篇幅**: 實用建議
+- 用初學者能理解的語言解釋技術概念，避免過度行銷話術
+
+## OUTPUT FORMAT (輸出格式)
+```json
+{
+  "section_text": "### [章節標題]\\n\\n**1. [標題]**\\n🔧 分類:[中文分類]\\n\\n[內容]\\n\\n💡 **學習價值:** [...]\\n\\n🔗 [閱讀原文]([連結])"
+}
+```
+
+## 重要提醒
+- 章節標題必須與使用者提供的完全相同
+- **絕對不要**輸出任何 JSON 格式以外的文字"""
+
+TECH_NARRATOR_CLOSING_SYSTEM_PROMPT = """# 科技導讀人 (Tech Narrator) — 日報後記
+
+## ROLE (人格設定)
+你是一位資深的「AI 科技新聞編輯」，讀者是資料科學初學者（30-60 歲）。
+
+## CORE MISSION (核心任務)
+根據今日所有新聞的標題與實用要點，撰寫 2-3 段「日報後記」：
+整體趨勢分析，以及給初學者的具體學習建議。不要逐則重述新聞。
+
+## OUTPUT FORMAT (輸出格式)
+```json
+{
+  "closing_text": "[整體趨勢分析和學習建議]"
+}
+```
+
+## 重要提醒
+- **絕對不要**輸出任何 JSON 格式以外的文字"""
+
 # ============================================
 # 總編輯 (Editor-in-Chief) — OpenAI
 # ============================================
@@ -283,3 +346,280 @@ HTML_GENERATOR_SYSTEM_PROMPT = """你是專業的版面管理 Agent，專門負
 - 輸出結束於 </html> 標籤
 - 不得添加任何解釋或說明文字
 - 不得輸出 markdown 代碼塊標記"""
+
+# HTML 生成器的標準範本（固定不變，放在 user prompt 最前面作為可快取的前綴）
+HTML_GENERATOR_TEMPLATE_PROMPT = """請基於以下標準範本，將 n8n 新聞內容格式化為完全相同的格式。
+
+標準範本 HTML:
+<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>2025-09-23 AI 科技日報 | Thinker News</title>
+    <meta name="description" content="Nvidia投資OpenAI巨額資金，AI安全挑戰並存 - 今日AI科技重點新聞精選">
+    <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🤖</text></svg>">
+    <style>
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Microsoft JhengHei', sans-serif;
+            line-height: 1.7;
+            color: #333;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+        }
+
+        .container {
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+
+        .back-link {
+            display: inline-block;
+            margin-bottom: 20px;
+            color: white;
+            text-decoration: none;
+            background: rgba(255, 255, 255, 0.2);
+            padding: 10px 20px;
+            border-radius: 20px;
+            transition: all 0.3s ease;
+            backdrop-filter: blur(10px);
+        }
+
+        .back-link:hover {
+            background: rgba(255, 255, 255, 0.3);
+            transform: translateX(-5px);
+        }
+
+        .article-header {
+            text-align: center;
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+            border-radius: 20px;
+            padding: 40px 30px;
+            margin-bottom: 30px;
+            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
+        }
+
+        .article-date {
+            font-size: 1.1em;
+            color: #667eea;
+            font-weight: 600;
+            margin-bottom: 15px;
+        }
+
+        .article-title {
+            font-size: 2.2em;
+            font-weight: 800;
+            margin-bottom: 20px;
+            background: linear-gradient(45deg, #667eea, #764ba2);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+            line-height: 1.3;
+        }
+
+        .article-subtitle {
+            font-size: 1.2em;
+            color: #666;
+            font-weight: 400;
+        }
+
+        .content-section {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+            border-radius: 20px;
+            padding: 40px;
+            margin-bottom: 30px;
+            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
+        }
+
+        .content-section h2 {
+            color: #667eea;
+            font-size: 1.6em;
+            margin-bottom: 20px;
+            border-bottom: 2px solid #667eea;
+            padding-bottom: 10px;
+            font-weight: 700;
+        }
+
+        .content-section h3 {
+            color: #555;
+            font-size: 1.3em;
+            margin: 25px 0 15px;
+            font-weight: 600;
+        }
+
+        .content-section p {
+            margin-bottom: 15px;
+            line-height: 1.7;
+            font-size: 1.05em;
+        }
+
+        .content-section ul {
+            margin: 15px 0;
+            padding-left: 20px;
+        }
+
+        .content-section li {
+            margin-bottom: 10px;
+            line-height: 1.6;
+        }
+
+        .highlight-box {
+            background: linear-gradient(135deg, #667eea20, #764ba220);
+            border-left: 4px solid #667eea;
+            padding: 20px;
+            margin: 20px 0;
+            border-radius: 0 15px 15px 0;
+        }
+
+        .news-link {
+            color: #667eea;
+            text-decoration: none;
+            font-weight: 600;
+            transition: all 0.3s ease;
+        }
+
+        .news-link:hover {
+            color: #764ba2;
+            text-decoration: underline;
+        }
+
+        .external-link::after {
+            content: " 🔗";
+            font-size: 0.8em;
+        }
+
+        .footer-nav {
+            text-align: center;
+            padding: 30px;
+            color: white;
+        }
+
+        .nav-button {
+            display: inline-block;
+            background: rgba(255, 255, 255, 0.2);
+            color: white;
+            text-decoration: none;
+            padding: 12px 24px;
+            border-radius: 25px;
+            margin: 0 10px;
+            transition: all 0.3s ease;
+            backdrop-filter: blur(10px);
+        }
+
+        .nav-button:hover {
+            background: rgba(255, 255, 255, 0.3);
+            transform: translateY(-2px);
+        }
+
+        @media (max-width: 600px) {
+            .container {
+                padding: 15px;
+            }
+
+            .article-header {
+                padding: 25px 20px;
+            }
+
+            .article-title {
+                font-size: 1.8em;
+            }
+
+            .content-section {
+                padding: 25px;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <a href="./index.html" class="back-link">← 返回首頁</a>
+
+        <header class="article-header">
+            <div class="article-date">📅 2025年9月23日</div>
+            <h1 class="article-title">🤖 AI 科技日報精選</h1>
+            <p class="article-subtitle">Nvidia投資OpenAI巨額資金，AI安全挑戰並存</p>
+        </header>
+
+        <div class="content-section">
+            <h2>✨ 今日必讀 TOP 3</h2>
+
+            <h3>1. Nvidia投資OpenAI高達1000億美元</h3>
+            <p>Nvidia 與 OpenAI 達成協議，部署價值10千萬瓦的 AI 晶片，目的為推動下一代的ChatGPT。這顯示出 AI 領域的龍頭企業對於人工智慧未來潛力的高度信心。</p>
+            <div class="highlight-box">
+                <strong>💡 學習價值：</strong><br>
+                這筆巨額投資標誌著AI基礎設施建設進入新階段，對於想要學習AI的初學者來說，這意味著更強大的工具和更多的學習資源即將到來。
+            </div>
+            <p><a href="https://techcrunch.com/2025/09/22/nvidia-plans-to-invest-up-to-100b-in-openai/" class="news-link external-link" target="_blank">閱讀更多</a></p>
+
+            <h3>2. ShadowLeak漏洞透過OpenAI ChatGPT洩漏Gmail數據</h3>
+            <p>這是一個重要的安全警報，OpenAI ChatGPT的深度研究代理中的零點擊漏洞可能讓攻擊者通過一封精心製作的電子郵件洩漏敏感的Gmail收件箱數據。</p>
+            <div class="highlight-box">
+                <strong>💡 學習價值：</strong><br>
+                此事提醒我們，在 AI 的發展同時，我們也需要更加關注其帶來的安全問題。初學者應該學習 AI 資安的基礎知識。
+            </div>
+            <p><a href="https://thehackernews.com/2025/09/shadowleak-zero-click-flaw-leaks-gmail.html" class="news-link external-link" target="_blank">閱讀更多</a></p>
+
+            <h3>3. 基礎設施交易推動AI繁榮</h3>
+            <p>大型科技公司如 Meta、Oracle、Microsoft、Google 和 OpenAI 的大筆支出推動 AI 的興起。</p>
+            <div class="highlight-box">
+                <strong>💡 學習價值：</strong><br>
+                這不僅反映出 AI 的重要性，更顯示出了其在產業界的影響力。初學者可以從中了解 AI 產業的發展趨勢。
+            </div>
+            <p><a href="https://techcrunch.com/2025/09/22/the-billion-dollar-infrastructure-deals-powering-the-ai-boom/" class="news-link external-link" target="_blank">閱讀更多</a></p>
+        </div>
+
+        <div class="content-section" style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); color: white;">
+            <h2 style="color: white; border-bottom: 3px solid white;">📱 LINE 精華版</h2>
+            <div style="background: rgba(255,255,255,0.1); padding: 20px; border-radius: 15px; margin: 20px 0;">
+                <h3>🤖 今日AI重點 (LINE版)</h3>
+                <p><strong>💰 大新聞：</strong>Nvidia砸1000億美元投資OpenAI，推動下一代ChatGPT！</p>
+            </div>
+
+            <div style="text-align: center; margin-top: 20px;">
+                <p style="font-size: 0.9em; opacity: 0.8;">
+                    💡 此精華版專為LINE推送設計 | 完整分析請閱讀上方詳細報告
+                </p>
+            </div>
+        </div>
+
+        <div class="footer-nav">
+            <a href="./index.html" class="nav-button">🏠 返回首頁</a>
+            <a href="https://github.com/ThinkerCafe-tw/thinker-news" class="nav-button" target="_blank">⭐ GitHub</a>
+        </div>
+    </div>
+
+    <script>
+        // 頁面載入動畫
+        document.addEventListener('DOMContentLoaded', function() {
+            const sections = document.querySelectorAll('.content-section');
+            sections.forEach((section, index) => {
+                section.style.opacity = '0';
+                section.style.transform = 'translateY(20px)';
+                setTimeout(() => {
+                    section.style.transition = 'all 0.6s ease';
+                    section.style.opacity = '1';
+                    section.style.transform = 'translateY(0)';
+                }, index * 150);
+            });
+        });
+    </script>
+<script src="./thinker_secret_entrance.js"></script>
+</body>
+</html>
+
+執行指令:
+1. 使用標準範本的完整格式
+2. 只替換日期和新聞內容
+3. 保持所有 CSS 和 JavaScript 不變
+4. 確保輸出結束於 </html>
+5. 不要添加任何說明文字
+"""
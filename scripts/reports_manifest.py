@@ -0,0 +1,292 @@
+"""
+日報清單（reports_manifest.json）
+記錄每篇日報 HTML 的日期、路徑、標題、摘要、大小與 sha256，
+generate_daily_html 寫出頁面時更新一筆；update_index_html 與 generate_rss_feed 直接讀清單，
+不再每次掃描 archive/ 與根目錄、重新解析每個 HTML。
+
+清單同時是頁面中繼資料的快取：每筆以 (path, mtime_ns, size) 為鍵，
+重建時只重新解析新增或變動過的檔案，其餘沿用原項目；
+標題與摘要由串流 head 解析器取得，讀到 </head> 即停（上限 HEAD_MAX_BYTES）。
+
+每個 process 第一次讀取某份清單時 stat 每個列出的檔案並列出 archive/：有檔案不見、
+大小或 mtime 改變，或 archive/ 內有清單沒有的日報（手動 git mv 進來的），就做一次增量重建；
+之後的讀取直接信任清單（同一次發佈會讀好幾次，不能每次都是 O(歸檔大小)）。
+清單遺失或損毀時自動由磁碟重建（找不到任何日報時不寫出空清單）；也可手動重建:
+    python scripts/reports_manifest.py --rebuild
+"""
+
+import os
+import re
+import json
+import codecs
+import hashlib
+from html.parser import HTMLParser
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+# 以 repo 根目錄為基準（LINE bot / 搜尋不一定在 repo 根目錄啟動）；清單內的 path 一律相對 repo 根目錄
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MANIFEST_PATH = REPO_ROOT / 'reports_manifest.json'
+ARCHIVE_DIR = REPO_ROOT / 'archive'
+ARCHIVE_PREFIX = 'archive/'
+MANIFEST_VERSION = 2
+HEAD_CHUNK_BYTES = 4096
+HEAD_MAX_BYTES = 64 * 1024       # 超過仍未見 </head> 就放棄（回傳已取得的部分）
+HASH_CHUNK_BYTES = 64 * 1024
+
+_DATE_FILENAME_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.html$')
+
+# 本 process 已與磁碟核對過的清單路徑
+_reconciled = set()
+
+
+class _HeadParser(HTMLParser):
+    """只收集 <title> 與 meta description，遇到 </head> 或 <body> 即標記完成"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self.done = False
+        self._in_title = False
+        self._title_parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'meta' and self.description is None:
+            attrs = dict(attrs)
+            if (attrs.get('name') or '').lower() == 'description':
+                self.description = (attrs.get('content') or '').strip() or None
+        elif tag == 'body':
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts).strip() or None
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+
+def extract_metadata(chunks: Iterable[bytes]) -> Dict[str, Optional[str]]:
+    """
+    從 HTML 位元組串流取出 <title>（去掉 " | Thinker News"）與 meta description
+
+    逐塊餵給解析器，解析到 </head> 即停止消耗 chunks；最多讀 HEAD_MAX_BYTES。
+    """
+    parser = _HeadParser()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    consumed = 0
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        consumed += len(chunk)
+        if parser.done or consumed >= HEAD_MAX_BYTES:
+            break
+    title = parser.title
+    if title:
+        title = re.sub(r'\s*\|\s*Thinker News$', '', title) or None
+    return {'title': title, 'description': parser.description}
+
+
+def read_head_metadata(report_path: Path) -> Dict[str, Optional[str]]:
+    """只讀檔案開頭到 </head> 為止，取出標題與摘要"""
+    with open(report_path, 'rb') as f:
+        return extract_metadata(iter(lambda: f.read(HEAD_CHUNK_BYTES), b''))
+
+
+def _file_sha256(report_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(report_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _repo_path(report_path: Path) -> str:
+    """檔案路徑 → 清單用的 repo 相對路徑（相對路徑以目前工作目錄解析）"""
+    return Path(report_path).resolve().relative_to(REPO_ROOT).as_posix()
+
+
+def _entry(report_path: Path, content: Optional[bytes] = None) -> Dict:
+    """
+    建立清單項目；content 為 None 時由檔案串流讀取（head 解析 + 分塊雜湊）
+    """
+    st = report_path.stat()
+    if content is not None:
+        metadata = extract_metadata(content[i:i + HEAD_CHUNK_BYTES] for i in range(0, len(content), HEAD_CHUNK_BYTES))
+        sha256 = hashlib.sha256(content).hexdigest()
+    else:
+        metadata = read_head_metadata(report_path)
+        sha256 = _file_sha256(report_path)
+    return {
+        'date': _DATE_FILENAME_RE.match(report_path.name).group(1),
+        'path': _repo_path(report_path),
+        **metadata,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': sha256,
+    }
+
+
+def _is_current(entry: Dict, st: os.stat_result) -> bool:
+    return entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns
+
+
+def _report_files() -> List[Path]:
+    files = []
+    for directory in (ARCHIVE_DIR, REPO_ROOT):
+        if directory.exists():
+            files.extend(f for f in directory.iterdir() if _DATE_FILENAME_RE.match(f.name))
+    return files
+
+
+def _read_manifest(path: Path) -> Optional[Dict]:
+    try:
+        manifest = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def rebuild_manifest(path: Path = MANIFEST_PATH) -> Dict:
+    """
+    由 archive/ 與根目錄的日報 HTML 重建清單（復原用）
+
+    (path, mtime_ns, size) 與現有項目相同的檔案直接沿用，只解析新增或變動的檔案；
+    磁碟上已不存在的項目會被移除。
+    """
+    previous = {r['path']: r for r in (_read_manifest(path) or {}).get('reports', [])}
+    reports, parsed = [], 0
+    for f in _report_files():
+        cached = previous.get(_repo_path(f))
+        if cached and _is_current(cached, f.stat()):
+            reports.append(cached)
+        else:
+            reports.append(_entry(f))
+            parsed += 1
+    manifest = {'version': MANIFEST_VERSION, 'updated_at': None, 'reports': reports}
+    _reconciled.add(str(path))
+    if not reports:
+        logger.warning(f"⚠️ {REPO_ROOT} 下找不到任何日報，不寫出空的清單")
+        return manifest
+    save_manifest(manifest, path)
+    logger.info(f"🗂️  日報清單已重建: {path}（{len(reports)} 篇，重新解析 {parsed} 篇）")
+    return manifest
+
+
+def _stale_reason(manifest: Dict) -> Optional[str]:
+    """清單與磁碟不一致的原因（一致時回 None）"""
+    listed = set()
+    for r in manifest['reports']:
+        try:
+            st = os.stat(REPO_ROOT / r['path'])
+        except OSError:
+            return f"{r['path']} 已不存在"
+        if not _is_current(r, st):
+            return f"{r['path']} 已變更"
+        listed.add(r['path'])
+    if ARCHIVE_DIR.exists():
+        for f in ARCHIVE_DIR.iterdir():
+            if _DATE_FILENAME_RE.match(f.name) and _repo_path(f) not in listed:
+                return f"{_repo_path(f)} 不在清單中"
+    return None
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict:
+    """
+    讀取清單；不存在、無法解析或版本不符時由磁碟重建
+
+    每個 process 只在第一次讀取時與磁碟核對（不一致即增量重建），之後直接信任清單
+    """
+    manifest = _read_manifest(path)
+    if manifest is not None:
+        if str(path) in _reconciled:
+            return manifest
+        reason = _stale_reason(manifest)
+        if reason is None:
+            _reconciled.add(str(path))
+            return manifest
+        logger.info(f"🗂️  日報清單與磁碟不一致（{reason}），增量重建")
+        return rebuild_manifest(path)
+    if Path(path).exists():
+        logger.warning(f"⚠️ 日報清單無法讀取或版本不符，重建: {path}")
+    else:
+        logger.info(f"🗂️  尚無日報清單，由磁碟建立: {path}")
+    return rebuild_manifest(path)
+
+
+def save_manifest(manifest: Dict, path: Path = MANIFEST_PATH):
+    manifest['reports'].sort(key=lambda r: (r['date'], r['path']))
+    manifest['updated_at'] = datetime.now().isoformat()
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def record_report(report_path: Path, content: Optional[str] = None, path: Path = MANIFEST_PATH) -> Dict:
+    """
+    新增或更新一篇日報（generate_daily_html 寫出頁面後呼叫）
+
+    Args:
+        report_path: 日報 HTML 路徑（相對路徑以目前工作目錄解析）
+        content: 剛寫出的 HTML（提供時不必再讀檔）
+
+    Returns:
+        該篇的清單項目
+    """
+    report_path = Path(report_path)
+    entry = _entry(report_path, content.encode('utf-8') if content is not None else None)
+    manifest = load_manifest(path)
+    manifest['reports'] = [r for r in manifest['reports'] if r['path'] != entry['path']] + [entry]
+    save_manifest(manifest, path)
+    logger.info(f"🗂️  日報清單已更新: {entry['path']}")
+    return entry
+
+
+def list_reports(location: Optional[str] = None, path: Path = MANIFEST_PATH) -> List[Dict]:
+    """
+    依日期倒序列出日報
+
+    Args:
+        location: 'archive' 只列 archive/ 內的、'root' 只列根目錄的；None 全部
+                  （同一天兩處都有時兩筆都保留，由呼叫端決定取捨）
+    """
+    reports = load_manifest(path)['reports']
+    if location == 'archive':
+        reports = [r for r in reports if r['path'].startswith(ARCHIVE_PREFIX)]
+    elif location == 'root':
+        reports = [r for r in reports if '/' not in r['path']]
+    return sorted(reports, key=lambda r: r['date'], reverse=True)
+
+
+def latest_per_date(path: Path = MANIFEST_PATH) -> List[Dict]:
+    """每天一篇（archive/ 與根目錄都有時以 archive/ 為準），依日期倒序"""
+    by_date: Dict[str, Dict] = {}
+    for r in list_reports(path=path):
+        existing = by_date.get(r['date'])
+        if existing is None or (r['path'].startswith(ARCHIVE_PREFIX)
+                                and not existing['path'].startswith(ARCHIVE_PREFIX)):
+            by_date[r['date']] = r
+    return sorted(by_date.values(), key=lambda r: r['date'], reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="日報清單（reports_manifest.json）")
+    parser.add_argument("--rebuild", action="store_true", help="由 archive/ 與根目錄的日報 HTML 重建清單")
+    args = parser.parse_args()
+
+    manifest = rebuild_manifest() if args.rebuild else load_manifest()
+    reports = manifest['reports']
+    print(f"🗂️  共 {len(reports)} 篇日報"
+          + (f"（{reports[0]['date']} ~ {reports[-1]['date']}）" if reports else ""))
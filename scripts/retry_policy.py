@@ -0,0 +1,193 @@
+"""
+統一重試策略
+取代原本層層疊加的 retry_on_failure 裝飾器與 main.retry_call：
+
+- 指數 backoff + full jitter
+- 伺服器回 Retry-After / retry-after-ms 時依其等待
+- 不可重試的錯誤（400 / 401 / 403 / 404 / 422、額度用盡、設定錯誤、程式錯誤）立即放棄
+- 每個階段有總期限，下一次等待會超過期限就不再重試
+- 每次嘗試透過 on_attempt 回呼回報（main 寫入 ExecutionLogger）
+
+用法:
+    policy = RetryPolicy(max_attempts=3, deadline_secs=300)
+    result = policy.run(fn, *args, step_name="數據煉金術師", on_attempt=..., **kwargs)
+"""
+
+import time
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+try:
+    import openai
+    _NON_RETRYABLE_API_ERRORS = (
+        openai.BadRequestError,
+        openai.AuthenticationError,
+        openai.PermissionDeniedError,
+        openai.NotFoundError,
+        openai.UnprocessableEntityError,
+    )
+    _RATE_LIMIT_ERROR = openai.RateLimitError
+except ImportError:
+    _NON_RETRYABLE_API_ERRORS = ()
+    _RATE_LIMIT_ERROR = ()
+
+# 程式錯誤重試也不會好
+_PROGRAMMING_ERRORS = (TypeError, AttributeError, KeyError, NameError, NotImplementedError)
+
+
+class NonRetryableError(Exception):
+    """明確標記為不可重試的錯誤"""
+
+
+class ConfigError(NonRetryableError, ValueError):
+    """設定錯誤（如缺少 API key）；同時是 ValueError，相容既有的 except"""
+
+
+def is_programming_error(error: Exception) -> bool:
+    """程式錯誤：換重試或換供應商都不會好"""
+    return isinstance(error, _PROGRAMMING_ERRORS)
+
+
+def _retry_after_secs(error: Exception) -> Optional[float]:
+    """從 API 錯誤回應的 header 取出建議等待秒數"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    判斷錯誤是否值得重試
+
+    Returns:
+        (是否可重試, 伺服器建議的等待秒數或 None)
+    """
+    if isinstance(error, (NonRetryableError,) + _NON_RETRYABLE_API_ERRORS + _PROGRAMMING_ERRORS):
+        return False, None
+
+    if _RATE_LIMIT_ERROR and isinstance(error, _RATE_LIMIT_ERROR):
+        body = getattr(error, 'body', None)
+        code = body.get('code') if isinstance(body, dict) else getattr(error, 'code', None)
+        if code == 'insufficient_quota':
+            return False, None
+
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 409, 429):
+        return False, None
+
+    return True, _retry_after_secs(error)
+
+
+class RetryPolicy:
+    """
+    重試策略
+
+    Args:
+        max_attempts: 最多嘗試次數（含第一次）
+        base_delay: backoff 起點（秒）
+        max_delay: 單次等待上限（秒；Retry-After 不受此限，但受期限限制）
+        deadline_secs: 整個階段（含所有嘗試與等待）的總期限，None 表示不限
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 30.0,
+                 deadline_secs: Optional[float] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_secs = deadline_secs
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失敗後的等待秒數（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def run(self, fn: Callable[..., Any], *args, step_name: str = "",
+            on_attempt: Optional[Callable[[Dict], None]] = None, **kwargs) -> Any:
+        """
+        依策略執行 fn
+
+        Args:
+            fn: 要執行的函式
+            step_name: 階段名稱（用於日誌）
+            on_attempt: 每次嘗試結束時的回呼，參數為
+                        {'step', 'attempt', 'status', 'duration', 'error', 'retryable', 'delay'}
+
+        Raises:
+            最後一次的例外（不可重試、次數用盡或超過期限）
+        """
+        name = step_name or getattr(fn, '__name__', 'call')
+        started = time.monotonic()
+
+        for attempt in range(1, self.max_attempts + 1):
+            attempt_started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable, retry_after = classify_error(e)
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                elapsed = time.monotonic() - started
+                give_up_reason = None
+                if not retryable:
+                    give_up_reason = "不可重試的錯誤"
+                elif attempt >= self.max_attempts:
+                    give_up_reason = f"已嘗試 {attempt} 次"
+                elif self.deadline_secs is not None and elapsed + delay > self.deadline_secs:
+                    give_up_reason = f"超過階段期限 {self.deadline_secs:.0f}s"
+
+                if on_attempt:
+                    on_attempt({
+                        'step': name,
+                        'attempt': attempt,
+                        'status': 'error',
+                        'duration': round(time.monotonic() - attempt_started, 3),
+                        'error': f"{type(e).__name__}: {str(e)[:200]}",
+                        'retryable': retryable,
+                        'delay': None if give_up_reason else round(delay, 2),
+                    })
+
+                if give_up_reason:
+                    logger.error(f"❌ [{name}] 第 {attempt} 次失敗，放棄重試（{give_up_reason}）: {e}")
+                    raise
+
+                hint = "（依 Retry-After）" if retry_after is not None else ""
+                logger.warning(f"⚠️ [{name}] 第 {attempt} 次失敗: {e}")
+                logger.info(f"⏳ [{name}] {delay:.1f}s 後重試{hint}...")
+                time.sleep(delay)
+                continue
+
+            if on_attempt:
+                on_attempt({
+                    'step': name,
+                    'attempt': attempt,
+                    'status': 'success',
+                    'duration': round(time.monotonic() - attempt_started, 3),
+                    'error': None,
+                    'retryable': None,
+                    'delay': None,
+                })
+            return result
@@ -3,15 +3,18 @@ RSS Feed 生成模組
 產生 RSS 2.0 XML feed，讓讀者可以透過 RSS 閱讀器訂閱 Thinker News。
 
 輸出檔案：feed.xml（根目錄）
+日報中繼資料來自 reports_manifest（不再讀取每篇 HTML）；既有項目沿用，只新增新的日報。
 """
 
-import re
 import json
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
+from typing import Dict
+from xml.etree import ElementTree
 from xml.etree.ElementTree import Element, SubElement, tostring, indent
 
 from log_config import get_logger
+from reports_manifest import latest_per_date
 logger = get_logger(__name__)
 
 # 站點資訊
@@ -25,77 +28,73 @@ MAX_ITEMS = 20  # RSS feed 最多列幾篇
 TW_TZ = timezone(timedelta(hours=8))
 
 
-def _extract_title_from_html(html_path: Path) -> str:
-    """從 HTML 的 <title> 標籤提取標題"""
+def _scan_reports() -> list:
+    """
+    由日報清單取得 archive/ + 根目錄的日報（同一天兩處都有時以 archive/ 為準）。
+
+    Returns:
+        list of dict，按日期倒序排列：
+        [{'date': '2026-02-11', 'path': 'archive/2026-02-11.html', 'title': ..., 'description': ..., 'url': '...'}, ...]
+    """
+    return [{**r, "url": f"{SITE_URL}/{r['path']}"} for r in latest_per_date()[:MAX_ITEMS]]
+
+
+def _load_existing_items(feed_path: Path) -> Dict[str, Element]:
+    """讀回既有 feed.xml 的 <item>（以 guid 為 key）；不存在或無法解析時回空 dict"""
+    if not feed_path.exists():
+        return {}
     try:
-        content = html_path.read_text(encoding="utf-8")
-        m = re.search(r"<title>(.*?)</title>", content, re.DOTALL)
-        if m:
-            title = m.group(1).strip()
-            # 移除尾巴的 " | Thinker News"
-            title = re.sub(r"\s*\|\s*Thinker News$", "", title)
-            return title
-    except Exception:
-        pass
-    return None
+        channel = ElementTree.parse(feed_path).getroot().find("channel")
+    except (OSError, ElementTree.ParseError) as e:
+        logger.warning(f"⚠️  既有 RSS feed 無法解析，整份重建: {e}")
+        return {}
+    if channel is None:
+        return {}
+    return {item.findtext("guid"): item for item in channel.findall("item") if item.findtext("guid")}
+
+
+def _item_is_current(item: Element, title: str, description: str) -> bool:
+    return item.findtext("title") == title and (item.findtext("description") or "") == description
+
 
+def _build_item(report: dict, title: str, description: str) -> Element:
+    """建立單篇日報的 <item>"""
+    item = Element("item")
+    date_str = report["date"]
+    SubElement(item, "title").text = title
+    SubElement(item, "link").text = report["url"]
 
-def _extract_description_from_html(html_path: Path) -> str:
-    """從 HTML 的 meta description 提取摘要"""
+    # GUID
+    guid = SubElement(item, "guid")
+    guid.set("isPermaLink", "true")
+    guid.text = report["url"]
+
+    # 發佈日期（假設每日 08:30 發佈）
     try:
-        content = html_path.read_text(encoding="utf-8")
-        m = re.search(
-            r'<meta\s+name=["\']description["\']\s+content=["\'](.*?)["\']',
-            content,
-            re.DOTALL | re.IGNORECASE,
+        pub_dt = datetime.strptime(date_str, "%Y-%m-%d").replace(
+            hour=8, minute=30, tzinfo=TW_TZ
+        )
+        SubElement(item, "pubDate").text = pub_dt.strftime(
+            "%a, %d %b %Y %H:%M:%S %z"
         )
-        if m:
-            return m.group(1).strip()
-    except Exception:
+    except ValueError:
         pass
-    return None
 
+    if description:
+        SubElement(item, "description").text = description
 
-def _scan_reports() -> list:
-    """
-    掃描 archive/ 目錄 + 根目錄，收集所有日報 HTML。
+    # 分類
+    SubElement(item, "category").text = "AI 科技新聞"
+    return item
 
-    Returns:
-        list of dict，按日期倒序排列：
-        [{'date': '2026-02-11', 'path': Path(...), 'url': '...'}, ...]
-    """
-    date_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2})\.html$")
-    reports = []
-
-    # 掃描 archive/
-    archive_dir = Path("archive")
-    if archive_dir.exists():
-        for f in archive_dir.iterdir():
-            m = date_pattern.match(f.name)
-            if m:
-                reports.append({
-                    "date": m.group(1),
-                    "path": f,
-                    "url": f"{SITE_URL}/archive/{f.name}",
-                })
-
-    # 掃描根目錄（今日可能還沒移入 archive/）
-    for f in Path(".").iterdir():
-        m = date_pattern.match(f.name)
-        if m and m.group(1) not in {r["date"] for r in reports}:
-            reports.append({
-                "date": m.group(1),
-                "path": f,
-                "url": f"{SITE_URL}/{f.name}",
-            })
-
-    reports.sort(key=lambda r: r["date"], reverse=True)
-    return reports[:MAX_ITEMS]
-
-
-def generate_rss_feed() -> str:
+
+def generate_rss_feed(output_path: Path = Path(FEED_FILENAME)) -> str:
     """
-    產生 RSS 2.0 feed.xml。
+    增量更新 RSS 2.0 feed.xml。
+
+    既有 feed 中標題與摘要都沒變的 <item> 原樣沿用，只為新增（或內容變更）的日報建立新項目，
+    依日期排序後截到 MAX_ITEMS。頻道資訊（lastBuildDate 等）每次重寫；
+    RSS 新項目必須排在最前面，所以檔案仍整份寫出，而不是在尾端附加位元組。
 
     Returns:
         輸出檔案路徑
@@ -107,6 +106,9 @@ def generate_rss_feed() -> str:
         logger.warning("⚠️  找不到任何日報 HTML，跳過 RSS 生成")
         return None
 
+    output_path = Path(output_path)
+    existing = _load_existing_items(output_path)
+
     # 建構 XML
     rss = Element("rss", version="2.0")
     rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
@@ -138,51 +140,17 @@ def generate_rss_feed() -> str:
         except Exception:
             pass
 
-    # Items
+    # Items：沿用未變更的既有項目，只建立新的
+    created = 0
     for report in reports:
-        item = SubElement(channel, "item")
-
-        date_str = report["date"]
-
-        # 標題
-        title = _extract_title_from_html(report["path"])
-        if not title:
-            title = f"{date_str} AI 科技日報"
-        SubElement(item, "title").text = title
-
-        # 連結
-        SubElement(item, "link").text = report["url"]
-
-        # GUID
-        guid = SubElement(item, "guid")
-        guid.set("isPermaLink", "true")
-        guid.text = report["url"]
-
-        # 發佈日期（假設每日 08:30 發佈）
-        try:
-            pub_dt = datetime.strptime(date_str, "%Y-%m-%d").replace(
-                hour=8, minute=30, tzinfo=TW_TZ
-            )
-            SubElement(item, "pubDate").text = pub_dt.strftime(
-                "%a, %d %b %Y %H:%M:%S %z"
-            )
-        except ValueError:
-            pass
-
+        title = report.get("title") or f"{report['date']} AI 科技日報"
         # 摘要：優先用 latest.json 內容，其次用 meta description
-        description = ""
-        if date_str in latest_summary:
-            description = latest_summary[date_str]
-        else:
-            meta_desc = _extract_description_from_html(report["path"])
-            if meta_desc:
-                description = meta_desc
-
-        if description:
-            SubElement(item, "description").text = description
-
-        # 分類
-        SubElement(item, "category").text = "AI 科技新聞"
+        description = latest_summary.get(report["date"]) or report.get("description") or ""
+        item = existing.get(report["url"])
+        if item is None or not _item_is_current(item, title, description):
+            item = _build_item(report, title, description)
+            created += 1
+        channel.append(item)
 
     # 格式化 XML
     indent(rss, space="  ")
@@ -190,10 +158,10 @@ def generate_rss_feed() -> str:
     xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_bytes
 
     # 寫入
-    output_path = Path(FEED_FILENAME)
     output_path.write_text(xml_content, encoding="utf-8")
 
-    logger.info(f"✅ RSS feed 已生成: {output_path}（{len(reports)} 篇文章）")
+    logger.info(f"✅ RSS feed 已更新: {output_path}（{len(reports)} 篇文章，新建 {created} 篇、"
+                f"沿用 {len(reports) - created} 篇）")
     return str(output_path)
 
 
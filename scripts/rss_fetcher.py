@@ -1,16 +1,34 @@
 """
 RSS Feed 讀取模組
 從多個來源讀取 RSS feeds，支援 timeout、retry 與容錯機制
+
+兩種讀取模式（環境變數 RSS_FETCH_MODE 切換）：
+  - async（預設）：asyncio + aiohttp，同 host 共用 keep-alive 連線，
+    每個來源有獨立期限，重試採 jitter backoff 不佔用 worker，
+    feedparser 解析丟到有上限的 executor
+  - thread：ThreadPoolExecutor + urllib（aiohttp 不可用時自動降級）
+
+兩種模式都會透過 feed_cache 送出條件式 GET（ETag / Last-Modified），
+304 時直接重用上次解析的條目（環境變數 RSS_FEED_CACHE=0 可關閉）。
+
+讀取階段只保留 feedparser 原始條目；傳入 entry_store.EntryStore 時以原始欄位計算
+條目 key 與指紋，只有新出現或已變更的條目才正規化、回傳並寫入條目庫。
 """
 
+import os
+import random
+import asyncio
 import feedparser
 import time
+import urllib.error
 import urllib.request
-from datetime import datetime
-from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, List, Dict, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 
 from log_config import get_logger
+from feed_cache import FeedCache
+from entry_store import EntryStore, entry_key, entry_fingerprint
 logger = get_logger(__name__)
 
 # === RSS 來源配置 ===
@@ -33,18 +51,146 @@ RSS_SOURCES = {
 FETCH_TIMEOUT_SECS = 15   # 單一 feed 讀取 timeout
 MAX_RETRIES = 2            # 失敗重試次數
 RETRY_DELAY_SECS = 2      # 重試間隔
+USER_AGENT = 'ThinkerNews/1.0'
+FEED_CACHE_ENABLED = os.getenv('RSS_FEED_CACHE', '1') != '0'
+
+# asyncio 模式設定
+FETCH_MODE = os.getenv('RSS_FETCH_MODE', 'async')   # 'async' | 'thread'
+SOURCE_DEADLINE_SECS = 25      # 單一來源（含所有重試）的總期限
+CONNECT_TIMEOUT_SECS = 5       # TCP/TLS 建立連線 timeout
+MAX_CONNECTIONS = 64           # 連線池總上限
+MAX_CONNECTIONS_PER_HOST = 8   # 同 host 連線上限（keep-alive 重用）
+KEEPALIVE_SECS = 30            # 閒置連線保留時間
+PARSE_MAX_WORKERS = 4          # feedparser 解析 executor 大小
+BACKOFF_BASE_SECS = 1.0        # 重試 backoff 起點
+BACKOFF_MAX_SECS = 8.0         # 重試 backoff 上限
+
+# on_feed(來源名稱, 開始 perf_counter_ns, 結束 perf_counter_ns, 則數)
+FeedTimingCallback = Callable[[str, int, int, int], None]
+
+
+class FeedFormatError(ValueError):
+    """Feed 內容無法解析（bozo 且無任何條目）"""
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter 指數 backoff：uniform(0, min(上限, 起點 × 2^(attempt-1)))"""
+    return random.uniform(0, min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * (2 ** (attempt - 1))))
+
+
+def _raw_fields(entry) -> Tuple[str, str, str, str]:
+    """feedparser 條目（或快取讀回的條目）的原始欄位：(title, link, content, pubDate)"""
+    return (
+        entry.get('title', ''),
+        entry.get('link', ''),
+        entry.get('summary', entry.get('description', '')),
+        entry.get('published', entry.get('updated', '')),
+    )
+
+
+def _normalize_entry(entry, source_name: str) -> Dict:
+    """將 feedparser entry 轉為 pipeline 使用的新聞 dict"""
+    title, link, content, pub_date = _raw_fields(entry)
+    item = {
+        'title': title,
+        'link': link,
+        'content': content,
+        'pubDate': pub_date,
+        'isoDate': entry.get('published_parsed', entry.get('updated_parsed', None)),
+        'source': source_name
+    }
+
+    # 轉換日期格式
+    if item['isoDate']:
+        try:
+            dt = datetime(*item['isoDate'][:6])
+            item['isoDate'] = dt.isoformat()
+        except Exception:
+            item['isoDate'] = ''
 
+    return item
 
-def fetch_single_feed(source_name: str, url: str) -> List[Dict]:
+
+def normalize_entries(source_name: str, entries: List) -> List[Dict]:
+    """正規化原始條目（單則失敗只略過該則）"""
+    news_items = []
+    for entry in entries:
+        try:
+            news_items.append(_normalize_entry(entry, source_name))
+        except Exception as e:
+            logger.warning(f"  ⚠️  處理 {source_name} 的某則新聞時出錯: {e}")
+            continue
+    return news_items
+
+
+def parse_feed_entries(source_name: str, raw: bytes) -> List:
+    """
+    解析 RSS 原始內容，回傳 feedparser 原始條目（未正規化）
+
+    Raises:
+        FeedFormatError: feed 格式有問題且無任何條目
+    """
+    feed = feedparser.parse(raw)
+
+    if feed.bozo and not feed.entries:
+        raise FeedFormatError(f"bozo feed: {feed.bozo_exception}")
+
+    return feed.entries
+
+
+def parse_feed(source_name: str, raw: bytes) -> List[Dict]:
+    """
+    解析 RSS 原始內容為新聞列表
+
+    Args:
+        source_name: 來源名稱
+        raw: feed 原始 bytes
+
+    Returns:
+        新聞列表
+
+    Raises:
+        FeedFormatError: feed 格式有問題且無任何條目
+    """
+    return normalize_entries(source_name, parse_feed_entries(source_name, raw))
+
+
+def _cache_entry(entry) -> Dict:
+    """原始條目 → feed_cache 保存的欄位（仍是原始值，不轉換日期）"""
+    title, link, content, pub_date = _raw_fields(entry)
+    parsed = entry.get('published_parsed', entry.get('updated_parsed', None))
+    return {'title': title, 'link': link, 'summary': content, 'published': pub_date,
+            'published_parsed': list(parsed) if parsed else None}
+
+
+def _parse_and_cache(source_name: str, url: str, raw: bytes, etag: Optional[str],
+                     last_modified: Optional[str], cache: Optional[FeedCache]) -> List:
+    """解析 feed 為原始條目，並在有快取時寫入 validator 與條目"""
+    entries = parse_feed_entries(source_name, raw)
+    if cache is not None:
+        cache.store(url, etag, last_modified, [_cache_entry(e) for e in entries])
+    return entries
+
+
+def _reuse_cached(source_name: str, url: str, cache: Optional[FeedCache]) -> Optional[List[Dict]]:
+    """304 Not Modified 時取回快取的原始條目"""
+    cached = cache.get_entries(url) if cache is not None else None
+    if cached is not None:
+        logger.info(f"  ♻️  {source_name}: 未變更（304），重用快取 {len(cached)} 則")
+    return cached
+
+
+def fetch_single_feed(source_name: str, url: str, cache: Optional[FeedCache] = None) -> List[Dict]:
     """
     讀取單一 RSS feed（含 timeout + retry）
 
     Args:
         source_name: 來源名稱
         url: RSS feed URL
+        cache: 條件式 GET 快取（None 表示不使用）
 
     Returns:
-        新聞列表（失敗回空 list，不會 raise）
+        原始條目列表（未正規化；失敗回空 list，不會 raise）
     """
     last_error = None
 
@@ -53,46 +199,30 @@ def fetch_single_feed(source_name: str, url: str) -> List[Dict]:
             logger.info(f"  📡 讀取 {source_name}（attempt {attempt}）...")
 
             # 用 urllib 手動抓再餵給 feedparser，才能控制 timeout
-            req = urllib.request.Request(url, headers={'User-Agent': 'ThinkerNews/1.0'})
-            with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT_SECS) as resp:
-                raw = resp.read()
+            headers = {'User-Agent': USER_AGENT}
+            if cache is not None:
+                headers.update(cache.conditional_headers(url))
+            req = urllib.request.Request(url, headers=headers)
+            try:
+                with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT_SECS) as resp:
+                    raw = resp.read()
+                    etag = resp.headers.get('ETag')
+                    last_modified = resp.headers.get('Last-Modified')
+            except urllib.error.HTTPError as e:
+                cached = _reuse_cached(source_name, url, cache) if e.code == 304 else None
+                if cached is None:
+                    raise
+                return cached
 
-            feed = feedparser.parse(raw)
+            entries = _parse_and_cache(source_name, url, raw, etag, last_modified, cache)
 
-            if feed.bozo and not feed.entries:
-                logger.warning(f"  ⚠️  {source_name} RSS 格式有問題且無條目")
-                last_error = f"bozo feed: {feed.bozo_exception}"
-                time.sleep(RETRY_DELAY_SECS)
-                continue
-
-            news_items = []
-            for entry in feed.entries:
-                try:
-                    item = {
-                        'title': entry.get('title', ''),
-                        'link': entry.get('link', ''),
-                        'content': entry.get('summary', entry.get('description', '')),
-                        'pubDate': entry.get('published', entry.get('updated', '')),
-                        'isoDate': entry.get('published_parsed', entry.get('updated_parsed', None)),
-                        'source': source_name
-                    }
-
-                    # 轉換日期格式
-                    if item['isoDate']:
-                        try:
-                            dt = datetime(*item['isoDate'][:6])
-                            item['isoDate'] = dt.isoformat()
-                        except Exception:
-                            item['isoDate'] = ''
-
-                    news_items.append(item)
-
-                except Exception as e:
-                    logger.warning(f"  ⚠️  處理 {source_name} 的某則新聞時出錯: {e}")
-                    continue
-
-            logger.info(f"  ✅ {source_name}: 讀取 {len(news_items)} 則")
-            return news_items
+            logger.info(f"  ✅ {source_name}: 讀取 {len(entries)} 則")
+            return entries
+
+        except FeedFormatError as e:
+            logger.warning(f"  ⚠️  {source_name} RSS 格式有問題且無條目")
+            last_error = str(e)
+            time.sleep(RETRY_DELAY_SECS)
 
         except Exception as e:
             last_error = str(e)
@@ -104,41 +234,247 @@ def fetch_single_feed(source_name: str, url: str) -> List[Dict]:
     return []
 
 
-def fetch_all_rss_feeds(today_date: str) -> List[Dict]:
+# ============================================
+# asyncio 模式
+# ============================================
+
+async def _download_async(session, url: str,
+                          headers: Dict[str, str]) -> Tuple[int, bytes, Optional[str], Optional[str]]:
     """
-    並行讀取所有 RSS feeds
+    以共用 session 下載 feed 原始內容（304 以外的非 2xx 視為失敗）
+
+    Returns:
+        (status, body, ETag, Last-Modified)
+    """
+    async with session.get(url, headers=headers) as resp:
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if resp.status == 304:
+            return 304, b'', etag, last_modified
+        resp.raise_for_status()
+        return resp.status, await resp.read(), etag, last_modified
+
+
+async def fetch_single_feed_async(session, source_name: str, url: str,
+                                  parse_executor: Executor,
+                                  deadline_secs: float = SOURCE_DEADLINE_SECS,
+                                  cache: Optional[FeedCache] = None) -> List[Dict]:
+    """
+    以 asyncio 讀取單一 RSS feed（含期限 + jitter backoff 重試）
 
     Args:
-        today_date: 今日日期（用於日誌）
+        session: 共用的 aiohttp.ClientSession
+        source_name: 來源名稱
+        url: RSS feed URL
+        parse_executor: feedparser 解析用的 executor
+        deadline_secs: 此來源（含所有重試）的總期限
+        cache: 條件式 GET 快取（None 表示不使用）
 
     Returns:
-        所有新聞的列表
+        原始條目列表（未正規化；失敗回空 list，不會 raise）
     """
-    all_news = []
-    failed_sources = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_secs
+    last_error = None
+    headers = cache.conditional_headers(url) if cache is not None else {}
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            last_error = last_error or "deadline exceeded"
+            break
+
+        try:
+            logger.info(f"  📡 讀取 {source_name}（attempt {attempt}）...")
+            status, raw, etag, last_modified = await asyncio.wait_for(
+                _download_async(session, url, headers),
+                timeout=min(remaining, FETCH_TIMEOUT_SECS),
+            )
+            if status == 304:
+                cached = _reuse_cached(source_name, url, cache)
+                if cached is not None:
+                    return cached
+                # 快取已消失：不帶 validator 重抓
+                headers = {}
+                raise RuntimeError("304 Not Modified but no cached entries")
+
+            entries = await loop.run_in_executor(
+                parse_executor, _parse_and_cache, source_name, url, raw,
+                etag, last_modified, cache,
+            )
+
+            logger.info(f"  ✅ {source_name}: 讀取 {len(entries)} 則")
+            return entries
+
+        except Exception as e:
+            last_error = str(e) or type(e).__name__
+            logger.warning(f"  ⚠️  {source_name} attempt {attempt} 失敗: {last_error}")
+            if attempt < MAX_RETRIES:
+                delay = min(_backoff_delay(attempt), max(0.0, deadline - loop.time()))
+                await asyncio.sleep(delay)
+
+    logger.error(f"  ❌ {source_name} 全部 {MAX_RETRIES} 次嘗試失敗: {last_error}")
+    return []
+
+
+async def fetch_feeds_async(sources: Dict[str, Dict],
+                            cache: Optional[FeedCache] = None,
+                            on_feed: Optional[FeedTimingCallback] = None) -> Dict[str, List[Dict]]:
+    """
+    以單一事件迴圈並行讀取所有來源
+
+    Args:
+        sources: {來源名稱: {'url': ...}}，格式同 RSS_SOURCES
+        cache: 條件式 GET 快取（None 表示不使用）
+        on_feed: 每個來源完成時回呼 on_feed(來源, 開始 ns, 結束 ns, 則數)（perf_counter_ns）
+
+    Returns:
+        {來源名稱: 原始條目列表}（未正規化）
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=KEEPALIVE_SECS,
+    )
+    timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT_SECS)
+    names = list(sources)
+
+    with ThreadPoolExecutor(max_workers=PARSE_MAX_WORKERS) as parse_executor:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            async def timed(name):
+                started = time.perf_counter_ns()
+                items = await fetch_single_feed_async(session, name, sources[name]['url'], parse_executor,
+                                                      cache=cache)
+                _report_feed(on_feed, name, started, items)
+                return items
+
+            results = await asyncio.gather(*(timed(name) for name in names))
+
+    return dict(zip(names, results))
 
-    max_workers = min(len(RSS_SOURCES), 8)
+
+def _report_feed(on_feed: Optional[FeedTimingCallback], name: str, started_ns: int, items: List[Dict]):
+    if on_feed is None:
+        return
+    try:
+        on_feed(name, started_ns, time.perf_counter_ns(), len(items or []))
+    except Exception as e:
+        logger.warning(f"⚠️  {name} 計時回呼失敗: {e}")
+
+
+def _fetch_feeds_threaded(sources: Dict[str, Dict],
+                          cache: Optional[FeedCache] = None,
+                          on_feed: Optional[FeedTimingCallback] = None) -> Dict[str, List[Dict]]:
+    """以 ThreadPoolExecutor 並行讀取所有來源"""
+    results = {}
+    max_workers = min(len(sources), 8)
+
+    def timed(name, url):
+        started = time.perf_counter_ns()
+        items = fetch_single_feed(name, url, cache)
+        _report_feed(on_feed, name, started, items)
+        return items
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_source = {
-            executor.submit(fetch_single_feed, name, cfg['url']): name
-            for name, cfg in RSS_SOURCES.items()
+            executor.submit(timed, name, cfg['url']): name
+            for name, cfg in sources.items()
         }
 
         for future in as_completed(future_to_source):
             source_name = future_to_source[future]
             try:
-                news_items = future.result()
-                if news_items:
-                    all_news.extend(news_items)
-                else:
-                    failed_sources.append(source_name)
+                results[source_name] = future.result()
             except Exception as e:
                 logger.error(f"❌ {source_name} 讀取任務失敗: {e}")
-                failed_sources.append(source_name)
+                results[source_name] = []
+
+    return results
+
+
+def _ingest_new_entries(results: Dict[str, List], store: EntryStore,
+                        today_date: str) -> Dict[str, List[Dict]]:
+    """
+    將各來源的原始條目與條目庫比對，只正規化並寫入新出現或已變更者
+
+    條目 key 與指紋直接由原始欄位計算（與 entry_store.item_fingerprint 對正規化條目的結果一致），
+    未變更的條目不做任何正規化。
+    """
+    # 無發佈時間的條目歸入「昨天」，與 filter_and_score_news 的目標日一致
+    undated_day = (datetime.strptime(today_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    new_results = {}
+    for source_name, entries in results.items():
+        entries = entries or []
+        identities = []
+        for entry in entries:
+            title, link, content, pub_date = _raw_fields(entry)
+            identities.append((entry_key(title, link), entry_fingerprint(title, content, pub_date)))
+        known = store.current_fingerprints(source_name, (key for key, _ in identities))
+        changed = [entry for entry, (key, fp) in zip(entries, identities) if known.get(key) != fp]
+
+        new_items = normalize_entries(source_name, changed)
+        store.add(source_name, new_items, undated_day)
+        new_results[source_name] = new_items
+    return new_results
+
+
+def fetch_all_rss_feeds(today_date: str, mode: Optional[str] = None,
+                        sources: Optional[Dict[str, Dict]] = None,
+                        use_cache: Optional[bool] = None,
+                        store: Optional[EntryStore] = None,
+                        on_feed: Optional[FeedTimingCallback] = None) -> List[Dict]:
+    """
+    並行讀取所有 RSS feeds
+
+    Args:
+        today_date: 今日日期（用於日誌）
+        mode: 'async' 或 'thread'，預設取 RSS_FETCH_MODE
+        sources: 要讀取的來源，預設 RSS_SOURCES
+        use_cache: 是否使用條件式 GET 快取，預設取 RSS_FEED_CACHE
+        store: 增量條目庫；提供時只回傳新出現或已變更的條目
+        on_feed: 每個來源完成時的計時回呼（見 fetch_feeds_async）
+
+    Returns:
+        所有新聞的列表（有 store 時為新增/變更的新聞）
+    """
+    mode = mode or FETCH_MODE
+    sources = sources if sources is not None else RSS_SOURCES
+    use_cache = FEED_CACHE_ENABLED if use_cache is None else use_cache
+    cache = FeedCache() if use_cache else None
+
+    if mode == 'async':
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            logger.warning("⚠️  未安裝 aiohttp，改用 thread 模式讀取 RSS")
+            mode = 'thread'
+
+    start = time.perf_counter()
+    if mode == 'async':
+        results = asyncio.run(fetch_feeds_async(sources, cache, on_feed))
+    else:
+        results = _fetch_feeds_threaded(sources, cache, on_feed)
+    elapsed = time.perf_counter() - start
 
+    failed_sources = [name for name in sources if not results.get(name)]
     if failed_sources:
         logger.warning(f"⚠️  本次失敗來源: {', '.join(failed_sources)}")
 
-    logger.info(f"📊 總共讀取 {len(all_news)} 則新聞（來自 {len(RSS_SOURCES) - len(failed_sources)}/{len(RSS_SOURCES)} 個來源）")
+    total = sum(len(results.get(name) or []) for name in sources)
+    logger.info(f"📊 總共讀取 {total} 則新聞（來自 {len(sources) - len(failed_sources)}/{len(sources)} 個來源，"
+                f"{mode} 模式 {elapsed:.1f}s）")
+
+    if store is not None:
+        results = _ingest_new_entries(results, store, today_date)
+        logger.info(f"📦 條目庫新增/變更 {sum(len(v) for v in results.values())} 則")
+    else:
+        results = {name: normalize_entries(name, entries or []) for name, entries in results.items()}
+
+    all_news = []
+    for source_name in sources:
+        all_news.extend(results.get(source_name) or [])
     return all_news
@@ -0,0 +1,570 @@
+"""
+日報全文檢索
+以日報頁面本文建立倒排索引：繁體中文以 CJK bigram 切詞（另外索引每個字的 unigram，單字查詢用），
+英文 / 數字以單字切詞，BM25 排序。
+
+索引為二進位檔 data/search/index.bin（主索引）與 index.delta.bin（增量分段），查詢時 mmap 開啟、
+在排序好的詞表上二分搜尋，不需把整個索引載入記憶體；日報累積到數千天仍維持毫秒級查詢。
+每篇文件開頭的本文也存在索引中，查詢結果的片段不必重讀、重新解析頁面。
+
+generate_daily_html 寫出頁面後呼叫 add_report 增量加入當天日報：只切詞新的一篇並改寫小的增量分段，
+主索引不動；同一天重新產生時較新的文件取代舊的。增量分段超過 DELTA_MAX_DOCS 篇
+或失效文件超過 COMPACT_RATIO 時，才由既有 posting 合併成新的主索引（不必重讀頁面）。
+
+用法:
+    python scripts/search_index.py --rebuild
+    python scripts/search_index.py "輝達 財報" -k 5
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import struct
+import unicodedata
+from array import array
+from collections import Counter
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from log_config import get_logger
+from reports_manifest import REPO_ROOT, latest_per_date
+logger = get_logger(__name__)
+
+SEARCH_INDEX_PATH = REPO_ROOT / 'data' / 'search' / 'index.bin'
+SITE_URL = "https://thinkercafe-tw.github.io/thinker-news"
+
+INDEX_MAGIC = b'TNSI'
+INDEX_VERSION = 3
+# magic, version, 文件數, 詞數, 文件表 bytes, 詞表 bytes, posting 數, 本文 bytes
+_HEADER = struct.Struct('<4sIIIIIII')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMPACT_RATIO = 0.2              # 失效文件佔比超過即合併成新的主索引
+DELTA_MAX_DOCS = 16              # 增量分段超過此篇數即合併
+SNIPPET_CHARS = 80
+SNIPPET_SOURCE_CHARS = 2000      # 每篇保存的開頭本文字數（查詢詞在此之後出現時片段取開頭）
+
+_CJK_RANGE = '㐀-䶿一-鿿豈-﫿'
+_TOKEN_RE = re.compile(f'[{_CJK_RANGE}]+|[a-z0-9]+')
+_CJK_RE = re.compile(f'[{_CJK_RANGE}]')
+
+_SKIP_TAGS = {'head', 'script', 'style', 'noscript', 'svg'}
+_BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+               'section', 'article', 'header', 'footer', 'tr', 'blockquote', 'pre'}
+
+
+# ---------------------------------------------------------------------------
+# 文字擷取與切詞
+# ---------------------------------------------------------------------------
+
+class _TextExtractor(HTMLParser):
+    """取出頁面可見文字（略過 head / script / style），區塊元素之間換行"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def extract_text(html: str) -> str:
+    """日報 HTML → 純文字（與網頁上讀者看到的內容一致）"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = ''.join(parser.parts)
+    return '\n'.join(line for line in (re.sub(r'[ \t\r\f\v]+', ' ', l).strip() for l in text.split('\n')) if line)
+
+
+def tokenize(text: str, unigrams: bool = False) -> Iterator[str]:
+    """
+    切詞：NFKC 正規化（全形轉半形）+ 小寫；
+    CJK 連續字串切成重疊 bigram（單字則保留單字），英數以單字為單位
+
+    unigrams=True（建索引時）另外輸出 CJK 連續字串中每個字，
+    單字查詢因此能命中出現在任何位置的字（包括詞尾），與 thinker_search.js 的查詢結果一致
+    """
+    for m in _TOKEN_RE.finditer(unicodedata.normalize('NFKC', text).lower()):
+        run = m.group()
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                yield run
+            else:
+                for i in range(len(run) - 1):
+                    yield run[i:i + 2]
+                if unigrams:
+                    yield from run
+        elif len(run) > 1 or run.isdigit():
+            yield run
+
+
+# ---------------------------------------------------------------------------
+# 索引檔讀寫
+# ---------------------------------------------------------------------------
+
+def _write_index(path: Path, docs: List[Dict], terms: List[bytes], postings: List[array], texts: List[str]):
+    """
+    寫出索引檔（原子替換）
+
+    配置（皆 4 bytes 對齊）:
+        header | 文件表 JSON | 詞位移 u32×(詞數+1) | posting 位移 u32×(詞數+1) | 本文位移 u32×(文件數+1)
+        | 詞表 UTF-8 | posting (doc_id, tf) u32 pairs | 各文件開頭本文 UTF-8（查詢片段用）
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    docs_blob = json.dumps(docs, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    docs_blob += b' ' * (-len(docs_blob) % 4)
+
+    term_offsets, post_offsets = array('I', [0]), array('I', [0])
+    for term, plist in zip(terms, postings):
+        term_offsets.append(term_offsets[-1] + len(term))
+        post_offsets.append(post_offsets[-1] + len(plist) // 2)
+    terms_blob = b''.join(terms)
+    terms_blob += b'\0' * (-len(terms_blob) % 4)
+
+    encoded = [t.encode('utf-8') for t in texts]
+    text_offsets = array('I', [0])
+    for blob in encoded:
+        text_offsets.append(text_offsets[-1] + len(blob))
+
+    tmp = path.with_suffix('.bin.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(docs), len(terms),
+                             len(docs_blob), len(terms_blob), post_offsets[-1], text_offsets[-1]))
+        f.write(docs_blob)
+        term_offsets.tofile(f)
+        post_offsets.tofile(f)
+        text_offsets.tofile(f)
+        f.write(terms_blob)
+        for plist in postings:
+            plist.tofile(f)
+        f.write(b''.join(encoded))
+    os.replace(tmp, path)
+
+
+class SearchIndex:
+    """
+    mmap 開啟的唯讀索引檔（單一分段）
+
+    Args:
+        path: 索引檔路徑
+    """
+
+    def __init__(self, path: Path = SEARCH_INDEX_PATH):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.n_docs, self.n_terms, docs_len, terms_len, n_postings,
+         text_len) = _HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._mm.close()
+            raise ValueError(f"不支援的索引格式: {magic!r} v{version}")
+
+        pos = _HEADER.size
+        self.docs: List[Dict] = json.loads(bytes(self._mm[pos:pos + docs_len]))
+        pos += docs_len
+        view = memoryview(self._mm)
+        self._term_offsets = view[pos:pos + 4 * (self.n_terms + 1)].cast('I')
+        pos += 4 * (self.n_terms + 1)
+        self._post_offsets = view[pos:pos + 4 * (self.n_terms + 1)].cast('I')
+        pos += 4 * (self.n_terms + 1)
+        self._text_offsets = view[pos:pos + 4 * (self.n_docs + 1)].cast('I')
+        pos += 4 * (self.n_docs + 1)
+        self._terms_start = pos
+        pos += terms_len
+        self._postings = view[pos:pos + 8 * n_postings].cast('I')
+        self._text_start = pos + 8 * n_postings
+
+    def close(self):
+        for name in ('_term_offsets', '_post_offsets', '_text_offsets', '_postings'):
+            getattr(self, name).release()
+        self._mm.close()
+
+    def term(self, i: int) -> bytes:
+        start = self._terms_start
+        return self._mm[start + self._term_offsets[i]:start + self._term_offsets[i + 1]]
+
+    def text(self, doc_id: int) -> str:
+        """文件開頭的本文（最多 SNIPPET_SOURCE_CHARS 字，建索引時保存）"""
+        start = self._text_start
+        return self._mm[start + self._text_offsets[doc_id]:start + self._text_offsets[doc_id + 1]].decode('utf-8')
+
+    def _find(self, key: bytes) -> int:
+        """詞表中第一個 >= key 的位置（二分搜尋）"""
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def postings(self, i: int) -> memoryview:
+        """第 i 個詞的 posting：[doc_id, tf, doc_id, tf, ...]"""
+        return self._postings[2 * self._post_offsets[i]:2 * self._post_offsets[i + 1]]
+
+    def lookup(self, token: str) -> Optional[int]:
+        """查詢詞在詞表中的位置（單一 CJK 字查的是 unigram），沒有時回 None"""
+        key = token.encode('utf-8')
+        i = self._find(key)
+        return i if i < self.n_terms and self.term(i) == key else None
+
+
+def is_current_index(path: Path) -> bool:
+    """索引檔存在且為目前格式（舊版格式的索引需整份重建）"""
+    try:
+        with open(path, 'rb') as f:
+            magic, version = struct.unpack('<4sI', f.read(8))
+    except (OSError, struct.error):
+        return False
+    return magic == INDEX_MAGIC and version == INDEX_VERSION
+
+
+def delta_path(path: Path) -> Path:
+    """主索引旁的增量分段：index.bin → index.delta.bin"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.delta{path.suffix}")
+
+
+class SegmentedIndex:
+    """
+    主索引 + 增量分段，查詢時視為一份索引
+
+    文件以 (分段, doc_id) 參照。分段內標記刪除的文件，以及被較新分段中同一天日報取代的文件都不算在內；
+    BM25 的文件數、平均長度與 df 皆以全部分段的有效文件計算，結果與整份重建的索引相同。
+
+    Args:
+        path: 主索引路徑（增量分段位於 delta_path(path)）
+    """
+
+    def __init__(self, path: Path = SEARCH_INDEX_PATH):
+        self.segments: List[SearchIndex] = [SearchIndex(path)]
+        if delta_path(path).exists():
+            try:
+                self.segments.append(SearchIndex(delta_path(path)))
+            except Exception:
+                self.close()
+                raise
+        self.stamp = tuple(seg.stamp for seg in self.segments)
+
+        # 由新到舊：較新分段已有同一天的有效文件時，舊的視為已取代
+        self._live: List[List[bool]] = [[] for _ in self.segments]
+        newer_dates = set()
+        for n in reversed(range(len(self.segments))):
+            docs = self.segments[n].docs
+            self._live[n] = [not d.get('deleted') and d['date'] not in newer_dates for d in docs]
+            newer_dates.update(d['date'] for d in docs if not d.get('deleted'))
+
+        lengths = [self.doc(ref)['length'] for ref in self.live_refs()]
+        self.live_docs = len(lengths)
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def close(self):
+        for seg in self.segments:
+            seg.close()
+
+    def doc(self, ref: Tuple[int, int]) -> Dict:
+        return self.segments[ref[0]].docs[ref[1]]
+
+    def text(self, ref: Tuple[int, int]) -> str:
+        return self.segments[ref[0]].text(ref[1])
+
+    def is_live(self, ref: Tuple[int, int]) -> bool:
+        return self._live[ref[0]][ref[1]]
+
+    def live_refs(self) -> List[Tuple[int, int]]:
+        """所有有效文件，依 (分段, doc_id) 排序"""
+        return [(n, i) for n, flags in enumerate(self._live) for i, live in enumerate(flags) if live]
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Tuple[int, int], float]]:
+        """BM25 排序，回傳前 k 筆 (文件參照, score)"""
+        scores: Dict[Tuple[int, int], float] = {}
+        for token in set(tokenize(query)):
+            tfs: Dict[Tuple[int, int], int] = {}
+            for n, seg in enumerate(self.segments):
+                i = seg.lookup(token)
+                if i is None:
+                    continue
+                plist = seg.postings(i)
+                for j in range(0, len(plist), 2):
+                    ref = (n, plist[j])
+                    if self.is_live(ref):
+                        tfs[ref] = plist[j + 1]
+            if not tfs:
+                continue
+            idf = math.log(1 + (self.live_docs - len(tfs) + 0.5) / (len(tfs) + 0.5))
+            for ref, tf in tfs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc(ref)['length'] / (self.avg_length or 1))
+                scores[ref] = scores.get(ref, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0][0], -kv[0][1]))
+        return ranked[:k]
+
+
+# ---------------------------------------------------------------------------
+# 建立 / 增量更新
+# ---------------------------------------------------------------------------
+
+def _doc_entry(report: Dict, counts: Counter) -> Dict:
+    return {'date': report['date'], 'path': report['path'], 'title': report.get('title'),
+            'sha256': report.get('sha256'), 'length': sum(counts.values())}
+
+
+def build_index(path: Path = SEARCH_INDEX_PATH) -> int:
+    """由日報清單整份重建主索引並清掉增量分段，回傳文件數（沒有任何日報時不寫出索引檔）"""
+    docs: List[Dict] = []
+    texts: List[str] = []
+    inverted: Dict[bytes, array] = {}
+    for report in sorted(latest_per_date(), key=lambda r: r['date']):
+        try:
+            text = extract_text((REPO_ROOT / report['path']).read_text(encoding='utf-8'))
+        except OSError as e:
+            logger.warning(f"⚠️ 略過無法讀取的日報 {report['path']}: {e}")
+            continue
+        counts = Counter(tokenize(text, unigrams=True))
+        doc_id = len(docs)
+        docs.append(_doc_entry(report, counts))
+        texts.append(text[:SNIPPET_SOURCE_CHARS])
+        for term, tf in counts.items():
+            inverted.setdefault(term.encode('utf-8'), array('I')).extend((doc_id, tf))
+
+    if not docs:
+        logger.warning(f"⚠️ 日報清單沒有可索引的日報，不寫出全文索引: {path}")
+        return 0
+
+    terms = sorted(inverted)
+    _write_index(path, docs, terms, [inverted[t] for t in terms], texts)
+    delta_path(path).unlink(missing_ok=True)
+    logger.info(f"🔎 全文索引已重建: {path}（{len(docs)} 篇，{len(terms)} 個詞）")
+    return len(docs)
+
+
+def _merge_terms(sources: List[Tuple[SearchIndex, Dict[int, int]]]) -> Tuple[List[bytes], List[array]]:
+    """
+    依詞序合併多個分段的 posting，doc_id 依 remap 轉換（不在 remap 中的文件捨棄）
+
+    sources 依新 doc_id 區間由小到大排列，合併後每個 posting 仍依 doc_id 遞增
+    """
+    cursors = [0] * len(sources)
+    terms: List[bytes] = []
+    postings: List[array] = []
+    while True:
+        heads = [seg.term(cursors[n]) for n, (seg, _) in enumerate(sources) if cursors[n] < seg.n_terms]
+        if not heads:
+            return terms, postings
+        term = min(heads)
+        plist = array('I')
+        for n, (seg, remap) in enumerate(sources):
+            if cursors[n] < seg.n_terms and seg.term(cursors[n]) == term:
+                old = seg.postings(cursors[n]).tolist()
+                for j in range(0, len(old), 2):
+                    if old[j] in remap:
+                        plist.extend((remap[old[j]], old[j + 1]))
+                cursors[n] += 1
+        if plist:
+            terms.append(term)
+            postings.append(plist)
+
+
+def _compact(path: Path, index: SegmentedIndex):
+    """把主索引與增量分段的有效文件合併成新的主索引（不必重讀頁面），刪除增量分段"""
+    docs: List[Dict] = []
+    texts: List[str] = []
+    remaps: List[Dict[int, int]] = [{} for _ in index.segments]
+    for n, i in index.live_refs():
+        remaps[n][i] = len(docs)
+        docs.append({k: v for k, v in index.doc((n, i)).items() if k != 'deleted'})
+        texts.append(index.text((n, i)))
+    terms, postings = _merge_terms(list(zip(index.segments, remaps)))
+    _write_index(path, docs, terms, postings, texts)
+    delta_path(path).unlink(missing_ok=True)
+    logger.info(f"🔎 全文索引已合併增量分段: {path}（{len(docs)} 篇，{len(terms)} 個詞）")
+
+
+def add_report(report: Dict, html: str, path: Path = SEARCH_INDEX_PATH):
+    """
+    增量加入一篇日報（generate_daily_html 寫出頁面後呼叫）
+
+    只改寫增量分段（最多 DELTA_MAX_DOCS 篇），主索引不動；增量分段超過上限或
+    失效文件超過 COMPACT_RATIO 時才與主索引合併成新的主索引。
+
+    Args:
+        report: reports_manifest 的項目（date / path / title / sha256）
+        html: 頁面 HTML
+    """
+    path = Path(path)
+    if not is_current_index(path):
+        # 清單此時已含這一篇，整份重建即包含它
+        build_index(path)
+        return
+
+    delta = delta_path(path)
+    text = extract_text(html)
+    counts = Counter(tokenize(text, unigrams=True))
+    entry = _doc_entry(report, counts)
+    new_terms = sorted((t.encode('utf-8'), tf) for t, tf in counts.items())
+
+    old = SearchIndex(delta) if delta.exists() else None
+    try:
+        docs = [dict(d) for d in old.docs] if old else []
+        texts = [old.text(i) for i in range(old.n_docs)] if old else []
+        for d in docs:
+            if d['date'] == report['date']:
+                d['deleted'] = True
+        doc_id = len(docs)
+        docs.append(entry)
+        texts.append(text[:SNIPPET_SOURCE_CHARS])
+
+        # 既有增量分段的詞表與新文件的詞依序合併；新文件的 doc_id 最大故接在各 posting 尾端
+        terms: List[bytes] = []
+        postings: List[array] = []
+        j = 0
+        for i in range(old.n_terms if old else 0):
+            term = old.term(i)
+            while j < len(new_terms) and new_terms[j][0] < term:
+                terms.append(new_terms[j][0])
+                postings.append(array('I', (doc_id, new_terms[j][1])))
+                j += 1
+            plist = array('I', old.postings(i))
+            if j < len(new_terms) and new_terms[j][0] == term:
+                plist.extend((doc_id, new_terms[j][1]))
+                j += 1
+            terms.append(term)
+            postings.append(plist)
+        for term, tf in new_terms[j:]:
+            terms.append(term)
+            postings.append(array('I', (doc_id, tf)))
+    finally:
+        if old is not None:
+            old.close()
+
+    _write_index(delta, docs, terms, postings, texts)
+
+    index = SegmentedIndex(path)
+    try:
+        total = sum(seg.n_docs for seg in index.segments)
+        if len(docs) > DELTA_MAX_DOCS or total - index.live_docs > COMPACT_RATIO * total:
+            _compact(path, index)
+        else:
+            logger.info(f"🔎 全文索引已加入 {report['date']}（增量分段 {len(docs)} 篇，共 {index.live_docs} 篇）")
+    finally:
+        index.close()
+
+
+# ---------------------------------------------------------------------------
+# 查詢
+# ---------------------------------------------------------------------------
+
+_index_cache: Dict[str, SegmentedIndex] = {}
+
+
+def _stamp(path: Path) -> tuple:
+    """主索引與增量分段的 (inode, mtime, size)，任一被替換即不同"""
+    stamps = []
+    for p in (path, delta_path(path)):
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        stamps.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+def _open_index(path: Path) -> Optional[SegmentedIndex]:
+    """
+    重複使用已開啟的 mmap；主索引或增量分段被替換（inode / mtime / size 改變）時重新開啟
+
+    索引不存在或為舊版格式時由日報清單建立；找不到任何日報則回傳 None（不留下空索引）
+    """
+    key = str(path)
+    cached = _index_cache.get(key)
+    if cached is not None and cached.stamp == _stamp(path):
+        return cached
+    if not is_current_index(path):
+        logger.info(f"🔎 尚無目前格式的全文索引，由日報清單建立: {path}")
+        if not build_index(path):
+            return None
+    if cached is not None:
+        cached.close()
+    _index_cache[key] = SegmentedIndex(path)
+    return _index_cache[key]
+
+
+def _snippet(text: str, query: str) -> str:
+    """取文件開頭本文中第一個命中查詢詞的片段（未命中時取開頭）"""
+    lowered = text.lower()
+    hits = [lowered.find(t) for t in sorted(set(tokenize(query)), key=len, reverse=True)]
+    hits = [h for h in hits if h >= 0]
+    start = max(0, min(hits) - SNIPPET_CHARS // 4) if hits else 0
+    snippet = text[start:start + SNIPPET_CHARS].replace('\n', ' ')
+    return ('…' if start else '') + snippet + ('…' if start + SNIPPET_CHARS < len(text) else '')
+
+
+def search(query: str, k: int = 5, path: Path = SEARCH_INDEX_PATH) -> List[Dict]:
+    """
+    全文檢索日報
+
+    Args:
+        query: 查詢字串（中英文皆可）
+        k: 最多回傳幾筆
+
+    Returns:
+        list of dict: [{'date', 'title', 'url', 'score', 'snippet'}, ...]，依相關度排序
+    """
+    index = _open_index(Path(path))
+    if index is None:
+        return []
+    results = []
+    for ref, score in index.search(query, k):
+        doc = index.doc(ref)
+        results.append({
+            'date': doc['date'],
+            'title': doc.get('title') or f"{doc['date']} AI 科技日報",
+            'url': f"{SITE_URL}/{doc['path']}",
+            'score': round(score, 4),
+            'snippet': _snippet(index.text(ref), query),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="日報全文檢索")
+    parser.add_argument("query", nargs="?", help="查詢字串")
+    parser.add_argument("-k", type=int, default=5, help="回傳筆數（預設: 5）")
+    parser.add_argument("--rebuild", action="store_true", help="由日報清單整份重建索引")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_index()
+    if args.query:
+        started = time.perf_counter()
+        hits = search(args.query, args.k)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"🔎 「{args.query}」找到 {len(hits)} 筆（{elapsed:.1f} ms）")
+        for hit in hits:
+            print(f"  {hit['date']}  {hit['title']}  ({hit['score']})\n    {hit['snippet']}\n    {hit['url']}")
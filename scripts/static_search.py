@@ -0,0 +1,219 @@
+"""
+網站靜態搜尋分片
+GitHub Pages 沒有後端，把全文索引（data/search/index.bin + 增量分段）預先切成 JSON 分片放在 search/ 下，
+瀏覽器端 thinker_search.js 只下載查詢詞所在的分片，不必載入整個歸檔。
+
+檔案配置:
+    search/meta.json                    文件表、BM25 參數、分段清單（各分片的內容雜湊）
+    search/seg-<lo>-<hi>-<xx>.json      分段 [lo, hi) 內文件的 {詞: [doc_id, tf, doc_id, tf, ...]}
+
+分段（segment）一旦寫出就不再修改：每天新增的日報寫成一個新分段，既有分片原封不動，
+版控歷史只多出當天的內容。分段以 LSM 方式合併：最後 SEGMENT_FANOUT 個分段層級相同時
+合併成一個（順便丟掉已刪除文件的 posting），每篇文件在整個歷史中只被重寫 O(log n) 次。
+
+分段內再依詞的第一個字元碼位 % shard_count 切成分片（thinker_search.js 用同一規則），
+shard_count 隨分段大小成長（1 → 8 → 64 → 256），每個分片的大小大致固定；
+查詢詞（bigram、CJK 單字的 unigram 或英數單字）在每個分段都只需一個分片。
+
+文件以 (path, sha256) 識別，doc_id 由本模組自行分配、只增不減，與 index.bin 重建後的編號無關；
+同一天重新產生的日報以新 doc_id 加入，舊的標記刪除（meta.docs 中為 null）。
+
+用法:
+    python scripts/static_search.py
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from log_config import get_logger
+from search_index import SEARCH_INDEX_PATH, BM25_K1, BM25_B, SegmentedIndex, build_index, is_current_index
+logger = get_logger(__name__)
+
+STATIC_SEARCH_DIR = Path('search')
+SHARD_COUNT = 256                # 單一分段最多切成幾個分片
+SEGMENT_FANOUT = 8               # 幾個同層級分段合併成一個；也是分片數隨層級成長的倍數
+STATIC_SEARCH_VERSION = 3
+
+
+def shard_key(term: str, shard_count: int = SHARD_COUNT) -> str:
+    """詞 → 分片名稱（兩位十六進位）"""
+    return f"{ord(term[0]) % shard_count:02x}"
+
+
+def _segment_level(n_docs: int) -> int:
+    """分段層級：涵蓋 FANOUT^L ~ FANOUT^(L+1) - 1 篇文件者為第 L 層"""
+    level = 0
+    while n_docs >= SEGMENT_FANOUT ** (level + 1):
+        level += 1
+    return level
+
+
+def _segment_shard_count(n_docs: int) -> int:
+    return min(SHARD_COUNT, SEGMENT_FANOUT ** _segment_level(n_docs))
+
+
+def _segment_file(segment: Dict, key: str) -> str:
+    return f"seg-{segment['lo']}-{segment['hi']}-{key}.json"
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _doc_identity(doc: Dict) -> str:
+    return f"{doc['path']}@{doc.get('sha256') or ''}"
+
+
+def _load_meta(out_dir: Path) -> Optional[Dict]:
+    """讀取既有 meta.json；格式不符或有分片遺失時回 None（整份重建）"""
+    meta_path = out_dir / 'meta.json'
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ 靜態搜尋 meta.json 無法讀取，全部重建: {e}")
+        return None
+    if meta.get('version') != STATIC_SEARCH_VERSION:
+        logger.info("🔎 靜態搜尋格式已更新，全部重建")
+        return None
+    missing = [name for seg in meta['segments'] for name in (_segment_file(seg, k) for k in seg['shards'])
+               if not (out_dir / name).exists()]
+    if missing:
+        logger.warning(f"⚠️ 靜態搜尋分片遺失 {len(missing)} 個（如 {missing[0]}），全部重建")
+        return None
+    return meta
+
+
+def _write_segment(out_dir: Path, lo: int, hi: int, terms: Dict[str, List[int]]) -> Tuple[Dict, int]:
+    """寫出分段 [lo, hi) 的所有分片，回傳 (分段描述, 寫出的檔案數)"""
+    segment = {'lo': lo, 'hi': hi, 'shard_count': _segment_shard_count(hi - lo), 'shards': {}}
+    shards: Dict[str, Dict[str, List[int]]] = {}
+    for term, plist in terms.items():
+        shards.setdefault(shard_key(term, segment['shard_count']), {})[term] = plist
+    for key in sorted(shards):
+        data = _dumps(shards[key])
+        segment['shards'][key] = _content_hash(data)
+        (out_dir / _segment_file(segment, key)).write_bytes(data)
+    return segment, len(shards)
+
+
+def _read_live_postings(out_dir: Path, segments: List[Dict], docs: List) -> Dict[str, List[int]]:
+    """讀回多個相鄰分段的 posting（依 doc_id 順序串接），略過已刪除的文件"""
+    terms: Dict[str, List[int]] = {}
+    for segment in segments:
+        for key in segment['shards']:
+            data = json.loads((out_dir / _segment_file(segment, key)).read_text(encoding='utf-8'))
+            for term, plist in data.items():
+                kept = [v for j in range(0, len(plist), 2) if docs[plist[j]] is not None
+                        for v in (plist[j], plist[j + 1])]
+                if kept:
+                    terms.setdefault(term, []).extend(kept)
+    return terms
+
+
+def build_static_search(out_dir: Path = STATIC_SEARCH_DIR, index_path: Path = SEARCH_INDEX_PATH) -> Dict[str, int]:
+    """
+    由全文索引增量更新靜態搜尋分片
+
+    Returns:
+        {'segments': 分段數, 'added': 新增文件數, 'removed': 刪除文件數, 'written': 本次寫出的分片數}
+    """
+    out_dir = Path(out_dir)
+    index_path = Path(index_path)
+    if not is_current_index(index_path) and not build_index(index_path):
+        logger.warning("⚠️ 沒有全文索引可切分，略過靜態搜尋分片")
+        return {'segments': 0, 'added': 0, 'removed': 0, 'written': 0}
+
+    meta = _load_meta(out_dir) or {'docs': [], 'keys': [], 'segments': []}
+    docs: List = meta['docs']
+    keys: List = meta['keys']
+    segments: List[Dict] = meta['segments']
+    known = {key: doc_id for doc_id, key in enumerate(keys) if key is not None}
+
+    index = SegmentedIndex(index_path)
+    try:
+        live = {_doc_identity(index.doc(ref)): ref for ref in index.live_refs()}
+        removed = [doc_id for key, doc_id in known.items() if key not in live]
+        added = sorted((ref, key) for key, ref in live.items() if key not in known)
+        if not removed and not added:
+            logger.info("🔎 日報未變更，略過靜態搜尋分片")
+            return {'segments': len(segments), 'added': 0, 'removed': 0, 'written': 0}
+
+        for doc_id in removed:
+            docs[doc_id] = keys[doc_id] = None
+
+        # 新文件依 (索引分段, doc_id) 順序接在尾端；各分段的 posting 依 doc_id 排序，映射後仍為遞增
+        lo = len(docs)
+        remaps: List[Dict[int, int]] = [{} for _ in index.segments]
+        for (n, index_id), key in added:
+            d = index.doc((n, index_id))
+            remaps[n][index_id] = len(docs)
+            docs.append([d['date'], d['path'], d.get('title'), d['length']])
+            keys.append(key)
+
+        terms: Dict[str, List[int]] = {}
+        for segment, remap in zip(index.segments, remaps):
+            if not remap:
+                continue                 # 只掃有新文件的分段（通常只有增量分段）
+            for i in range(segment.n_terms):
+                plist = segment.postings(i).tolist()
+                kept = [v for j in range(0, len(plist), 2) if plist[j] in remap
+                        for v in (remap[plist[j]], plist[j + 1])]
+                if kept:
+                    terms.setdefault(segment.term(i).decode('utf-8'), []).extend(kept)
+    finally:
+        index.close()
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    if terms:
+        segment, n = _write_segment(out_dir, lo, len(docs), terms)
+        segments.append(segment)
+        written += n
+
+    # 最後 SEGMENT_FANOUT 個分段層級相同時合併（可能連鎖）
+    while (len(segments) >= SEGMENT_FANOUT
+           and len({_segment_level(s['hi'] - s['lo']) for s in segments[-SEGMENT_FANOUT:]}) == 1):
+        group = segments[-SEGMENT_FANOUT:]
+        merged_terms = _read_live_postings(out_dir, group, docs)
+        del segments[-SEGMENT_FANOUT:]
+        segment, n = _write_segment(out_dir, group[0]['lo'], group[-1]['hi'], merged_terms)
+        segments.append(segment)
+        written += n
+        logger.info(f"  🔎 合併 {len(group)} 個分段 → seg-{segment['lo']}-{segment['hi']}（{n} 個分片）")
+
+    lengths = [d[3] for d in docs if d is not None]
+    meta = {
+        'version': STATIC_SEARCH_VERSION,
+        'k1': BM25_K1,
+        'b': BM25_B,
+        'avg_length': round(sum(lengths) / len(lengths), 3) if lengths else 0.0,
+        'live_docs': len(lengths),
+        'docs': docs,
+        'keys': keys,
+        'segments': segments,
+    }
+    (out_dir / 'meta.json').write_bytes(_dumps(meta))
+
+    # 清掉不再被 meta.json 參照的分片（被合併的分段、舊版格式）
+    referenced = {_segment_file(seg, key) for seg in segments for key in seg['shards']}
+    for path in out_dir.glob('*.json'):
+        if path.name != 'meta.json' and path.name not in referenced:
+            path.unlink()
+
+    logger.info(f"🔎 靜態搜尋分片已更新: {out_dir}/（新增 {len(added)} 篇、刪除 {len(removed)} 篇，"
+                f"寫出 {written} 個分片，共 {len(segments)} 個分段）")
+    return {'segments': len(segments), 'added': len(added), 'removed': len(removed), 'written': written}
+
+
+if __name__ == "__main__":
+    result = build_static_search()
+    print(f"✅ 靜態搜尋: {result['segments']} 個分段"
+          f"（新增 {result['added']} 篇、刪除 {result['removed']} 篇，寫出 {result['written']} 個分片）")
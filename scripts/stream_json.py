@@ -0,0 +1,98 @@
+"""
+增量 JSON 解析器
+串流 LLM 回應時逐段餵入文字，頂層物件的每個成員（如數據煉金術師的各分類）
+一完成就解析並回呼，下游不必等整份回應結束。
+
+- 略過第一個 '{' 之前的任何文字（如 ```json 標記或前言）
+- 追蹤字串 / 跳脫 / 巢狀深度，只在頂層成員結束時才呼叫 json.loads
+- 串流結束時頂層物件仍未閉合即視為截斷
+
+用法:
+    parser = IncrementalJSONParser(on_member=lambda key, value: ...)
+    for chunk in stream:
+        parser.feed(chunk)
+    if parser.truncated: ...
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+from log_config import get_logger
+logger = get_logger(__name__)
+
+
+class IncrementalJSONParser:
+    """逐段解析頂層 JSON 物件，成員完成時回呼 on_member(key, value)"""
+
+    def __init__(self, on_member: Optional[Callable[[str, Any], None]] = None):
+        self.on_member = on_member
+        self.members: Dict[str, Any] = {}
+        self.complete = False
+        self._buffer = []          # 目前頂層成員的文字
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def truncated(self) -> bool:
+        """已開始解析但頂層物件尚未閉合"""
+        return self._started and not self.complete
+
+    def feed(self, chunk: str):
+        """餵入一段文字"""
+        if self.complete or not chunk:
+            return
+
+        for ch in chunk:
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._buffer.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit()
+                    self.complete = True
+                    return
+
+            if self._depth == 1 and ch == ',':
+                self._emit()
+            else:
+                self._buffer.append(ch)
+
+    def _emit(self):
+        """解析緩衝中的一個頂層成員"""
+        text = ''.join(self._buffer).strip()
+        self._buffer = []
+        if not text:
+            return
+        try:
+            member = json.loads('{' + text + '}')
+        except json.JSONDecodeError as e:
+            logger.warning(f"  ⚠️  串流 JSON 成員解析失敗，留待完整輸出修復: {e}")
+            return
+
+        for key, value in member.items():
+            self.members[key] = value
+            if self.on_member:
+                try:
+                    self.on_member(key, value)
+                except Exception as e:
+                    logger.warning(f"  ⚠️  串流成員回呼失敗 ({key}): {e}")
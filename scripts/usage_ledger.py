@@ -0,0 +1,225 @@
+"""
+LLM 用量與成本帳本
+每次 LLM 呼叫產生一筆結構化紀錄（ai_processor 送進 ExecutionLogger），
+執行結束時彙整為每日 rollup：data/usage/<date>.json，同一天多次執行會累加在 runs 中。
+
+報表（預設涵蓋所有已發佈日報的期間，含 archive/ 與根目錄）:
+    python scripts/usage_ledger.py
+    python scripts/usage_ledger.py --days 14
+    python scripts/usage_ledger.py --json
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from log_config import get_logger
+from reports_manifest import MANIFEST_PATH, latest_per_date
+logger = get_logger(__name__)
+
+USAGE_DIR = Path('data/usage')
+
+# 每百萬 token 價格（USD）：輸入 / 快取命中的輸入 / 輸出
+PROVIDER_PRICES = {
+    'gpt-4.1': {'input': 2.00, 'cached_input': 0.50, 'output': 8.00},
+    'gpt-4.1-mini': {'input': 0.40, 'cached_input': 0.10, 'output': 1.60},
+    'deepseek-chat': {'input': 0.27, 'cached_input': 0.07, 'output': 1.10},
+}
+
+_SUM_FIELDS = ('prompt_tokens', 'cached_prompt_tokens', 'completion_tokens', 'cost_usd', 'latency_secs')
+
+
+def call_cost(model: str, prompt_tokens: Optional[int], cached_prompt_tokens: Optional[int],
+              completion_tokens: Optional[int]) -> Optional[float]:
+    """依 PROVIDER_PRICES 計算單次呼叫成本（USD）；未知模型或無用量時回 None"""
+    price = PROVIDER_PRICES.get(model)
+    if price is None or prompt_tokens is None:
+        return None
+    cached = cached_prompt_tokens or 0
+    cost = ((prompt_tokens - cached) * price['input'] + cached * price['cached_input']
+            + (completion_tokens or 0) * price['output']) / 1_000_000
+    return round(cost, 6)
+
+
+def _empty_group() -> Dict[str, Any]:
+    return {'calls': 0, 'errors': 0, 'retries': 0, 'fallbacks': 0, 'response_cache_hits': 0,
+            **{f: 0 for f in _SUM_FIELDS}}
+
+
+def _merge_group(target: Dict[str, Any], group: Dict[str, Any]):
+    for key, value in group.items():
+        if isinstance(value, (int, float)):
+            target[key] = target.get(key, 0) + value
+
+
+def _round_group(group: Dict[str, Any]) -> Dict[str, Any]:
+    group['cost_usd'] = round(group['cost_usd'], 6)
+    group['latency_secs'] = round(group['latency_secs'], 3)
+    return group
+
+
+def summarize_calls(calls: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    依階段與整體彙總呼叫紀錄
+
+    Returns:
+        {'totals': {...}, 'stages': {階段: {...}}}，每組含 calls / errors / retries / fallbacks /
+        response_cache_hits 與 _SUM_FIELDS 的加總
+    """
+    totals = _empty_group()
+    stages: Dict[str, Dict[str, Any]] = {}
+    for call in calls:
+        one = {
+            'calls': 1,
+            'errors': int(call.get('status') != 'success'),
+            'retries': int((call.get('attempt') or 1) > 1),
+            'fallbacks': int(bool(call.get('fallback'))),
+            'response_cache_hits': int(bool(call.get('response_cached'))),
+            **{f: call.get(f) or 0 for f in _SUM_FIELDS},
+        }
+        _merge_group(stages.setdefault(call.get('step') or 'unknown', _empty_group()), one)
+        _merge_group(totals, one)
+    return {'totals': _round_group(totals), 'stages': {k: _round_group(v) for k, v in stages.items()}}
+
+
+def merge_summaries(summaries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """合併多份 summarize_calls 的結果（多次執行 → 單日、多日 → 期間）"""
+    totals = _empty_group()
+    stages: Dict[str, Dict[str, Any]] = {}
+    for summary in summaries:
+        _merge_group(totals, summary.get('totals', {}))
+        for stage, group in summary.get('stages', {}).items():
+            _merge_group(stages.setdefault(stage, _empty_group()), group)
+    return {'totals': _round_group(totals), 'stages': {k: _round_group(v) for k, v in stages.items()}}
+
+
+def write_daily_rollup(date: str, execution_data: Dict[str, Any], usage_dir: Path = USAGE_DIR) -> Path:
+    """
+    把一次執行的用量彙總加入 data/usage/<date>.json
+
+    Args:
+        date: 日報日期（YYYY-MM-DD）
+        execution_data: ExecutionLogger.execution_data（需含 llm_calls / usage）
+    """
+    usage_dir = Path(usage_dir)
+    usage_dir.mkdir(parents=True, exist_ok=True)
+    path = usage_dir / f"{date}.json"
+
+    rollup = {'date': date, 'runs': []}
+    if path.exists():
+        try:
+            rollup = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ 用量 rollup 讀取失敗，重新建立: {e}")
+
+    run_usage = execution_data.get('usage') or summarize_calls(execution_data.get('llm_calls', []))
+    rollup['runs'] = [r for r in rollup.get('runs', []) if r.get('execution_id') != execution_data.get('execution_id')]
+    rollup['runs'].append({
+        'execution_id': execution_data.get('execution_id'),
+        'status': execution_data.get('status'),
+        **run_usage,
+    })
+    rollup['day'] = merge_summaries(rollup['runs'])
+
+    tmp = path.with_suffix('.json.tmp')
+    tmp.write_text(json.dumps(rollup, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+    logger.info(f"💰 用量 rollup 已更新: {path}（本次 ${run_usage['totals']['cost_usd']:.4f}）")
+    return path
+
+
+def load_rollups(usage_dir: Path = USAGE_DIR, start: Optional[str] = None,
+                 end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """讀取日期區間內（含端點）的每日 rollup，依日期排序"""
+    rollups = []
+    for path in sorted(Path(usage_dir).glob('*.json')):
+        date = path.stem
+        if (start and date < start) or (end and date > end):
+            continue
+        try:
+            rollups.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ 略過無法讀取的 rollup {path.name}: {e}")
+    return rollups
+
+
+def report_period(manifest_path: Path = MANIFEST_PATH) -> tuple:
+    """
+    已發佈日報的 (最早日期, 最晚日期)，由日報清單取得（archive/ 與根目錄的日報都算）；
+    沒有日報時回 (None, None)
+    """
+    dates = sorted(r['date'] for r in latest_per_date(manifest_path))
+    return (dates[0], dates[-1]) if dates else (None, None)
+
+
+# ---------------------------------------------------------------------------
+# CLI 報表
+# ---------------------------------------------------------------------------
+
+def build_report(rollups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """每日趨勢 + 期間內各階段的成本 / 延遲佔比"""
+    days = []
+    for rollup in rollups:
+        day = rollup.get('day') or merge_summaries(rollup.get('runs', []))
+        days.append({'date': rollup.get('date'), 'runs': len(rollup.get('runs', [])), **day['totals']})
+
+    period = merge_summaries(r.get('day') or merge_summaries(r.get('runs', [])) for r in rollups)
+    total_cost = period['totals']['cost_usd'] or 0
+    total_latency = period['totals']['latency_secs'] or 0
+    stages = {
+        stage: {
+            **group,
+            'cost_share': round(group['cost_usd'] / total_cost, 3) if total_cost else 0.0,
+            'latency_share': round(group['latency_secs'] / total_latency, 3) if total_latency else 0.0,
+        }
+        for stage, group in sorted(period['stages'].items(), key=lambda kv: -kv[1]['cost_usd'])
+    }
+    return {
+        'days': days,
+        'totals': period['totals'],
+        'avg_cost_per_day': round(total_cost / len(days), 6) if days else 0.0,
+        'stages': stages,
+    }
+
+
+def print_report(report: Dict[str, Any], start: Optional[str], end: Optional[str]):
+    print(f"📊 LLM 用量報表 {start or '—'} ~ {end or '—'}（{len(report['days'])} 天有紀錄）")
+    print()
+    print(f"{'日期':<12}{'執行':>4}{'呼叫':>6}{'成本 USD':>11}{'prompt':>10}{'快取':>9}{'輸出':>9}{'延遲 s':>9}{'重試':>5}{'備援':>5}")
+    for d in report['days']:
+        print(f"{d['date']:<12}{d['runs']:>4}{d['calls']:>6}{d['cost_usd']:>11.4f}{d['prompt_tokens']:>10}"
+              f"{d['cached_prompt_tokens']:>9}{d['completion_tokens']:>9}{d['latency_secs']:>9.1f}"
+              f"{d['retries']:>5}{d['fallbacks']:>5}")
+    print()
+    t = report['totals']
+    print(f"合計 ${t['cost_usd']:.4f}（平均每天 ${report['avg_cost_per_day']:.4f}），"
+          f"{t['calls']} 次呼叫，延遲 {t['latency_secs']:.1f}s")
+    print()
+    print(f"{'階段':<14}{'成本佔比':>8}{'延遲佔比':>8}{'成本 USD':>11}{'延遲 s':>9}{'呼叫':>6}{'錯誤':>5}")
+    for stage, g in report['stages'].items():
+        print(f"{stage:<14}{g['cost_share']:>8.1%}{g['latency_share']:>8.1%}{g['cost_usd']:>11.4f}"
+              f"{g['latency_secs']:>9.1f}{g['calls']:>6}{g['errors']:>5}")
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime, timedelta
+
+    parser = argparse.ArgumentParser(description="LLM 用量與成本趨勢報表")
+    parser.add_argument("--days", type=int, default=None,
+                        help="只看最近 N 天（預設為已發佈日報的完整期間）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式輸出")
+    args = parser.parse_args()
+
+    start, end = report_period()
+    if args.days:
+        last = end or datetime.now().strftime('%Y-%m-%d')
+        start = (datetime.strptime(last, '%Y-%m-%d') - timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+        end = last
+
+    report = build_report(load_rollups(start=start, end=end))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, start, end)
@@ -5,10 +5,11 @@
 import json
 import re
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, Optional
 from json_repair import repair_json
 
 from log_config import get_logger
+from output_schemas import schema_errors
 logger = get_logger(__name__)
 
 
@@ -31,7 +32,7 @@ def get_taiwan_date() -> str:
     return date_string
 
 
-def validate_json_output(raw_output: str, agent_name: str) -> Dict:
+def validate_json_output(raw_output: str, agent_name: str, schema: Optional[Dict] = None) -> Dict:
     """
     驗證和清理 AI 輸出的 JSON
     增強版：包含自動修復功能
@@ -39,12 +40,23 @@ def validate_json_output(raw_output: str, agent_name: str) -> Dict:
     Args:
         raw_output: AI 的原始輸出
         agent_name: Agent 名稱（用於日誌）
+        schema: 該階段的輸出結構（output_schemas），提供時一併驗證
 
     Returns:
         解析後的 JSON 對象
     """
     logger.info(f"🔧 驗證 {agent_name} 的輸出...")
 
+    # 快速路徑：JSON 模式下輸出本身就是合法 JSON，不必擷取或修復
+    try:
+        parsed_json = json.loads(raw_output)
+    except (json.JSONDecodeError, TypeError):
+        parsed_json = None
+    if isinstance(parsed_json, dict):
+        _check_schema(parsed_json, schema, agent_name)
+        logger.info(f"✅ {agent_name} 輸出驗證成功（快速路徑）")
+        return parsed_json
+
     try:
         # 嘗試找到 JSON 對象的邊界
         start_index = raw_output.find('{')
@@ -62,6 +74,7 @@ def validate_json_output(raw_output: str, agent_name: str) -> Dict:
         # 第一次嘗試：直接解析
         try:
             parsed_json = json.loads(json_string)
+            _check_schema(parsed_json, schema, agent_name)
             logger.info(f"✅ {agent_name} 輸出驗證成功（直接解析）")
             return parsed_json
         except json.JSONDecodeError as e:
@@ -72,19 +85,55 @@ def validate_json_output(raw_output: str, agent_name: str) -> Dict:
             try:
                 repaired_string = repair_json(json_string)
                 parsed_json = json.loads(repaired_string)
-                logger.info(f"✅ {agent_name} 輸出驗證成功（使用修復）")
-                return parsed_json
             except Exception as repair_error:
                 logger.error(f"❌ {agent_name} JSON 修復也失敗: {str(repair_error)}")
                 logger.error(f"原始輸出前 500 字: {raw_output[:500]}...")
                 logger.error(f"JSON 字符串前 500 字: {json_string[:500]}...")
                 raise ValueError(f"JSON 解析和修復都失敗: {str(e)}")
+            _check_schema(parsed_json, schema, agent_name)
+            logger.info(f"✅ {agent_name} 輸出驗證成功（使用修復）")
+            return parsed_json
 
     except Exception as e:
         logger.error(f"❌ {agent_name} 輸出驗證失敗: {str(e)}")
         raise
 
 
+def _check_schema(parsed_json, schema: Optional[Dict], agent_name: str):
+    """結構不符時拋出 ValueError（交由階段重試策略處理）"""
+    if schema is None:
+        return
+    errors = schema_errors(parsed_json, schema)
+    if errors:
+        raise ValueError(f"{agent_name} 輸出結構不符: {'; '.join(errors[:5])}")
+
+
+def is_valid_json_output(raw_output: str, schema: Optional[Dict] = None) -> bool:
+    """安靜版的 validate_json_output：只回報輸出能否解析（含 json-repair 修復）且符合結構"""
+    if not raw_output:
+        return False
+    try:
+        parsed = json.loads(raw_output)
+    except json.JSONDecodeError:
+        parsed = None
+    if parsed is None:
+        start_index = raw_output.find('{')
+        end_index = raw_output.rfind('}')
+        if start_index == -1 or end_index == -1:
+            return False
+        json_string = raw_output[start_index:end_index + 1].replace('```json', '').replace('```', '').strip()
+        try:
+            parsed = json.loads(json_string)
+        except json.JSONDecodeError:
+            try:
+                parsed = json.loads(repair_json(json_string))
+            except Exception:
+                return False
+    if not isinstance(parsed, dict):
+        return False
+    return schema is None or not schema_errors(parsed, schema)
+
+
 def clean_json_string(json_str: str) -> str:
     """
     清理 JSON 字符串
@@ -0,0 +1,42 @@
+"""pytest 共用設定：scripts/ 是扁平模組目錄，測試直接 import 其中的模組"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+PAGE = '<html><head><title>{title} AI 科技日報 | Thinker News</title></head><body>{body}</body></html>'
+
+
+@pytest.fixture
+def repo_manifest(tmp_path, monkeypatch):
+    """
+    以 tmp_path 作為 repo 根目錄：reports_manifest 的路徑與 search_index 讀取的日報清單都指向這裡，
+    並清掉本 process 的比對紀錄；回傳清單路徑
+    """
+    import reports_manifest
+    import search_index
+
+    root = tmp_path.resolve()
+    manifest = root / 'reports_manifest.json'
+    monkeypatch.setattr(reports_manifest, 'REPO_ROOT', root)
+    monkeypatch.setattr(reports_manifest, 'ARCHIVE_DIR', root / 'archive')
+    monkeypatch.setattr(reports_manifest, '_reconciled', set())
+    monkeypatch.setattr(search_index, 'REPO_ROOT', root)
+    monkeypatch.setattr(search_index, 'latest_per_date', lambda: reports_manifest.latest_per_date(manifest))
+    return manifest
+
+
+@pytest.fixture
+def write_page():
+    """寫出一篇日報頁面：write_page(路徑, 標題, 本文 HTML='')，回傳 HTML"""
+
+    def write(path: Path, title: str, body: str = '') -> str:
+        html = PAGE.format(title=title, body=body)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding='utf-8')
+        return html
+
+    return write
@@ -0,0 +1,22 @@
+"""CheckpointStore：input_hash 為函式時以階段執行後的狀態保存，續跑時狀態未變才沿用"""
+
+from checkpoint import CheckpointStore
+
+
+def test_callable_input_hash_is_taken_after_the_stage(tmp_path):
+    state = {'entries': 1}
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        state['entries'] += 1        # 讀取本身會寫入條目庫
+        return ['news']
+
+    key = lambda: f"entries={state['entries']}"
+    CheckpointStore('2026-03-01', root=tmp_path).run('rss', key, fetch)
+    assert CheckpointStore('2026-03-01', resume=True, root=tmp_path).run('rss', key, fetch) == ['news']
+    assert len(calls) == 1
+
+    state['entries'] += 5            # 期間另一次執行讀到新條目
+    CheckpointStore('2026-03-01', resume=True, root=tmp_path).run('rss', key, fetch)
+    assert len(calls) == 2
@@ -0,0 +1,42 @@
+"""事件日誌：execution_log.json 重建輸出必為合法 JSON；span 數有上限"""
+
+import json
+
+import execution_logger
+from event_log import EventSink, write_execution_view
+from execution_logger import ExecutionLogger
+
+
+def test_view_of_empty_event_file(tmp_path):
+    events = tmp_path / 'empty.events.jsonl'
+    events.write_text('', encoding='utf-8')
+    out = tmp_path / 'execution_log.json'
+    write_execution_view(events, str(out), tmp_path)
+    assert json.loads(out.read_text(encoding='utf-8')) == {'nodes': []}
+
+
+def test_view_round_trips_nodes_and_blobs(tmp_path):
+    sink = EventSink('run', tmp_path)
+    big = {'text': '多行\n輸出' * 2000}
+    sink.emit('run_start', execution_id='run', trace_id='t')
+    sink.emit('node_start', name='a', type='ai', description='')
+    sink.emit('node_success', name='a', duration=1.0, output=sink.payload(big))
+    sink.emit('run_complete', status='success', duration=2.0)
+    sink.close()
+
+    out = tmp_path / 'execution_log.json'
+    write_execution_view(sink.path, str(out), tmp_path)
+    view = json.loads(out.read_text(encoding='utf-8'))
+    assert view['status'] == 'success'
+    assert [n['name'] for n in view['nodes']] == ['a']
+    assert view['nodes'][0]['output'] == big
+
+
+def test_spans_are_capped(monkeypatch):
+    monkeypatch.setattr(execution_logger, 'MAX_SPANS', 5)
+    tracer = ExecutionLogger(event_dir=None)
+    for i in range(10):
+        with tracer.span(f"s{i}"):
+            pass
+    assert len(tracer.spans) == 5
+    assert tracer.dropped_spans == 6
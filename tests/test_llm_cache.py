@@ -0,0 +1,49 @@
+"""LLM 快取：只有通過階段有效性檢查的輸出才寫入；response_format 不同即為不同 key"""
+
+import pytest
+
+import ai_processor
+from llm_cache import LLMCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path, mode='1')
+    monkeypatch.setattr(ai_processor, '_llm_cache', cache)
+    return cache
+
+
+def _call(output, calls, **kwargs):
+    def call():
+        calls.append(output)
+        return output
+    return ai_processor._cached_call('DeepSeek', 'deepseek-chat', 'system', 'user', 0.7, 8192, call, **kwargs)
+
+
+def test_output_failing_stage_check_is_not_cached(cache):
+    calls = []
+    truncated = '<html><body>cut off'
+    is_complete = lambda text: '</html>' in text
+    assert _call(truncated, calls, is_valid=is_complete) == truncated
+    assert _call(truncated, calls, is_valid=is_complete) == truncated
+    assert len(calls) == 2
+
+    complete = '<html><body></body></html>'
+    _call(complete, calls, is_valid=is_complete)
+    assert _call('unused', calls, is_valid=is_complete) == complete
+    assert len(calls) == 3
+
+
+def test_json_valid_but_schema_invalid_output_is_not_cached(cache):
+    calls = []
+    schema_check = lambda text: ai_processor.is_valid_json_output(text) and '"categories"' in text
+    _call('{"other": 1}', calls, expect_json=True, is_valid=schema_check)
+    _call('{"other": 1}', calls, expect_json=True, is_valid=schema_check)
+    assert len(calls) == 2
+
+
+def test_response_format_is_part_of_the_key():
+    plain = cache_key('OpenAI', 'gpt-4.1', 's', 'u', 0.7, None)
+    json_mode = cache_key('OpenAI', 'gpt-4.1', 's', 'u', 0.7, None, {'type': 'json_object'})
+    assert plain != json_mode
+    assert json_mode == cache_key('OpenAI', 'gpt-4.1', 's', 'u', 0.7, None, {'type': 'json_object'})
@@ -0,0 +1,49 @@
+"""
+LLMPool.limit：拿不到限流額度或併發名額而放棄時，預約的請求數與 token 額度必須退還
+"""
+
+import pytest
+
+import llm_pool
+from llm_pool import LLMPool, RateLimitTimeout
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(llm_pool, 'ACQUIRE_TIMEOUT_SECS', 0.01)
+    pool = LLMPool()
+    pool.register('p', lambda: None, rpm=60, tpm=1000, max_concurrency=1)
+    return pool, pool._provider('p')
+
+
+def _available(bucket):
+    with bucket._lock:
+        bucket._refill()
+        return bucket._tokens
+
+
+def test_semaphore_timeout_refunds_reservation(pool):
+    pool, provider = pool
+    with pool.limit('p', 100):
+        requests, tokens = _available(provider.requests), _available(provider.tokens)
+        with pytest.raises(RateLimitTimeout, match='併發'):
+            with pool.limit('p', 400):
+                pass
+        assert _available(provider.requests) == pytest.approx(requests, abs=0.1)
+        assert _available(provider.tokens) == pytest.approx(tokens, abs=1)
+
+
+def test_rate_wait_over_limit_refunds_reservation(pool):
+    pool, provider = pool
+    tokens = _available(provider.tokens)
+    with pytest.raises(RateLimitTimeout, match='限流'):
+        with pool.limit('p', 5000):
+            pass
+    assert _available(provider.tokens) == pytest.approx(tokens, abs=1)
+
+
+def test_lease_settles_actual_usage(pool):
+    pool, provider = pool
+    with pool.limit('p', 300) as lease:
+        lease.settle(100)
+    assert _available(provider.tokens) == pytest.approx(900, abs=1)
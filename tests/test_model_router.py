@@ -0,0 +1,125 @@
+"""
+ModelRouter 斷路器：half-open 試探名額只在實際呼叫（acquire）時佔用，
+沒輪到、快取命中或程式錯誤中止的呼叫都不能讓路由永久停在斷路狀態
+"""
+
+import threading
+
+import pytest
+
+import ai_processor
+import model_router
+from model_router import ModelRouter, Route
+
+PRIMARY = Route('deepseek', 'deepseek-chat')
+BACKUP = Route('openai', 'gpt-4.1-mini')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_router.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _half_open(router, route, clock):
+    for _ in range(model_router.BREAKER_FAILURE_THRESHOLD):
+        router.record(route, ok=False)
+    clock[0] += model_router.BREAKER_COOLDOWN_SECS + 1
+
+
+def test_listing_does_not_take_the_trial(clock):
+    router = ModelRouter({'s': [PRIMARY, BACKUP], 't': [BACKUP]})
+    _half_open(router, BACKUP, clock)
+    assert BACKUP in router.candidates('s')
+    router.record(PRIMARY, ok=True)          # 前面的路由成功，BACKUP 沒被呼叫
+    assert BACKUP in router.candidates('s')
+    assert router.candidates('t') == [BACKUP]
+    assert router.acquire(BACKUP)
+
+
+def test_half_open_allows_single_trial(clock):
+    router = ModelRouter({'s': [PRIMARY, BACKUP]})
+    _half_open(router, PRIMARY, clock)
+    assert router.acquire(PRIMARY)
+    assert not router.acquire(PRIMARY)
+    assert PRIMARY not in router.candidates('s')
+    router.record(PRIMARY, ok=True)
+    assert router.snapshot()[str(PRIMARY)]['open'] is False
+
+
+def test_release_clears_trial_without_recording(clock):
+    router = ModelRouter({'s': [PRIMARY, BACKUP]})
+    _half_open(router, PRIMARY, clock)
+    assert router.acquire(PRIMARY)
+    router.release(PRIMARY)
+    assert router.acquire(PRIMARY)
+    assert router.snapshot()[str(PRIMARY)]['calls'] == model_router.BREAKER_FAILURE_THRESHOLD
+    assert router.snapshot()[str(PRIMARY)]['open'] is True
+
+
+@pytest.fixture
+def routed(monkeypatch, clock):
+    """call_routed 改用獨立的 router，_call_route 依路由回傳 / 拋出 behaviour 中的結果"""
+    router = ModelRouter({'s': [PRIMARY, BACKUP]})
+    behaviour = {}
+
+    def fake_call(route, *args, **kwargs):
+        result = behaviour[route]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(ai_processor, '_model_router', router)
+    monkeypatch.setattr(ai_processor, '_call_route', fake_call)
+    return router, behaviour
+
+
+def test_earlier_route_success_leaves_half_open_route_available(routed, clock):
+    router, behaviour = routed
+    _half_open(router, BACKUP, clock)
+    behaviour[PRIMARY] = 'ok'
+    assert ai_processor.call_routed('s', 'sys', 'user') == 'ok'
+    assert router.acquire(BACKUP)
+
+
+def test_programming_error_releases_trial(routed, clock):
+    router, behaviour = routed
+    _half_open(router, PRIMARY, clock)
+    _half_open(router, BACKUP, clock)
+    behaviour[PRIMARY] = TypeError('bug')
+    with pytest.raises(TypeError):
+        ai_processor.call_routed('s', 'sys', 'user')
+    assert router.acquire(PRIMARY)
+    assert router.acquire(BACKUP)
+
+
+def test_all_open_still_forces_first_route(routed, clock):
+    router, behaviour = routed
+    for _ in range(model_router.BREAKER_FAILURE_THRESHOLD):
+        router.record(PRIMARY, ok=False)
+        router.record(BACKUP, ok=False)
+    assert router.candidates('s') == [PRIMARY]   # 兩條都在冷卻中
+    behaviour[PRIMARY] = 'forced'
+    assert ai_processor.call_routed('s', 'sys', 'user') == 'forced'
+
+
+def test_call_metrics_are_per_thread(routed):
+    router, behaviour = routed
+    behaviour[PRIMARY] = 'ok'
+    real_call = ai_processor._call_route
+
+    def call_with_metrics(route, *args, **kwargs):
+        ai_processor._record_metrics(provider=route.provider, ttft_secs=0.5)
+        return real_call(route, *args, **kwargs)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ai_processor, '_call_route', call_with_metrics)
+        ai_processor.clear_last_call_metrics()
+        worker = threading.Thread(target=ai_processor.call_routed, args=('s', 'sys', 'user'))
+        worker.start()
+        worker.join()
+        assert ai_processor.get_last_call_metrics() == {}
+        ai_processor.call_routed('s', 'sys', 'user')
+    assert ai_processor.get_last_call_metrics() == {'provider': 'deepseek', 'ttft_secs': 0.5,
+                                                    'route': str(PRIMARY), 'fallback': False}
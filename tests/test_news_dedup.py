@@ -0,0 +1,105 @@
+"""
+news_dedup：canonical_link 追蹤參數只移除完全相符的名稱與 utm_ 前綴；
+MinHash 簽章估計 Jaccard 相似度，LSH 只比對同 bucket 的候選，dedupe_news 每群留分數最高者
+"""
+
+import hashlib
+
+import pytest
+
+import news_dedup
+from news_dedup import canonical_link, minhash_signature, cluster_duplicates, dedupe_news
+
+ARTICLE = ('OpenAI 今天發表新一代語言模型，推理能力大幅提升，並同步開放企業 API 試用，'
+           '台灣多家新創表示將在下個月導入客服與文件摘要服務。')
+ARTICLE_REWRITE = ('OpenAI 今天發表新一代語言模型，推理能力大幅提升，並同步開放企業 API 試用，'
+                   '台灣多家新創表示將在下月導入客服與文件摘要等服務。')
+UNRELATED = [
+    '台積電公布第三季財報，先進製程營收占比再創新高，法人預估明年資本支出持續成長。',
+    'Apple releases a new MacBook with an M-series chip and longer battery life for creators.',
+    '經濟部推出中小企業數位轉型補助，最高補助五十萬元，即日起受理線上申請。',
+]
+
+
+def _news(source, title, content='', link='', score=50):
+    link = link or f"https://{source}.example.com/{hashlib.md5(title.encode('utf-8')).hexdigest()[:8]}"
+    return {'source': source, 'source_label': source.upper(), 'title': title, 'content': content,
+            'link': link, 'relevance_score': score}
+
+
+def test_strips_tracking_params():
+    link = 'https://www.example.com/a/?utm_source=x&UTM_Medium=y&fbclid=1&ref=hn&source=rss&mc_eid=2#top'
+    assert canonical_link(link) == 'example.com/a'
+
+
+def test_keeps_params_that_only_share_a_prefix():
+    link = 'https://example.com/a?reference=42&sourceid=7&gclidx=1&id=3'
+    assert canonical_link(link) == 'example.com/a?gclidx=1&id=3&reference=42&sourceid=7'
+
+
+def test_minhash_is_deterministic_and_order_independent():
+    shingles = [f"w{i} w{i + 1}" for i in range(50)]
+    signature = minhash_signature(shingles)
+    assert len(signature) == news_dedup.NUM_PERM
+    assert minhash_signature(reversed(shingles)) == signature
+    assert minhash_signature([]) == news_dedup._EMPTY_SIGNATURE
+
+
+@pytest.mark.parametrize('overlap', [0, 100, 200, 300])
+def test_minhash_estimates_jaccard(overlap):
+    a = {f"a{i}" for i in range(400)}
+    b = {f"a{i}" for i in range(overlap)} | {f"b{i}" for i in range(400 - overlap)}
+    jaccard = len(a & b) / len(a | b)
+    estimate = news_dedup._similarity(minhash_signature(a), minhash_signature(b))
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_lsh_only_compares_candidates_sharing_a_band(monkeypatch):
+    compared = []
+    similarity = news_dedup._similarity
+    monkeypatch.setattr(news_dedup, '_similarity', lambda a, b: compared.append((a, b)) or similarity(a, b))
+    items = [_news('technews', ARTICLE), _news('ithome', ARTICLE_REWRITE)] + [_news('inside', t) for t in UNRELATED]
+    assert cluster_duplicates(items) == [[0, 1], [2], [3], [4]]
+    assert len(compared) == 1
+
+
+def test_threshold_controls_merging(monkeypatch):
+    items = [_news('technews', ARTICLE), _news('ithome', ARTICLE_REWRITE)]
+    assert cluster_duplicates(items) == [[0, 1]]
+    monkeypatch.setattr(news_dedup, 'SIMILARITY_THRESHOLD', 1.01)
+    assert cluster_duplicates(items) == [[0], [1]]
+
+
+def test_same_body_under_different_titles_merges():
+    items = [_news('technews', 'OpenAI 發表新模型', ARTICLE), _news('bbc', 'OpenAI unveils its next model', ARTICLE),
+             _news('inside', '台積電財報', UNRELATED[0])]
+    assert cluster_duplicates(items) == [[0, 1], [2]]
+
+
+def test_same_canonical_link_merges_without_similar_text():
+    items = [_news('technews', UNRELATED[0], link='https://www.example.com/a/?utm_source=rss'),
+             _news('inside', UNRELATED[1], link='http://example.com/a')]
+    assert cluster_duplicates(items) == [[0, 1]]
+
+
+def test_dedupe_keeps_highest_score_and_lists_other_sources():
+    items = [
+        _news('inside', UNRELATED[0], score=40),
+        _news('technews', ARTICLE, score=60),
+        _news('bbc', 'Completely different story about football results in Europe this weekend.', score=30),
+        _news('ithome', ARTICLE_REWRITE, score=80),
+        _news('technews', UNRELATED[2], score=70),
+    ]
+    result = dedupe_news(items)
+    assert [r['title'] for r in result] == [UNRELATED[0], items[2]['title'], ARTICLE_REWRITE, UNRELATED[2]]
+    merged = result[2]
+    assert merged['source'] == 'ithome'
+    assert merged['also_reported_by'] == ['technews']
+    assert merged['duplicates'] == [{'source': 'technews', 'source_label': 'TECHNEWS',
+                                     'title': ARTICLE, 'link': items[1]['link']}]
+    assert all('duplicates' not in r for r in result if r is not merged)
+
+
+def test_dedupe_leaves_unrelated_items_untouched():
+    items = [_news('inside', t, score=s) for t, s in zip(UNRELATED, (10, 90, 50))]
+    assert dedupe_news(items) == items
@@ -0,0 +1,75 @@
+"""
+score_batch 與 calculate_relevance 的一致性
+固定語料在 pyahocorasick 與 regex 兩種比對後端下都必須逐則得到相同分數
+"""
+
+import random
+
+import pytest
+
+import news_filter
+from keyword_matcher import KeywordMatcher
+from filter_config import (
+    SOURCES, TAIWAN_INTERESTS, GLOBAL_TAIWAN_FOCUS,
+    MUST_KEEP_PHRASES, PRACTICAL_KEYWORDS,
+)
+
+
+def _corpus():
+    """以固定種子組出涵蓋各評分規則的新聞"""
+    rng = random.Random(20260216)
+    sources = sorted(SOURCES) + ['unknown', 'no-such-source']
+    keywords = sorted({kw for cfg in SOURCES.values()
+                       for kw in cfg.get('priority_keywords', []) + cfg.get('exclude', [])})
+    keywords += TAIWAN_INTERESTS + GLOBAL_TAIWAN_FOCUS + PRACTICAL_KEYWORDS
+    keywords += ['國際', 'Global', 'Taiwan', 'asia', 'AIAI', '台積電台積電']
+    filler = ['今天', 'update', '發表', 'model', '，', ' ', 'the', '新版']
+
+    def text(n):
+        return ''.join(rng.choice(keywords) if rng.random() < 0.4 else rng.choice(filler)
+                       for _ in range(n))
+
+    items = []
+    for source in sources:
+        for n in (0, 3, 12, 60, 200):
+            items.append({'source': source, 'title': text(min(n, 8)), 'content': text(n)})
+        items.append({'source': source, 'title': MUST_KEEP_PHRASES[0], 'content': ''})
+        items.append({'source': source, 'title': '無關標題', 'content': MUST_KEEP_PHRASES[-1].upper()})
+        items.append({'source': source, 'title': '', 'content': 'x' * 301})
+        items.append({'source': source, 'title': '', 'content': 'x' * 501})
+        excluded = SOURCES.get(source, {}).get('exclude', [])
+        if excluded:
+            items.append({'source': source, 'title': ' '.join(excluded), 'content': ' '.join(excluded * 3)})
+    items.append({'title': 'AI 工具 教學'})
+    items.append({})
+    return items
+
+
+CORPUS = _corpus()
+
+
+@pytest.fixture(params=['ahocorasick', 'regex'])
+def backend(request, monkeypatch):
+    if request.param == 'ahocorasick':
+        pytest.importorskip('ahocorasick')
+        matcher = news_filter.build_relevance_matcher()
+        assert matcher._automaton is not None
+    else:
+        monkeypatch.setattr(KeywordMatcher, '_build_automaton', staticmethod(lambda keywords: None))
+        matcher = news_filter.build_relevance_matcher()
+        assert matcher._automaton is None
+    monkeypatch.setattr(news_filter, 'RELEVANCE_MATCHER', matcher)
+    monkeypatch.setattr(news_filter, '_SOURCE_PROFILES', {})
+    return request.param
+
+
+def test_score_batch_matches_calculate_relevance(backend):
+    expected = [news_filter.calculate_relevance(item) for item in CORPUS]
+    assert news_filter.score_batch(CORPUS) == expected
+
+
+def test_corpus_exercises_scoring_rules(backend):
+    scores = news_filter.score_batch(CORPUS)
+    assert 100 in scores
+    assert any(s < 0 for s in scores)
+    assert len(set(scores)) > 20
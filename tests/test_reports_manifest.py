@@ -0,0 +1,77 @@
+"""
+reports_manifest：讀取清單時與磁碟比對，手動搬移 / 刪除 / 新增的日報會觸發增量重建；
+路徑一律以 repo 根目錄為基準，與目前工作目錄無關
+"""
+
+import pytest
+
+import reports_manifest
+from reports_manifest import load_manifest, list_reports, rebuild_manifest
+
+@pytest.fixture
+def site(repo_manifest, write_page, tmp_path, monkeypatch):
+    write_page(tmp_path / 'archive' / '2026-02-14.html', '2026-02-14')
+    write_page(tmp_path / '2026-02-15.html', '2026-02-15')
+    rebuild_manifest(repo_manifest)
+    monkeypatch.chdir(tmp_path / 'archive')
+    monkeypatch.setattr(reports_manifest, '_reconciled', set())    # 模擬新的 process
+    return repo_manifest
+
+
+def test_unchanged_manifest_is_not_rebuilt(site, monkeypatch):
+    monkeypatch.setattr(reports_manifest, 'rebuild_manifest', lambda path: pytest.fail('rebuilt'))
+    assert [r['path'] for r in list_reports(path=site)] == ['2026-02-15.html', 'archive/2026-02-14.html']
+
+
+def test_reconciles_only_once_per_process(site, monkeypatch):
+    load_manifest(site)
+    monkeypatch.setattr(reports_manifest, '_stale_reason', lambda manifest: pytest.fail('stat again'))
+    for _ in range(3):
+        assert len(list_reports(path=site)) == 2
+
+
+def test_page_moved_into_archive(site):
+    (site.parent / '2026-02-15.html').rename(site.parent / 'archive' / '2026-02-15.html')
+    assert ([r['path'] for r in list_reports('archive', path=site)]
+            == ['archive/2026-02-15.html', 'archive/2026-02-14.html'])
+    assert list_reports('root', path=site) == []
+
+
+def test_page_added_to_archive(site, write_page):
+    write_page(site.parent / 'archive' / '2026-02-13.html', '2026-02-13')
+    assert 'archive/2026-02-13.html' in [r['path'] for r in load_manifest(site)['reports']]
+
+
+def test_page_edited_in_place(site, write_page):
+    write_page(site.parent / '2026-02-15.html', '2026-02-15 修訂版')
+    entry = next(r for r in load_manifest(site)['reports'] if r['path'] == '2026-02-15.html')
+    assert entry['title'] == '2026-02-15 修訂版 AI 科技日報'
+
+
+def test_empty_repo_does_not_write_manifest(repo_manifest):
+    assert load_manifest(repo_manifest)['reports'] == []
+    assert not repo_manifest.exists()
+
+
+def test_head_parser_stops_at_end_of_head():
+    chunks = iter([b'<html><head><title>2026-02-15 AI \xe7\xa7\x91\xe6\x8a\x80',
+                   b'\xe6\x97\xa5\xe5\xa0\xb1 | Thinker News</title>',
+                   '<meta name="description" content="今日摘要"></head>'.encode('utf-8'),
+                   b'<body>never read</body>'])
+    metadata = reports_manifest.extract_metadata(chunks)
+    assert metadata['title'] == '2026-02-15 AI 科技日報'
+    assert metadata['description'] == '今日摘要'
+    assert next(chunks) == b'<body>never read</body>'
+
+
+def test_rebuild_reparses_only_changed_files(site, write_page, monkeypatch):
+    parsed = []
+    read_head = reports_manifest.read_head_metadata
+    monkeypatch.setattr(reports_manifest, 'read_head_metadata',
+                        lambda path: parsed.append(path.name) or read_head(path))
+    rebuild_manifest(site)
+    assert parsed == []
+
+    write_page(site.parent / '2026-02-15.html', '2026-02-15 修訂版')
+    rebuild_manifest(site)
+    assert parsed == ['2026-02-15.html']
@@ -0,0 +1,66 @@
+"""rss_feed：既有項目原樣沿用，只為新的日報建立 <item>，並截到 MAX_ITEMS"""
+
+from xml.etree import ElementTree
+
+import pytest
+
+import rss_feed
+
+
+def _report(day, title=None):
+    date = f"2026-03-{day:02d}"
+    return {'date': date, 'path': f"archive/{date}.html", 'title': title or f"{date} 日報",
+            'description': f"{date} 摘要", 'url': f"{rss_feed.SITE_URL}/archive/{date}.html"}
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reports = []
+    monkeypatch.setattr(rss_feed, 'latest_per_date', lambda: sorted(reports, key=lambda r: r['date'], reverse=True))
+    return tmp_path / 'feed.xml', reports
+
+
+def _items(path):
+    return ElementTree.parse(path).getroot().find('channel').findall('item')
+
+
+def _mark_items(path):
+    """在既有項目加上標記，之後沿用的項目會保留它"""
+    tree = ElementTree.parse(path)
+    for item in tree.getroot().iter('item'):
+        ElementTree.SubElement(item, 'comments').text = 'kept'
+    tree.write(path, encoding='utf-8', xml_declaration=True)
+
+
+def test_new_report_adds_one_item_and_keeps_the_rest(feed):
+    path, reports = feed
+    reports += [_report(1), _report(2)]
+    rss_feed.generate_rss_feed(path)
+    _mark_items(path)
+
+    reports.append(_report(3))
+    rss_feed.generate_rss_feed(path)
+    items = _items(path)
+    assert [i.findtext('title') for i in items] == ['2026-03-03 日報', '2026-03-02 日報', '2026-03-01 日報']
+    assert [i.findtext('comments') for i in items] == [None, 'kept', 'kept']
+
+
+def test_changed_report_is_rebuilt(feed):
+    path, reports = feed
+    reports += [_report(1), _report(2)]
+    rss_feed.generate_rss_feed(path)
+    _mark_items(path)
+
+    reports[1] = _report(2, title='修訂版')
+    rss_feed.generate_rss_feed(path)
+    assert [(i.findtext('title'), i.findtext('comments')) for i in _items(path)] == [('修訂版', None), ('2026-03-01 日報', 'kept')]
+
+
+def test_feed_is_trimmed_to_max_items(feed, monkeypatch):
+    path, reports = feed
+    monkeypatch.setattr(rss_feed, 'MAX_ITEMS', 3)
+    for day in range(1, 6):
+        reports.append(_report(day))
+        rss_feed.generate_rss_feed(path)
+    assert [i.findtext('title')[:10] for i in _items(path)] == ['2026-03-05', '2026-03-04', '2026-03-03']
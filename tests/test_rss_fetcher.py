@@ -0,0 +1,155 @@
+"""
+rss_fetcher asyncio 模式：以本機 aiohttp 替身伺服器驗證
+200 / 304 條件式 GET / 5xx 後重試 / 單一來源期限
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+import rss_fetcher
+from feed_cache import FeedCache
+
+FEED_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>stand-in</title>
+<item><title>First</title><link>https://example.com/1</link><description>one</description>
+<pubDate>Mon, 16 Feb 2026 08:00:00 GMT</pubDate></item>
+<item><title>Second</title><link>https://example.com/2</link><description>two</description>
+<pubDate>Mon, 16 Feb 2026 09:00:00 GMT</pubDate></item>
+</channel></rss>"""
+ETAG = '"v1"'
+
+
+class StandIn:
+    """替身伺服器：記錄每條路徑收到的請求"""
+
+    def __init__(self):
+        self.requests = {}
+
+    def record(self, request):
+        self.requests.setdefault(request.path, []).append(dict(request.headers))
+        return len(self.requests[request.path])
+
+    async def ok(self, request):
+        self.record(request)
+        return web.Response(body=FEED_XML, content_type="application/rss+xml")
+
+    async def etag(self, request):
+        self.record(request)
+        if request.headers.get("If-None-Match") == ETAG:
+            return web.Response(status=304, headers={"ETag": ETAG})
+        return web.Response(body=FEED_XML, content_type="application/rss+xml", headers={"ETag": ETAG})
+
+    async def flaky(self, request):
+        if self.record(request) == 1:
+            return web.Response(status=503)
+        return web.Response(body=FEED_XML, content_type="application/rss+xml")
+
+    async def slow(self, request):
+        self.record(request)
+        await asyncio.sleep(2)
+        return web.Response(body=FEED_XML, content_type="application/rss+xml")
+
+
+async def _with_server(stand_in, run):
+    app = web.Application()
+    for path in ("ok", "etag", "flaky", "slow"):
+        app.router.add_get(f"/{path}", getattr(stand_in, path))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await run(f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rss_fetcher, "_backoff_delay", lambda attempt: 0.0)
+
+
+def test_fetch_200():
+    stand_in = StandIn()
+
+    async def run(base):
+        return await rss_fetcher.fetch_feeds_async({"s0": {"url": f"{base}/ok"}})
+
+    results = asyncio.run(_with_server(stand_in, run))
+    items = rss_fetcher.normalize_entries("s0", results["s0"])
+    assert [item["title"] for item in items] == ["First", "Second"]
+    assert items[0]["source"] == "s0"
+    assert items[0]["isoDate"] == "2026-02-16T08:00:00"
+    assert len(stand_in.requests["/ok"]) == 1
+
+
+def test_fetch_304_reuses_cached_entries(tmp_path):
+    stand_in = StandIn()
+    cache = FeedCache(tmp_path / "feed_cache")
+
+    async def run(base):
+        sources = {"s0": {"url": f"{base}/etag"}}
+        first = await rss_fetcher.fetch_feeds_async(sources, cache=cache)
+        second = await rss_fetcher.fetch_feeds_async(sources, cache=FeedCache(tmp_path / "feed_cache"))
+        return first, second
+
+    first, second = asyncio.run(_with_server(stand_in, run))
+    assert (rss_fetcher.normalize_entries("s0", second["s0"])
+            == rss_fetcher.normalize_entries("s0", first["s0"]))
+    sent = stand_in.requests["/etag"]
+    assert "If-None-Match" not in sent[0]
+    assert sent[1]["If-None-Match"] == ETAG
+
+
+def test_fetch_5xx_then_retry():
+    stand_in = StandIn()
+
+    async def run(base):
+        return await rss_fetcher.fetch_feeds_async({"s0": {"url": f"{base}/flaky"}})
+
+    results = asyncio.run(_with_server(stand_in, run))
+    assert len(results["s0"]) == 2
+    assert len(stand_in.requests["/flaky"]) == 2
+
+
+def test_per_source_deadline():
+    stand_in = StandIn()
+
+    async def run(base):
+        async with aiohttp.ClientSession() as session:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                started = time.perf_counter()
+                items = await rss_fetcher.fetch_single_feed_async(
+                    session, "s0", f"{base}/slow", executor, deadline_secs=0.5)
+                return items, time.perf_counter() - started
+
+    items, elapsed = asyncio.run(_with_server(stand_in, run))
+    assert items == []
+    assert elapsed < 2.0
+
+
+def test_only_new_entries_are_normalized(tmp_path, monkeypatch):
+    from entry_store import EntryStore
+
+    entries = rss_fetcher.parse_feed_entries("s0", FEED_XML)
+    normalized = []
+    original = rss_fetcher._normalize_entry
+    monkeypatch.setattr(rss_fetcher, "_normalize_entry",
+                        lambda entry, source: normalized.append(entry) or original(entry, source))
+
+    with EntryStore(tmp_path / "entries.sqlite3") as store:
+        first = rss_fetcher._ingest_new_entries({"s0": entries}, store, "2026-02-17")
+        assert len(first["s0"]) == 2 and len(normalized) == 2
+
+        normalized.clear()
+        changed = rss_fetcher.parse_feed_entries("s0", FEED_XML.replace(b"<description>two", b"<description>2"))
+        second = rss_fetcher._ingest_new_entries({"s0": changed}, store, "2026-02-17")
+        assert [item["title"] for item in second["s0"]] == ["Second"]
+        assert len(normalized) == 1
@@ -0,0 +1,109 @@
+"""
+search_index：查詢時才建立索引的路徑不得留下空的索引或清單；
+add_report 只改寫增量分段，合併後結果與整份重建相同；查詢片段取自索引內保存的本文；
+CJK 單字查詢命中該字出現在詞中任何位置的日報
+"""
+
+import os
+
+import pytest
+
+import reports_manifest
+import search_index
+from reports_manifest import record_report
+
+
+def test_lazy_query_on_empty_repo_persists_nothing(repo_manifest, tmp_path, monkeypatch):
+    monkeypatch.setattr(reports_manifest, 'MANIFEST_PATH', repo_manifest)
+    index_path = tmp_path / 'data' / 'search' / 'index.bin'
+    monkeypatch.chdir(tmp_path)
+
+    assert search_index.search('輝達', path=index_path) == []
+    assert not index_path.exists()
+    assert not repo_manifest.exists()
+
+
+def test_lazy_query_builds_index_from_repo_root(repo_manifest, write_page, tmp_path, monkeypatch):
+    write_page(tmp_path / 'archive' / '2026-02-14.html', '2026-02-14', '<p>輝達公布財報</p>')
+    index_path = tmp_path / 'data' / 'search' / 'index.bin'
+    index_path.parent.mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / 'data')
+
+    hits = search_index.search('輝達', path=index_path)
+    assert [h['date'] for h in hits] == ['2026-02-14']
+    assert repo_manifest.exists()
+
+
+BODIES = ['輝達公布財報 營收創新高', '台積電法說會 AI 需求強勁', 'OpenAI 發表新模型 輝達股價上漲',
+          '資安公司示警 勒索軟體', 'Apple 推出新款 MacBook 晶片']
+
+
+@pytest.fixture
+def publish(repo_manifest, write_page, tmp_path):
+    """寫出 2026-03-<day> 的日報並以 add_report 加入索引"""
+    index_path = tmp_path / 'index.bin'
+
+    def publish(day, body):
+        page = tmp_path / 'archive' / f'2026-03-{day:02d}.html'
+        html = write_page(page, page.stem, f'<p>{body}</p>')
+        search_index.add_report(record_report(page, html, path=repo_manifest), html, index_path)
+
+    return index_path, publish
+
+
+def _results(query, path):
+    return [(h['date'], h['score'], h['snippet']) for h in search_index.search(query, k=10, path=path)]
+
+
+def test_add_report_only_rewrites_the_delta(publish):
+    index_path, publish = publish
+    publish(1, BODIES[0])
+    base = os.stat(index_path)
+    for day in range(2, 2 + search_index.DELTA_MAX_DOCS):
+        publish(day, BODIES[day % len(BODIES)])
+        assert os.stat(index_path).st_mtime_ns == base.st_mtime_ns
+        assert search_index.delta_path(index_path).exists()
+
+    publish(2 + search_index.DELTA_MAX_DOCS, BODIES[0])        # 增量分段超過上限 → 合併
+    assert os.stat(index_path).st_mtime_ns != base.st_mtime_ns
+    assert not search_index.delta_path(index_path).exists()
+
+
+@pytest.mark.parametrize('days', [8, search_index.DELTA_MAX_DOCS + 4])
+def test_incremental_index_matches_full_rebuild(publish, tmp_path, days):
+    index_path, publish = publish
+    for day in range(1, days + 1):
+        publish(day, BODIES[day % len(BODIES)] + f' 第{day}天')
+    publish(1, '台積電 修訂版')                                # 重新產生主索引中的一天
+    publish(days, '輝達 修訂版')                               # 重新產生增量分段中的一天
+
+    rebuilt = tmp_path / 'rebuilt.bin'
+    assert search_index.build_index(rebuilt) == days
+    for query in ('輝達', '台積電 AI', 'macbook', '修訂', '輝'):
+        assert _results(query, index_path) == _results(query, rebuilt)
+
+
+def test_snippet_comes_from_the_index(publish, tmp_path):
+    index_path, publish = publish
+    publish(1, '開頭的介紹文字。' * 5 + '輝達公布財報，營收創新高')
+    (tmp_path / 'archive' / '2026-03-01.html').unlink()         # 查詢不再讀取頁面
+    [hit] = search_index.search('財報', path=index_path)
+    assert '輝達公布財報' in hit['snippet']
+    assert hit['snippet'].startswith('…')
+
+
+def test_old_format_index_is_rebuilt(publish):
+    index_path, publish = publish
+    publish(1, BODIES[0])
+    data = bytearray(index_path.read_bytes())
+    data[4:8] = (1).to_bytes(4, 'little')                       # 舊版格式
+    index_path.write_bytes(bytes(data))
+    assert [h['date'] for h in search_index.search('輝達', path=index_path)] == ['2026-03-01']
+
+
+def test_single_cjk_character_matches_any_position(publish):
+    index_path, publish = publish
+    for day, body in enumerate(BODIES, start=1):
+        publish(day, body)
+    assert {h['date'] for h in search_index.search('達', path=index_path)} == {'2026-03-01', '2026-03-03'}
+    assert [h['date'] for h in search_index.search('勒', path=index_path)] == ['2026-03-04']
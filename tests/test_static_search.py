@@ -0,0 +1,120 @@
+"""static_search：既有分片永不改寫；分段依層級合併；重新產生的日報以新 doc_id 取代舊的；
+thinker_search.js 的排序與 search_index.search 一致（需要 node）"""
+
+import hashlib
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import search_index
+import static_search
+from reports_manifest import record_report
+
+PAGE = '<html><head><title>{date}</title></head><body><p>{body}</p></body></html>'
+
+
+@pytest.fixture
+def repo(repo_manifest, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path, repo_manifest
+
+
+def _publish(repo, day, body):
+    root, manifest = repo
+    page = root / 'archive' / f'2026-03-{day:02d}.html'
+    page.parent.mkdir(exist_ok=True)
+    html = PAGE.format(date=page.stem, body=body)
+    page.write_text(html, encoding='utf-8')
+    search_index.add_report(record_report(page, html, path=manifest), html, root / 'index.bin')
+    return static_search.build_static_search(root / 'search', root / 'index.bin')
+
+
+def _shards(root):
+    return {p.name: hashlib.sha256(p.read_bytes()).hexdigest() for p in (root / 'search').glob('seg-*.json')}
+
+
+def _postings(root, term):
+    meta = json.loads((root / 'search' / 'meta.json').read_text(encoding='utf-8'))
+    found = []
+    for seg in meta['segments']:
+        key = static_search.shard_key(term, seg['shard_count'])
+        if key in seg['shards']:
+            data = json.loads((root / 'search' / static_search._segment_file(seg, key)).read_text(encoding='utf-8'))
+            found += data.get(term, [])[::2]
+    return meta, found
+
+
+def test_existing_shards_are_never_rewritten(repo):
+    root, _ = repo
+    for day in range(1, 2 * static_search.SEGMENT_FANOUT + 2):
+        before = _shards(root)
+        result = _publish(repo, day, f'輝達 第{day}天 report{day}')
+        after = _shards(root)
+        assert all(after[name] == digest for name, digest in before.items() if name in after)
+        assert result['added'] == 1
+
+    meta, found = _postings(root, '輝達')
+    assert len(meta['segments']) == 3       # 兩個合併後的 8 篇分段 + 最新一篇
+    assert [s['shard_count'] for s in meta['segments']] == [8, 8, 1]
+    assert found == list(range(2 * static_search.SEGMENT_FANOUT + 1))
+
+
+def test_regenerated_report_replaces_old_doc(repo):
+    root, _ = repo
+    for day in range(1, static_search.SEGMENT_FANOUT):
+        _publish(repo, day, f'輝達 report{day}')
+    result = _publish(repo, 1, '台積電 修訂版')
+    assert (result['added'], result['removed']) == (1, 1)
+
+    meta, found = _postings(root, '輝達')
+    assert meta['docs'][0] is None
+    assert meta['live_docs'] == static_search.SEGMENT_FANOUT - 1
+    assert 0 not in found                   # 合併時丟掉已刪除文件的 posting
+    assert _postings(root, '台積')[1] == [static_search.SEGMENT_FANOUT - 1]
+
+
+NODE_SEARCH = r"""
+const fs = require('fs');
+const path = require('path');
+const [script, baseDir, ...queries] = process.argv.slice(2);
+global.window = {};
+global.document = { readyState: 'complete', getElementById: () => null };
+global.fetch = async (url) => {
+    const file = path.join(baseDir, path.basename(url.split('?')[0]));
+    if (!fs.existsSync(file)) return { ok: false, status: 404 };
+    return { ok: true, json: async () => JSON.parse(fs.readFileSync(file, 'utf8')) };
+};
+const ThinkerSearch = require(script);
+(async () => {
+    const search = new ThinkerSearch({ baseUrl: './search/', maxResults: 10 });
+    const results = {};
+    for (const q of queries) results[q] = (await search.search(q)).map((r) => [r.date, r.score]);
+    console.log(JSON.stringify(results));
+})();
+"""
+
+
+def test_browser_search_matches_python(repo, tmp_path):
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('需要 node 才能執行 thinker_search.js')
+    bodies = ['輝達公布財報', '台積電與輝達合作', '財報季 英特爾虧損', '發達國家 AI 政策', 'OpenAI 發表新模型']
+    for day, body in enumerate(bodies * 2, start=1):
+        _publish(repo, day, body)
+    _publish(repo, 3, '修訂版 輝達 財報')
+
+    queries = ['達', '輝', '財報', 'openai', '輝達 財報', '國']
+    script = Path(__file__).parent.parent / 'thinker_search.js'
+    runner = tmp_path / 'run.js'
+    runner.write_text(NODE_SEARCH, encoding='utf-8')
+    out = subprocess.run([node, str(runner), str(script), str(tmp_path / 'search'), *queries],
+                         capture_output=True, text=True, check=True).stdout
+    browser = json.loads(out)
+    for query in queries:
+        expected = [(h['date'], h['score']) for h in search_index.search(query, k=10, path=tmp_path / 'index.bin')]
+        assert [d for d, _ in browser[query]] == [d for d, _ in expected], query
+        assert [s for _, s in browser[query]] == pytest.approx([s for _, s in expected], rel=1e-3), query
+    assert {d for d, _ in browser['達']} >= {'2026-03-01', '2026-03-02', '2026-03-04'}   # 詞尾的字也命中
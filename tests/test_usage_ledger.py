@@ -0,0 +1,72 @@
+"""usage_ledger：每日 rollup 累加多次執行、彙總與成本計算、報表期間涵蓋 archive/ 與根目錄的日報"""
+
+import json
+
+import pytest
+
+from usage_ledger import (
+    call_cost, summarize_calls, write_daily_rollup, load_rollups, build_report, report_period,
+)
+
+
+def _call(step, status='success', cost=0.01, latency=1.0, **extra):
+    return {'step': step, 'status': status, 'prompt_tokens': 1000, 'cached_prompt_tokens': 200,
+            'completion_tokens': 100, 'cost_usd': cost, 'latency_secs': latency, **extra}
+
+
+def _run(execution_id, calls, status='success'):
+    return {'execution_id': execution_id, 'status': status, 'llm_calls': calls}
+
+
+def test_call_cost_uses_cached_input_price():
+    # gpt-4.1: (800 × 2.00 + 200 × 0.50 + 100 × 8.00) / 1e6
+    assert call_cost('gpt-4.1', 1000, 200, 100) == pytest.approx(0.0025)
+    assert call_cost('unknown-model', 1000, 0, 100) is None
+    assert call_cost('gpt-4.1', None, None, None) is None
+
+
+def test_summarize_calls_groups_by_stage():
+    summary = summarize_calls([
+        _call('數據煉金術師', cost=0.02, latency=3.0),
+        _call('數據煉金術師', status='error', cost=None, attempt=2, fallback=True),
+        _call('總編輯', response_cached=True, cost=0.0),
+    ])
+    assert summary['totals']['calls'] == 3
+    assert summary['totals']['cost_usd'] == pytest.approx(0.02)
+    alchemist = summary['stages']['數據煉金術師']
+    assert (alchemist['calls'], alchemist['errors'], alchemist['retries'], alchemist['fallbacks']) == (2, 1, 1, 1)
+    assert alchemist['latency_secs'] == pytest.approx(4.0)
+    assert summary['stages']['總編輯']['response_cache_hits'] == 1
+
+
+def test_rollup_appends_runs_and_replaces_same_execution(tmp_path):
+    write_daily_rollup('2026-03-01', _run('a', [_call('總編輯')]), usage_dir=tmp_path)
+    write_daily_rollup('2026-03-01', _run('b', [_call('總編輯'), _call('HTML 生成器')]), usage_dir=tmp_path)
+    write_daily_rollup('2026-03-01', _run('b', [_call('總編輯')], status='error'), usage_dir=tmp_path)
+
+    rollup = json.loads((tmp_path / '2026-03-01.json').read_text(encoding='utf-8'))
+    assert [(r['execution_id'], r['status']) for r in rollup['runs']] == [('a', 'success'), ('b', 'error')]
+    assert rollup['day']['totals']['calls'] == 2
+    assert rollup['day']['totals']['cost_usd'] == pytest.approx(0.02)
+
+
+def test_report_covers_requested_days(tmp_path):
+    for date, cost in (('2026-03-01', 0.01), ('2026-03-02', 0.03), ('2026-03-03', 0.05)):
+        write_daily_rollup(date, _run(date, [_call('總編輯', cost=cost), _call('HTML 生成器', cost=cost)]),
+                           usage_dir=tmp_path)
+    report = build_report(load_rollups(tmp_path, start='2026-03-02', end='2026-03-03'))
+    assert [d['date'] for d in report['days']] == ['2026-03-02', '2026-03-03']
+    assert report['totals']['cost_usd'] == pytest.approx(0.16)
+    assert report['avg_cost_per_day'] == pytest.approx(0.08)
+    assert report['stages']['總編輯']['cost_share'] == pytest.approx(0.5)
+
+
+def test_report_period_includes_root_pages(repo_manifest, write_page, tmp_path):
+    write_page(tmp_path / 'archive' / '2026-02-10.html', '2026-02-10')
+    write_page(tmp_path / 'archive' / '2026-02-14.html', '2026-02-14')
+    write_page(tmp_path / '2026-02-15.html', '2026-02-15')
+    assert report_period(repo_manifest) == ('2026-02-10', '2026-02-15')
+
+
+def test_report_period_without_reports(repo_manifest):
+    assert report_period(repo_manifest) == (None, None)
@@ -0,0 +1,190 @@
+/**
+ * Thinker News 站內搜尋
+ * 讀取 scripts/static_search.py 產生的 search/ 分片，每個分段只下載查詢詞所在的分片
+ * 切詞與排序規則與 scripts/search_index.py 相同（CJK bigram + 英數單字，BM25）；
+ * 索引另含每個 CJK 字的 unigram，單字查詢直接查該字，與 search_index.py 的結果一致
+ */
+
+class ThinkerSearch {
+    constructor(options = {}) {
+        this.baseUrl = options.baseUrl || './search/';
+        this.maxResults = options.maxResults || 10;
+        this.meta = null;
+        this.shards = new Map();   // 分片檔名 → Promise<{詞: [doc_id, tf, ...]}>
+        this.init();
+    }
+
+    init() {
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', () => this.bindForm());
+        } else {
+            this.bindForm();
+        }
+    }
+
+    bindForm() {
+        const form = document.getElementById('thinkerSearchForm');
+        const input = document.getElementById('thinkerSearchInput');
+        if (!form || !input) {
+            return;
+        }
+
+        form.addEventListener('submit', (e) => {
+            e.preventDefault();
+            this.run(input.value);
+        });
+    }
+
+    // 與 search_index.tokenize 相同：NFKC + 小寫；CJK 連續字串切 bigram，英數以單字為單位
+    static tokenize(text) {
+        const tokens = [];
+        const normalized = text.normalize('NFKC').toLowerCase();
+        const pattern = /[㐀-䶿一-鿿豈-﫿]+|[a-z0-9]+/g;
+        const cjk = /^[㐀-䶿一-鿿豈-﫿]/;
+        let match;
+        while ((match = pattern.exec(normalized)) !== null) {
+            const run = match[0];
+            if (cjk.test(run)) {
+                if (run.length === 1) {
+                    tokens.push(run);
+                } else {
+                    for (let i = 0; i < run.length - 1; i++) {
+                        tokens.push(run.slice(i, i + 2));
+                    }
+                }
+            } else if (run.length > 1 || /^[0-9]$/.test(run)) {
+                tokens.push(run);
+            }
+        }
+        return [...new Set(tokens)];
+    }
+
+    // 與 static_search.shard_key 相同：第一個字元碼位 % 該分段的分片數
+    static shardKey(term, shardCount) {
+        return (term.codePointAt(0) % shardCount).toString(16).padStart(2, '0');
+    }
+
+    async loadMeta() {
+        if (!this.meta) {
+            const resp = await fetch(this.baseUrl + 'meta.json', { cache: 'no-cache' });
+            if (!resp.ok) {
+                throw new Error(`meta.json ${resp.status}`);
+            }
+            this.meta = await resp.json();
+        }
+        return this.meta;
+    }
+
+    // 分段寫出後不再修改，同一檔名在頁面存活期間只下載一次
+    loadShard(segment, key) {
+        const hash = segment.shards[key];
+        if (!hash) {
+            return Promise.resolve({});
+        }
+        const file = `seg-${segment.lo}-${segment.hi}-${key}.json`;
+        if (!this.shards.has(file)) {
+            this.shards.set(file, fetch(`${this.baseUrl}${file}?v=${hash}`).then((resp) => (resp.ok ? resp.json() : {})));
+        }
+        return this.shards.get(file);
+    }
+
+    // 查詢詞在各分段的分片（分段的 doc_id 範圍互不重疊）
+    loadTermShards(token) {
+        return Promise.all(this.meta.segments.map(
+            (segment) => this.loadShard(segment, ThinkerSearch.shardKey(token, segment.shard_count))));
+    }
+
+    async search(query) {
+        const meta = await this.loadMeta();
+        const tokens = ThinkerSearch.tokenize(query);
+        const termShards = await Promise.all(tokens.map((t) => this.loadTermShards(t)));
+
+        const scores = new Map();
+        tokens.forEach((token, n) => {
+            const tfs = new Map();
+            for (const shard of termShards[n]) {
+                const plist = Object.prototype.hasOwnProperty.call(shard, token) ? shard[token] : [];
+                for (let i = 0; i < plist.length; i += 2) {
+                    if (meta.docs[plist[i]]) {
+                        tfs.set(plist[i], plist[i + 1]);
+                    }
+                }
+            }
+            if (tfs.size === 0) {
+                return;
+            }
+            const idf = Math.log(1 + (meta.live_docs - tfs.size + 0.5) / (tfs.size + 0.5));
+            for (const [docId, tf] of tfs) {
+                const length = meta.docs[docId][3];
+                const norm = meta.k1 * (1 - meta.b + meta.b * length / (meta.avg_length || 1));
+                scores.set(docId, (scores.get(docId) || 0) + idf * tf * (meta.k1 + 1) / (tf + norm));
+            }
+        });
+
+        return [...scores.entries()]
+            .sort((a, b) => b[1] - a[1] || b[0] - a[0])
+            .slice(0, this.maxResults)
+            .map(([docId, score]) => {
+                const [date, path, title] = meta.docs[docId];
+                return { date, path, title: title || `${date} AI 科技日報`, score };
+            });
+    }
+
+    async run(query) {
+        const container = document.getElementById('thinkerSearchResults');
+        if (!container) {
+            return;
+        }
+        if (!query.trim()) {
+            container.innerHTML = '';
+            return;
+        }
+
+        container.textContent = '🔎 搜尋中…';
+        try {
+            const results = await this.search(query);
+            container.innerHTML = '';
+            if (results.length === 0) {
+                container.textContent = `找不到與「${query}」相關的日報`;
+                return;
+            }
+            for (const r of results) {
+                const item = document.createElement('div');
+                item.className = 'news-item';
+                const info = document.createElement('div');
+                info.className = 'news-item-info';
+                const date = document.createElement('div');
+                date.className = 'news-date';
+                date.textContent = `📅 ${r.date}`;
+                const title = document.createElement('div');
+                title.className = 'news-title';
+                title.textContent = r.title;
+                info.append(date, title);
+                const link = document.createElement('a');
+                link.className = 'news-link';
+                link.href = `./${r.path}`;
+                link.textContent = '閱讀 →';
+                item.append(info, link);
+                container.appendChild(item);
+            }
+        } catch (err) {
+            console.error('搜尋失敗', err);
+            container.textContent = '⚠️ 搜尋暫時無法使用，請稍後再試';
+        }
+    }
+
+    // 公共API，供其他腳本調用
+    static initSearch() {
+        if (!window.thinkerSearch) {
+            window.thinkerSearch = new ThinkerSearch();
+        }
+        return window.thinkerSearch;
+    }
+}
+
+ThinkerSearch.initSearch();
+
+// 導出供模組化使用
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = ThinkerSearch;
+}